@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare la latence d'écriture de la persistance JSON: réécriture complète du
+fichier contre journal en ajout seul, pour 10k et 100k enregistrements.
+
+Usage: python benchmarks/json_store_bench.py [--sizes 10000 100000] [--writes 50]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "common"))
+
+from json_store import JsonStore  # noqa: E402
+
+
+def make_snapshot(path, size):
+    users = [
+        {
+            "id": f"user_{i}",
+            "name": f"User {i}",
+            "last_active": 1360031010 + i,
+            "role": "user",
+        }
+        for i in range(size)
+    ]
+    with open(path, "w") as f:
+        json.dump({"users": users}, f, indent=4)
+
+
+def run(size, writes, journal):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.json")
+        make_snapshot(path, size)
+        # Pas de compactage pendant la mesure: on mesure le coût d'une écriture
+        store = JsonStore(
+            path, "users", "id", journal=journal, compact_every=writes + 1
+        )
+        store.all()
+
+        latencies = []
+        for i in range(writes):
+            doc = {"id": f"user_{i}", "name": f"Renamed {i}", "role": "admin"}
+            start = time.perf_counter()
+            store.put(doc)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        store.compact()
+        compact_ms = (time.perf_counter() - start) * 1000
+
+    latencies.sort()
+    return {
+        "mean": statistics.mean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "compact": compact_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'records':>8} {'mode':>8} {'mean ms':>10} {'p50 ms':>10} "
+        f"{'p99 ms':>10} {'compact ms':>11}"
+    )
+    for size in args.sizes:
+        for mode, journal in (("rewrite", False), ("journal", True)):
+            r = run(size, args.writes, journal)
+            print(
+                f"{size:>8} {mode:>8} {r['mean']:>10.3f} {r['p50']:>10.3f} "
+                f"{r['p99']:>10.3f} {r['compact']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
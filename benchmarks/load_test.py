@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Test de charge des quatre services (User, Movie, Schedule, Booking).
+
+Chaque service est lancé dans un processus séparé, sur une copie de son
+dossier (les fichiers de données du dépôt ne sont jamais modifiés), en
+persistance JSON ou en MongoDB simulé en mémoire par mongomock. Des mélanges
+de requêtes sont ensuite joués à plusieurs niveaux de concurrence:
+- read: lectures de réservations détaillées, GetByDate, lecture d'utilisateurs
+- mixed: lectures et créations de réservations, GetByDate, CRUD utilisateur
+- write: créations de réservations et CRUD utilisateur
+
+Pour chaque mélange et niveau: débit (requêtes/s) et latences p50/p95/p99,
+au total et par opération. Les résultats sont écrits en JSON; --compare
+compare avec un fichier précédent et signale les régressions.
+
+Usage: python benchmarks/load_test.py [--mix read mixed write] [--concurrency 1 8 32]
+           [--duration 10] [--warmup 2] [--storage json|mongomock]
+           [--booking-server flask|asgi] [--output fichier.json]
+           [--compare ancien.json] [--threshold 10]
+"""
+
+import argparse
+import datetime
+import importlib
+import importlib.util
+import inspect
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import grpc
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "schedule"))
+
+import schedule_pb2  # noqa: E402
+import schedule_pb2_grpc  # noqa: E402
+
+HOST = "127.0.0.1"
+# Ports relatifs à --base-port
+PORT_OFFSETS = {"user": 0, "movie": 1, "schedule": 2, "booking": 3}
+# Ordre de démarrage: un service démarre après ceux qu'il appelle
+START_ORDER = ["user", "movie", "schedule", "booking"]
+# Administrateur des données de test (en-tête x-user-id du CRUD utilisateur)
+ADMIN_ID = "chris_rivers"
+
+MIXES = {
+    "read": [("booking_read", 60), ("get_by_date", 30), ("user_get", 10)],
+    "mixed": [
+        ("booking_read", 40),
+        ("create_booking", 20),
+        ("get_by_date", 25),
+        ("user_crud", 15),
+    ],
+    "write": [("create_booking", 60), ("user_crud", 40)],
+}
+
+DETAILED_BOOKINGS_QUERY = """
+query($userid: String!) {
+  detailed_bookings_by_user(userid: $userid) {
+    userid
+    bookings { date movies { movie { id title rating } schedule { date } } }
+  }
+}
+"""
+
+CREATE_BOOKING_MUTATION = """
+mutation($input: CreateBookingInput!) {
+  create_booking(input: $input) { message }
+}
+"""
+
+
+# ============================================================================
+# SERVICES
+# ============================================================================
+
+
+def service_env(storage, ports):
+    def url(service):
+        return f"http://{HOST}:{ports[service]}"
+
+    env = dict(os.environ)
+    env.update(
+        {
+            "PERSISTENCE_TYPE": "MONGODB" if storage == "mongomock" else "JSON",
+            "MONGO_INDEX_REPORT": "0",
+            "USER_SERVICE_URL": url("user"),
+            "MOVIE_SERVICE_URL": url("movie"),
+            "SCHEDULE_SERVICE_URL": f"{HOST}:{ports['schedule']}",
+            "MOVIE_EVENT_SUBSCRIBERS": f"{url('booking')}/events/movies",
+            "SCHEDULE_PORT": str(ports["schedule"]),
+            "SCHEDULE_METRICS_PORT": "0",
+            # Les créations de réservations ne doivent pas remplir les séances
+            "DEFAULT_SCREENING_CAPACITY": "1000000000",
+            "TRACE_FILE": "",
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    return env
+
+
+def use_mongomock():
+    """Remplace pymongo.MongoClient par une base mongomock en mémoire"""
+    import mongomock
+    import pymongo
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo passe aux opérations groupées des arguments (sort...) que
+    # mongomock ne connaît pas encore: ils sont ignorés
+    for name in ("add_insert", "add_update", "add_replace", "add_delete"):
+        method = getattr(BulkOperationBuilder, name, None)
+        if method is None:
+            continue
+        accepted = set(inspect.signature(method).parameters)
+
+        def compatible(self, *args, _method=method, _accepted=accepted, **kwargs):
+            kwargs = {key: value for key, value in kwargs.items() if key in _accepted}
+            return _method(self, *args, **kwargs)
+
+        setattr(BulkOperationBuilder, name, compatible)
+
+    # Une base par processus, partagée par les clients du service
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+
+
+def run_service(name, port, storage, booking_server):
+    """Point d'entrée du processus d'un service (dossier courant: sa copie)"""
+    sys.path[:0] = [os.getcwd(), os.path.join(ROOT, "common")]
+
+    if storage == "mongomock":
+        use_mongomock()
+
+    if name == "schedule":
+        import schedule
+
+        schedule.serve()
+    elif name == "booking" and booking_server == "asgi":
+        import uvicorn
+
+        import asgi
+
+        uvicorn.run(asgi.app, host=HOST, port=port, log_level="warning")
+    else:
+        module = importlib.import_module(name)
+        module.app.run(host=HOST, port=port, threaded=True)
+
+
+def wait_ready(name, port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"{name} arrêté au démarrage (code {process.returncode})"
+            )
+        try:
+            if name == "schedule":
+                with grpc.insecure_channel(f"{HOST}:{port}") as channel:
+                    grpc.channel_ready_future(channel).result(timeout=1)
+                return
+            if requests.get(f"http://{HOST}:{port}/", timeout=1).status_code == 200:
+                return
+        except (grpc.FutureTimeoutError, requests.RequestException):
+            time.sleep(0.2)
+    raise RuntimeError(f"{name} ne répond pas sur le port {port}")
+
+
+class Stack:
+    """Les quatre services, lancés dans un dossier temporaire"""
+
+    def __init__(self, storage, booking_server, base_port):
+        self.storage = storage
+        self.booking_server = booking_server
+        self.ports = {name: base_port + i for name, i in PORT_OFFSETS.items()}
+        self.processes = {}
+        self.tmp = None
+
+    def __enter__(self):
+        self.tmp = tempfile.mkdtemp(prefix="load_test_")
+        try:
+            for name in START_ORDER:
+                self._start(name)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _start(self, name):
+        workdir = os.path.join(self.tmp, name)
+        shutil.copytree(
+            os.path.join(ROOT, name),
+            workdir,
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        log = open(os.path.join(self.tmp, f"{name}.log"), "w")
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--serve",
+                name,
+                "--port",
+                str(self.ports[name]),
+                "--storage",
+                self.storage,
+                "--booking-server",
+                self.booking_server,
+            ],
+            cwd=workdir,
+            env=service_env(self.storage, self.ports),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        log.close()
+        self.processes[name] = process
+        try:
+            wait_ready(name, self.ports[name], process)
+        except RuntimeError:
+            print(self.log_tail(name), file=sys.stderr)
+            raise
+
+    def log_tail(self, name, lines=20):
+        with open(os.path.join(self.tmp, f"{name}.log")) as f:
+            return "".join(f.readlines()[-lines:])
+
+    def url(self, name):
+        return f"http://{HOST}:{self.ports[name]}"
+
+    def __exit__(self, *exc):
+        for process in reversed(list(self.processes.values())):
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+# ============================================================================
+# OPÉRATIONS
+# ============================================================================
+
+
+def load_fixtures():
+    """Utilisateurs ayant des réservations et séances programmées"""
+    with open(os.path.join(ROOT, "booking", "data", "bookings.json")) as f:
+        booking_users = [b["userid"] for b in json.load(f)["bookings"]]
+    with open(os.path.join(ROOT, "schedule", "data", "times.json")) as f:
+        schedule = json.load(f)["schedule"]
+    with open(os.path.join(ROOT, "user", "data", "users.json")) as f:
+        users = [u["id"] for u in json.load(f)["users"]]
+    return {
+        "booking_users": booking_users,
+        "dates": [day["date"] for day in schedule],
+        "screenings": [
+            (day["date"], movie_id) for day in schedule for movie_id in day["movies"]
+        ],
+        "users": users,
+    }
+
+
+class Recorder:
+    """Latences (ms) et erreurs par opération"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    def call(self, op, func):
+        start = time.perf_counter()
+        try:
+            ok = func()
+        except (requests.RequestException, grpc.RpcError, ValueError):
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        if not self.recording:
+            return ok
+        with self.lock:
+            self.latencies.setdefault(op, []).append(elapsed)
+            if not ok:
+                self.errors[op] = self.errors.get(op, 0) + 1
+        return ok
+
+
+class Workload:
+    """Opérations du test; une session HTTP par thread client"""
+
+    def __init__(self, stack, fixtures):
+        self.fixtures = fixtures
+        self.booking_url = f"{stack.url('booking')}/graphql"
+        self.user_url = f"{stack.url('user')}/users"
+        self.channel = grpc.insecure_channel(f"{HOST}:{stack.ports['schedule']}")
+        self.stub = schedule_pb2_grpc.ScheduleStub(self.channel)
+        self.local = threading.local()
+        # Identifiants uniques des réservations et utilisateurs créés
+        self.ids = itertools.count()
+        self.run_id = f"{os.getpid()}_{int(time.time())}"
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def _graphql(self, query, variables):
+        response = self.session().post(
+            self.booking_url, json={"query": query, "variables": variables}, timeout=30
+        )
+        return response.status_code == 200 and not response.json().get("errors")
+
+    def booking_read(self, rec, rng):
+        userid = rng.choice(self.fixtures["booking_users"])
+        rec.call(
+            "booking_read",
+            lambda: self._graphql(DETAILED_BOOKINGS_QUERY, {"userid": userid}),
+        )
+
+    def create_booking(self, rec, rng):
+        date, movieid = rng.choice(self.fixtures["screenings"])
+        booking = {
+            "userid": f"bench_{self.run_id}_{next(self.ids)}",
+            "movieid": movieid,
+            "date": date,
+        }
+        rec.call(
+            "create_booking",
+            lambda: self._graphql(CREATE_BOOKING_MUTATION, {"input": booking}),
+        )
+
+    def get_by_date(self, rec, rng):
+        date = rng.choice(self.fixtures["dates"])
+        rec.call(
+            "get_by_date",
+            lambda: bool(
+                self.stub.GetByDate(schedule_pb2.Date(date=date), timeout=30).list
+            ),
+        )
+
+    def user_get(self, rec, rng):
+        userid = rng.choice(self.fixtures["users"])
+        rec.call(
+            "user_get",
+            lambda: self.session()
+            .get(f"{self.user_url}/{userid}", timeout=30)
+            .status_code
+            == 200,
+        )
+
+    def user_crud(self, rec, rng):
+        """Création, lecture, modification puis suppression d'un utilisateur"""
+        session = self.session()
+        headers = {"x-user-id": ADMIN_ID}
+        userid = f"bench_{self.run_id}_{next(self.ids)}"
+        url = f"{self.user_url}/{userid}"
+        user = {"id": userid, "name": "Bench User", "last_active": int(time.time())}
+
+        if not rec.call(
+            "user_create",
+            lambda: session.post(
+                self.user_url, json=user, headers=headers, timeout=30
+            ).status_code
+            == 201,
+        ):
+            return
+        rec.call("user_get", lambda: session.get(url, timeout=30).status_code == 200)
+        rec.call(
+            "user_update",
+            lambda: session.put(
+                url,
+                json={"last_active": user["last_active"] + 1},
+                headers=headers,
+                timeout=30,
+            ).status_code
+            == 200,
+        )
+        rec.call(
+            "user_delete",
+            lambda: session.delete(url, headers=headers, timeout=30).status_code == 200,
+        )
+
+    def close(self):
+        self.channel.close()
+
+
+# ============================================================================
+# MESURE
+# ============================================================================
+
+
+def percentile(sorted_values, p):
+    """Percentile au rang le plus proche (valeurs déjà triées)"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"count": 0, "errors": errors, "rps": 0.0}
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def run_level(workload, mix, concurrency, duration, warmup, seed):
+    """`concurrency` clients jouent le mélange pendant warmup + duration
+    secondes; seules les `duration` dernières secondes sont mesurées"""
+    ops = [getattr(workload, op) for op, _ in MIXES[mix]]
+    weights = [weight for _, weight in MIXES[mix]]
+    rec = Recorder()
+    stop = threading.Event()
+
+    def client(n):
+        rng = random.Random(seed * 1000 + n)
+        while not stop.is_set():
+            rng.choices(ops, weights)[0](rec, rng)
+
+    threads = [
+        threading.Thread(target=client, args=(n,), daemon=True)
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    rec.recording = True
+    start = time.perf_counter()
+    time.sleep(duration)
+    rec.recording = False
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with rec.lock:
+        operations = {
+            op: summarize(latencies, rec.errors.get(op, 0), elapsed)
+            for op, latencies in sorted(rec.latencies.items())
+        }
+        total = summarize(
+            [ms for latencies in rec.latencies.values() for ms in latencies],
+            sum(rec.errors.values()),
+            elapsed,
+        )
+    return {
+        "mix": mix,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "total": total,
+        "operations": operations,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(result):
+    print(f"\n{result['mix']} x {result['concurrency']} clients")
+    print(
+        f"  {'opération':<16} {'req':>7} {'err':>5} {'rps':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    rows = list(result["operations"].items()) + [("TOTAL", result["total"])]
+    for op, s in rows:
+        if not s["count"]:
+            print(f"  {op:<16} {0:>7} {s['errors']:>5}")
+            continue
+        print(
+            f"  {op:<16} {s['count']:>7} {s['errors']:>5} {s['rps']:>9.1f} "
+            f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}"
+        )
+
+
+def _change(old, new):
+    if not old or new is None:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def compare(previous, meta, results, threshold):
+    """Affiche l'évolution par mélange et niveau; retourne les régressions
+    (débit en baisse ou p95 en hausse de plus de `threshold` %)"""
+    before = {(r["mix"], r["concurrency"]): r for r in previous["results"]}
+    regressions = []
+    print(f"\nComparaison avec {previous['meta'].get('git_commit') or '?'}:")
+    for setting in ("storage", "booking_server"):
+        if previous["meta"].get(setting) != meta[setting]:
+            print(
+                f"  attention: {setting} différent "
+                f"({previous['meta'].get(setting)} -> {meta[setting]})"
+            )
+
+    compared = 0
+    for result in results:
+        key = (result["mix"], result["concurrency"])
+        old = before.get(key)
+        if old is None or not old["total"]["count"] or not result["total"]["count"]:
+            continue
+        compared += 1
+        rps = _change(old["total"]["rps"], result["total"]["rps"])
+        p95 = _change(old["total"]["p95_ms"], result["total"]["p95_ms"])
+        p99 = _change(old["total"]["p99_ms"], result["total"]["p99_ms"])
+        regressed = rps < -threshold or p95 > threshold
+        if regressed:
+            regressions.append(key)
+        print(
+            f"  {key[0]} x {key[1]:<4} rps {old['total']['rps']:>8.1f} -> "
+            f"{result['total']['rps']:>8.1f} ({rps:+.1f}%)  p95 {p95:+.1f}%  "
+            f"p99 {p99:+.1f}%{'  RÉGRESSION' if regressed else ''}"
+        )
+    if not compared:
+        print("  aucun mélange/niveau de concurrence en commun")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["mixed"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--storage", choices=["json", "mongomock"], default="json")
+    parser.add_argument("--booking-server", choices=["flask", "asgi"], default="flask")
+    parser.add_argument("--base-port", type=int, default=13200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--compare", help="résultats précédents (JSON)")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    parser.add_argument("--serve", choices=START_ORDER, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_service(args.serve, args.port, args.storage, args.booking_server)
+        return 0
+
+    if args.storage == "mongomock" and importlib.util.find_spec("mongomock") is None:
+        parser.error("--storage mongomock nécessite mongomock (pip install mongomock)")
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    output = args.output or os.path.join(
+        ROOT,
+        "benchmarks",
+        "results",
+        f"load_{args.storage}_{datetime.datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    meta = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "storage": args.storage,
+        "booking_server": args.booking_server,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "seed": args.seed,
+    }
+
+    fixtures = load_fixtures()
+    results = []
+    print(
+        f"Services: stockage {args.storage}, Booking {args.booking_server}, "
+        f"{args.duration:g} s par niveau"
+    )
+    with Stack(args.storage, args.booking_server, args.base_port) as stack:
+        workload = Workload(stack, fixtures)
+        try:
+            for mix in args.mix:
+                for concurrency in args.concurrency:
+                    result = run_level(
+                        workload,
+                        mix,
+                        concurrency,
+                        args.duration,
+                        args.warmup,
+                        args.seed,
+                    )
+                    results.append(result)
+                    print_level(result)
+        finally:
+            workload.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nRésultats: {output}")
+
+    if previous is not None and compare(previous, meta, results, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Charge le service Schedule avec N clients GetByDate simultanés et compare les
+modes de serveur sync (grpc.server + threads) et aio (grpc.aio).
+
+Chaque mode est lancé dans un processus séparé, en persistance JSON. L'option
+--io-ms ajoute une attente dans GetByDate pour simuler la latence de MongoDB.
+
+Usage: python benchmarks/schedule_load.py [--clients 50 500] [--requests 20] [--io-ms 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import grpc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCHEDULE_DIR = os.path.join(ROOT, "schedule")
+sys.path.insert(0, SCHEDULE_DIR)
+
+import schedule_pb2  # noqa: E402
+import schedule_pb2_grpc  # noqa: E402
+
+DATES = ["20151130", "20151201", "20151202", "20151203", "20151204", "20151205"]
+
+
+def run_server(mode, port, io_ms):
+    """Point d'entrée du processus serveur"""
+    os.chdir(SCHEDULE_DIR)
+    sys.path.insert(0, os.path.join(ROOT, "common"))
+    os.environ["PERSISTENCE_TYPE"] = "JSON"
+    import schedule
+
+    class Servicer(schedule.ScheduleServicer):
+        def GetByDate(self, request, context):
+            if io_ms:
+                time.sleep(io_ms / 1000)
+            return super().GetByDate(request, context)
+
+    if mode == "aio":
+
+        async def main():
+            server = schedule.create_aio_server(Servicer(), port)
+            await server.start()
+            await server.wait_for_termination()
+
+        asyncio.run(main())
+    else:
+        server = schedule.create_server(Servicer(), port)
+        server.start()
+        server.wait_for_termination()
+
+
+async def run_load(target, clients, requests_per_client):
+    latencies = []
+    errors = {}
+
+    async with grpc.aio.insecure_channel(target) as channel:
+        stub = schedule_pb2_grpc.ScheduleStub(channel)
+
+        async def client(n):
+            for i in range(requests_per_client):
+                date = DATES[(n + i) % len(DATES)]
+                start = time.perf_counter()
+                try:
+                    await stub.GetByDate(schedule_pb2.Date(date=date))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except grpc.aio.AioRpcError as e:
+                    errors[e.code().name] = errors.get(e.code().name, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "mean": statistics.mean(latencies) if latencies else float("nan"),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": errors,
+    }
+
+
+def wait_ready(target, timeout=15):
+    with grpc.insecure_channel(target) as channel:
+        grpc.channel_ready_future(channel).result(timeout=timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["sync", "aio"])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--io-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=3102)
+    parser.add_argument("--serve", choices=["sync", "aio"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.serve, args.port, args.io_ms)
+        return
+
+    target = f"localhost:{args.port}"
+    print(
+        f"{'mode':>5} {'clients':>8} {'rps':>9} {'mean ms':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9}  errors"
+    )
+    for mode in args.modes:
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                __file__,
+                "--serve",
+                mode,
+                "--port",
+                str(args.port),
+                "--io-ms",
+                str(args.io_ms),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(target)
+            for clients in args.clients:
+                r = asyncio.run(run_load(target, clients, args.requests))
+                print(
+                    f"{mode:>5} {clients:>8} {r['rps']:>9.1f} {r['mean']:>9.2f} "
+                    f"{r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f}  "
+                    f"{r['errors'] or '-'}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Mode d'exécution asynchrone du service Booking (SERVER_MODE=asgi).
+
+Même schéma GraphQL que booking.py (schema.py), exécuté par Ariadne en
+asynchrone sous uvicorn. Les appels aux services Movie, Schedule et User
+deviennent des coroutines: les clients HTTP/gRPC partagés (clients.py) restent
+bloquants et sont exécutés dans un pool de threads dédié, ce qui permet de
+lancer plusieurs appels en même temps avec asyncio.gather.
+
+detailed_bookings_by_user récupère ainsi les films et le planning en
+parallèle: la latence est celle de la dépendance la plus lente, pas la somme.
+"""
+
+import asyncio
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ariadne.asgi import GraphQL
+from ariadne.asgi.handlers import GraphQLHTTPHandler
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+
+import clients
+import metrics
+import resolvers as r
+import schema as booking_schema
+import tracing
+from admin_check import admin_cache
+from graphql_metrics import ResolverMetrics
+from graphql_tracing import ResolverTracing
+
+PORT = 3201
+HOST = "0.0.0.0"
+
+tracing.set_service("booking")
+
+# Threads exécutant les appels bloquants (HTTP, gRPC, MongoDB, fichiers JSON)
+ASYNC_THREADS = int(os.getenv("BOOKING_ASYNC_THREADS", "64"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=ASYNC_THREADS, thread_name_prefix="booking-io"
+)
+
+
+async def run_sync(func, *args, **kwargs):
+    """Exécute une fonction bloquante dans le pool sans bloquer la boucle.
+
+    Le contexte de trace est recopié: les appels et commandes MongoDB faits
+    dans le thread restent rattachés au résolveur appelant.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, tracing.bind(func, *args, **kwargs))
+
+
+# ============================================================================
+# APPELS AUX AUTRES SERVICES
+# ============================================================================
+
+
+async def get_movie_details(movie_id):
+    return await run_sync(r.get_movie_details, movie_id)
+
+
+async def get_movies_details(movie_ids):
+    return await run_sync(r.get_movies_details, movie_ids)
+
+
+async def get_schedule_details(movie_id, date):
+    return await run_sync(r.get_schedule_details, movie_id, date)
+
+
+async def get_schedules_by_dates(dates):
+    return await run_sync(r.get_schedules_by_dates, dates)
+
+
+# ============================================================================
+# RESOLVERS
+# ============================================================================
+
+
+def in_thread(resolver):
+    """Résolveur de resolvers.py exécuté dans le pool (voir run_sync)"""
+
+    async def resolve(obj, info, **kwargs):
+        return await run_sync(resolver, obj, info, **kwargs)
+
+    return resolve
+
+
+async def resolve_detailed_bookings_by_user(obj, info, userid):
+    user_booking = await run_sync(r.find_user_booking, userid)
+    if not user_booking:
+        return None
+
+    movie_ids, dates = r.booked_movies_and_dates(user_booking)
+
+    # Films (service Movie) et planning (service Schedule) en parallèle
+    movies, schedules = await asyncio.gather(
+        get_movies_details(movie_ids), get_schedules_by_dates(dates)
+    )
+
+    return r.build_detailed_bookings(userid, user_booking, movies, schedules)
+
+
+async def resolve_create_booking(obj, info, input):
+    userid = input["userid"]
+    movieid = input["movieid"]
+    date = input["date"]
+
+    # Vérifications du film et de sa programmation en parallèle
+    movie_details, schedule_details = await asyncio.gather(
+        get_movie_details(movieid), get_schedule_details(movieid, date)
+    )
+    if not movie_details:
+        raise Exception("Film non trouvé")
+    if not schedule_details:
+        raise Exception("Film non programmé à cette date")
+
+    await run_sync(r.add_booking, userid, movieid, date)
+
+    return {
+        "message": "Réservation créée avec succès",
+        "booking": {"userid": userid, "movieid": movieid, "date": date},
+    }
+
+
+async def resolve_create_bookings(obj, info, inputs):
+    r.check_booking_batch(inputs)
+
+    # Films et programmations vérifiés en parallèle, un appel chacun
+    movies, schedules = await asyncio.gather(
+        get_movies_details([item["movieid"] for item in inputs]),
+        get_schedules_by_dates([item["date"] for item in inputs]),
+    )
+    results = r.validate_bookings(inputs, movies, schedules)
+    await run_sync(r.add_bookings, results)
+    return r.bulk_booking_response(results)
+
+
+# Schéma de schema.py: les résolveurs bloquants passent par le pool, les
+# champs qui appellent plusieurs services les lancent en parallèle
+schema = booking_schema.make_schema(
+    wrap=in_thread,
+    overrides={
+        "detailed_bookings_by_user": resolve_detailed_bookings_by_user,
+        "create_booking": resolve_create_booking,
+        "create_bookings": resolve_create_bookings,
+    },
+)
+
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
+
+async def home(request):
+    return HTMLResponse(
+        "<h1 style='color:blue'>Bienvenue dans le service Réservations GraphQL!</h1>"
+    )
+
+
+async def connections_stats(request):
+    return JSONResponse(clients.connection_stats())
+
+
+async def cache_stats(request):
+    return JSONResponse({"admin": admin_cache.stats(), "movie": r.movie_cache.stats()})
+
+
+async def metrics_endpoint(request):
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def traces_endpoint(request):
+    limit = request.query_params.get("limit", "20")
+    return JSONResponse(
+        tracing.trace_report(
+            tracing.COLLECTOR.spans(),
+            request.query_params.get("trace_id"),
+            int(limit) if limit.isdigit() else 20,
+        )
+    )
+
+
+async def movie_event(request):
+    try:
+        event = await request.json()
+    except ValueError:
+        event = None
+    try:
+        return JSONResponse(r.evict_movie(event))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # Arrêt du serveur: pool de threads et connexions HTTP/gRPC partagées
+    _executor.shutdown(wait=False, cancel_futures=True)
+    clients.close_all()
+
+
+app = Starlette(
+    routes=[
+        Route("/", home, methods=["GET"]),
+        Route("/stats/connections", connections_stats, methods=["GET"]),
+        Route("/stats/cache", cache_stats, methods=["GET"]),
+        Route("/events/movies", movie_event, methods=["POST"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+        Route("/traces", traces_endpoint, methods=["GET"]),
+        Route(
+            "/graphql",
+            GraphQL(
+                schema,
+                http_handler=GraphQLHTTPHandler(
+                    extensions=[ResolverMetrics, ResolverTracing]
+                ),
+            ),
+            methods=["GET", "POST"],
+        ),
+    ],
+    middleware=[Middleware(tracing.TracingMiddleware)],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print("Server running in port %s" % (PORT))
+    uvicorn.run(app, host=HOST, port=PORT)
@@ -1,68 +1,77 @@
-from ariadne import (
-    graphql_sync,
-    make_executable_schema,
-    load_schema_from_path,
-    QueryType,
-    MutationType,
-)
+import atexit
+
+from ariadne import graphql_sync
 from flask import Flask, request, jsonify, make_response
 
+import clients
 import resolvers as r
+import metrics
+import schema as booking_schema
+import tracing
+from admin_check import admin_cache
+from graphql_metrics import ResolverMetrics
+from graphql_tracing import ResolverTracing
 
 PORT = 3201
 HOST = "0.0.0.0"
 app = Flask(__name__)
 
-# Chargement du schéma GraphQL
-type_defs = load_schema_from_path("booking.graphql")
-
-# Création des instances de types
-query = QueryType()
-mutation = MutationType()
-
+# Span serveur par requête, rattaché au traceparent de l'appelant
+tracing.set_service("booking")
+tracing.instrument_flask(app)
 
-# Liaison des résolveurs de requêtes
-@query.field("all_bookings")
-def resolve_all_bookings(obj, info, userid):
-    return r.all_bookings_resolver(obj, info, userid)
+# Fermeture des connexions sortantes à l'arrêt du processus (worker gunicorn compris)
+atexit.register(clients.close_all)
 
+# Schéma GraphQL (résolveurs liés dans schema.py)
+schema = booking_schema.make_schema()
 
-@query.field("bookings_by_user")
-def resolve_bookings_by_user(obj, info, userid):
-    return r.bookings_by_user_resolver(obj, info, userid)
 
-
-@query.field("detailed_bookings_by_user")
-def resolve_detailed_bookings_by_user(obj, info, userid):
-    return r.detailed_bookings_by_user_resolver(obj, info, userid)
+# Message d'accueil
+@app.route("/", methods=["GET"])
+def home():
+    return make_response(
+        "<h1 style='color:blue'>Bienvenue dans le service Réservations GraphQL!</h1>",
+        200,
+    )
 
 
-# Liaison des résolveurs de mutations
-@mutation.field("create_booking")
-def resolve_create_booking(obj, info, input):
-    return r.create_booking_resolver(obj, info, input)
+# Compteurs de réutilisation des connexions sortantes
+@app.route("/stats/connections", methods=["GET"])
+def connections_stats():
+    return jsonify(clients.connection_stats())
 
 
-@mutation.field("delete_booking")
-def resolve_delete_booking(obj, info, userid, movieid, date):
-    return r.delete_booking_resolver(obj, info, userid, movieid, date)
+# Compteurs du cache des droits administrateur
+@app.route("/stats/cache", methods=["GET"])
+def cache_stats():
+    return jsonify({"admin": admin_cache.stats(), "movie": r.movie_cache.stats()})
 
 
-@mutation.field("delete_all_user_bookings")
-def resolve_delete_all_user_bookings(obj, info, userid):
-    return r.delete_all_user_bookings_resolver(obj, info, userid)
+# Événements du service Movie: le film modifié est retiré du cache local
+@app.route("/events/movies", methods=["POST"])
+def movie_event():
+    try:
+        return jsonify(r.evict_movie(request.get_json(silent=True)))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
 
 
-# Création du schéma exécutable
-schema = make_executable_schema(type_defs, query, mutation)
+# Métriques au format Prometheus (résolveurs, MongoDB, appels sortants)
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return make_response(metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE})
 
 
-# Message d'accueil
-@app.route("/", methods=["GET"])
-def home():
-    return make_response(
-        "<h1 style='color:blue'>Bienvenue dans le service Réservations GraphQL!</h1>",
-        200,
+# Traces récentes du processus: les plus lentes, ou le détail de ?trace_id=
+@app.route("/traces", methods=["GET"])
+def traces_endpoint():
+    return jsonify(
+        tracing.trace_report(
+            tracing.COLLECTOR.spans(),
+            request.args.get("trace_id"),
+            request.args.get("limit", 20, type=int),
+        )
     )
 
 
@@ -70,7 +79,13 @@ def home():
 @app.route("/graphql", methods=["POST"])
 def graphql_server():
     data = request.get_json()
-    success, result = graphql_sync(schema, data, context_value=request, debug=app.debug)
+    success, result = graphql_sync(
+        schema,
+        data,
+        context_value=request,
+        debug=app.debug,
+        extensions=[ResolverMetrics, ResolverTracing],
+    )
     status_code = 200 if success else 400
     return jsonify(result), status_code
 
@@ -0,0 +1,139 @@
+"""Stockage des réservations en lignes (BOOKING_STORAGE=rows).
+
+Une ligne {userid, date, movieid} par réservation, avec un index unique
+composé, au lieu d'un document par utilisateur contenant dates[].movies[].
+Réserver ou annuler écrit une seule ligne (insert_one / delete_one): le coût
+ne dépend plus de l'historique de l'utilisateur, et deux réservations
+simultanées du même utilisateur ne s'écrasent plus.
+
+Les lectures regroupent les lignes dans la forme imbriquée du schéma GraphQL.
+"""
+
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+
+COLLECTION = "booking_rows"
+
+# Index unique: un film réservé une seule fois par utilisateur et par date
+INDEXES = [
+    (
+        [("userid", ASCENDING), ("date", ASCENDING), ("movieid", ASCENDING)],
+        {"unique": True},
+    ),
+]
+
+# Ordre des lignes: par utilisateur, par date, puis ordre de réservation
+ROW_SORT = [("userid", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)]
+
+
+def flatten(booking):
+    """Document imbriqué -> lignes {userid, date, movieid}"""
+    return [
+        {"userid": booking["userid"], "date": date_entry["date"], "movieid": movie_id}
+        for date_entry in booking["dates"]
+        for movie_id in date_entry["movies"]
+    ]
+
+
+def group(rows):
+    """Lignes triées (ROW_SORT) -> documents imbriqués, dans l'ordre des userid"""
+    bookings = []
+    for row in rows:
+        if not bookings or bookings[-1]["userid"] != row["userid"]:
+            bookings.append({"userid": row["userid"], "dates": []})
+        dates = bookings[-1]["dates"]
+        if not dates or dates[-1]["date"] != row["date"]:
+            dates.append({"date": row["date"], "movies": []})
+        if row["movieid"] not in dates[-1]["movies"]:
+            dates[-1]["movies"].append(row["movieid"])
+    return bookings
+
+
+def grouped_pipeline(match, limit=None):
+    """Pipeline d'agrégation regroupant les lignes par utilisateur puis par date.
+
+    Avec `limit`, les `limit` premiers userid distincts sont choisis d'abord
+    (parcours de l'index), puis seules leurs lignes sont lues et regroupées.
+    """
+    if limit is None:
+        pipeline = [{"$match": match}]
+    else:
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"userid": 1}},
+            {"$group": {"_id": "$userid"}},
+            {"$sort": {"_id": 1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": COLLECTION,
+                    "localField": "_id",
+                    "foreignField": "userid",
+                    "as": "rows",
+                }
+            },
+            {"$unwind": "$rows"},
+            {"$replaceRoot": {"newRoot": "$rows"}},
+        ]
+    pipeline += [
+        {"$sort": {"userid": 1, "date": 1, "_id": 1}},
+        {
+            "$group": {
+                "_id": {"userid": "$userid", "date": "$date"},
+                "movies": {"$push": "$movieid"},
+            }
+        },
+        {"$sort": {"_id.userid": 1, "_id.date": 1}},
+        {
+            "$group": {
+                "_id": "$_id.userid",
+                "dates": {"$push": {"date": "$_id.date", "movies": "$movies"}},
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "userid": "$_id", "dates": 1}},
+    ]
+    return pipeline
+
+
+def migrate_to_rows(nested, rows, batch_size=1000):
+    """Copie les documents imbriqués de `nested` en lignes dans `rows`.
+
+    Idempotent (upsert): relancer la migration n'ajoute pas de doublons.
+    Retourne le nombre de lignes écrites.
+    """
+    count = 0
+    batch = []
+    for booking in nested.find({}, {"_id": 0}):
+        for row in flatten(booking):
+            batch.append(UpdateOne(row, {"$setOnInsert": row}, upsert=True))
+        if len(batch) >= batch_size:
+            rows.bulk_write(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        rows.bulk_write(batch, ordered=False)
+        count += len(batch)
+    return count
+
+
+def migrate_to_nested(rows, nested, batch_size=1000):
+    """Reconstruit les documents imbriqués de `nested` depuis `rows` (retour arrière).
+
+    Les utilisateurs sans aucune ligne sont retirés de `nested`. Retourne le
+    nombre d'utilisateurs écrits.
+    """
+    count = 0
+    batch = []
+    userids = []
+    for booking in rows.aggregate(grouped_pipeline({}), allowDiskUse=True):
+        userids.append(booking["userid"])
+        batch.append(ReplaceOne({"userid": booking["userid"]}, booking, upsert=True))
+        if len(batch) >= batch_size:
+            nested.bulk_write(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        nested.bulk_write(batch, ordered=False)
+        count += len(batch)
+    nested.delete_many({"userid": {"$nin": userids}})
+    return count
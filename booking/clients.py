@@ -0,0 +1,217 @@
+"""Connexions sortantes partagées du service Booking.
+
+Les sessions HTTP (une par service cible) et les canaux gRPC sont créés une
+seule fois puis réutilisés par toutes les requêtes, au lieu d'ouvrir une
+nouvelle connexion TCP à chaque appel.
+
+Chaque appel est mesuré (durée et statut par service cible) pour /metrics et
+tracé: un span client par appel, dont le `traceparent` est transmis dans les
+en-têtes HTTP ou les métadonnées gRPC (voir outbound.py).
+"""
+
+import collections
+import os
+import threading
+import time
+
+import grpc
+import requests
+from requests.adapters import HTTPAdapter
+
+import outbound
+import schedule_pb2_grpc
+import tracing
+
+# Taille des pools HTTP (nombre d'hôtes gardés en cache / connexions par hôte)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Keepalive gRPC: un ping toutes les GRPC_KEEPALIVE_TIME_MS garde le canal ouvert
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "60000"))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "10000"))
+
+_lock = threading.Lock()
+_sessions = {}
+_channels = {}
+_stubs = {}
+_grpc_stats = {}
+
+
+class _CallDetails(
+    collections.namedtuple(
+        "_CallDetails",
+        (
+            "method",
+            "timeout",
+            "metadata",
+            "credentials",
+            "wait_for_ready",
+            "compression",
+        ),
+    ),
+    grpc.ClientCallDetails,
+):
+    pass
+
+
+def _with_traceparent(client_call_details):
+    """Copie des détails de l'appel, avec le `traceparent` du span courant"""
+    current = tracing.current_span()
+    if current is None:
+        return client_call_details
+    metadata = [
+        (key, value)
+        for key, value in (client_call_details.metadata or ())
+        if key != tracing.HEADER
+    ]
+    metadata.append((tracing.HEADER, current.traceparent()))
+    return _CallDetails(
+        client_call_details.method,
+        client_call_details.timeout,
+        metadata,
+        client_call_details.credentials,
+        client_call_details.wait_for_ready,
+        client_call_details.compression,
+    )
+
+
+class _CallCounter(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    """Compte les appels passés sur un canal gRPC"""
+
+    def __init__(self, target):
+        self.target = target
+
+    def _count(self):
+        with _lock:
+            _grpc_stats[self.target]["calls"] += 1
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        self._count()
+        start = time.perf_counter()
+        with tracing.span(
+            f"grpc {client_call_details.method}", "client", target=self.target
+        ) as span:
+            call = continuation(_with_traceparent(client_call_details), request)
+            # Appel bloquant: la réponse (ou l'erreur) est déjà reçue ici
+            code = call.code()
+            span.set_attribute("grpc.code", code.name)
+            if code is not grpc.StatusCode.OK:
+                span.error = code.name
+        outbound.record(self.target, client_call_details.method, start, code.name)
+        return call
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        # Flux (StreamAll): compté et rattaché à la trace de l'appelant, sa
+        # durée dépend du rythme de lecture
+        self._count()
+        return continuation(_with_traceparent(client_call_details), request)
+
+
+def http_session(base_url):
+    """Retourne la session HTTP partagée pour un service (ex: http://movie:3001)"""
+    session = _sessions.get(base_url)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+def _http_request(method, base_url, path, **kwargs):
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    return outbound.http_request(
+        http_session(base_url), method, base_url, path, **kwargs
+    )
+
+
+def http_post(base_url, path, **kwargs):
+    return _http_request("POST", base_url, path, **kwargs)
+
+
+def http_get(base_url, path, **kwargs):
+    return _http_request("GET", base_url, path, **kwargs)
+
+
+def grpc_channel(target):
+    """Retourne le canal gRPC partagé (avec keepalive) vers `target`"""
+    channel = _channels.get(target)
+    if channel is not None:
+        return channel
+
+    with _lock:
+        channel = _channels.get(target)
+        if channel is None:
+            options = [
+                ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
+                ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
+                ("grpc.keepalive_permit_without_calls", 1),
+                ("grpc.http2.max_pings_without_data", 0),
+            ]
+            stats = _grpc_stats.setdefault(target, {"channels_opened": 0, "calls": 0})
+            stats["channels_opened"] += 1
+            channel = grpc.intercept_channel(
+                grpc.insecure_channel(target, options=options), _CallCounter(target)
+            )
+            _channels[target] = channel
+        return channel
+
+
+def schedule_stub(target):
+    """Retourne le stub Schedule partagé, construit sur le canal de `target`"""
+    stub = _stubs.get(target)
+    if stub is None:
+        stub = schedule_pb2_grpc.ScheduleStub(grpc_channel(target))
+        _stubs[target] = stub
+    return stub
+
+
+def connection_stats():
+    """Compteurs de réutilisation des connexions, par service cible"""
+    http = {}
+    with _lock:
+        sessions = dict(_sessions)
+        grpc_stats = {target: dict(stats) for target, stats in _grpc_stats.items()}
+
+    for base_url, session in sessions.items():
+        adapter = session.get_adapter(base_url)
+        opened = 0
+        sent = 0
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        http[base_url] = {
+            "connections_opened": opened,
+            "requests": sent,
+            "reused": max(sent - opened, 0),
+        }
+
+    for stats in grpc_stats.values():
+        stats["reused"] = max(stats["calls"] - stats["channels_opened"], 0)
+
+    return {"http": http, "grpc": grpc_stats}
+
+
+def close_all():
+    """Ferme toutes les connexions (arrêt du service)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        for channel in _channels.values():
+            channel.close()
+        _sessions.clear()
+        _channels.clear()
+        _stubs.clear()
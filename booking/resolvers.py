@@ -1,20 +1,55 @@
+import copy
 import json
 import os
 import requests
 import grpc
 import schedule_pb2
-import schedule_pb2_grpc
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from urllib.parse import quote_plus
 
+import booking_rows
+import clients
+import screenings
+from admin_check import is_admin
+from graphql_projection import mongo_projection
+from json_store import JsonStore
+from mongo_indexes import ensure_indexes
+from mongo_metrics import MongoCommandMetrics
+from mongo_tracing import MongoCommandTracing
+from pagination import check_first, mongo_page, split_page, store_page
+from ttl_cache import MISSING, TTLCache
+
 # URLs des autres microservices (utiliser les noms de services Docker)
-MOVIE_SERVICE_URL = "http://movie:3001"  # Service Movie en GraphQL
-SCHEDULE_SERVICE_URL = "schedule:3002"  # Service Schedule en gRPC
-USER_SERVICE_URL = "http://user:3203"
+MOVIE_SERVICE_URL = os.getenv(
+    "MOVIE_SERVICE_URL", "http://movie:3001"
+)  # Service Movie en GraphQL
+SCHEDULE_SERVICE_URL = os.getenv(
+    "SCHEDULE_SERVICE_URL", "schedule:3002"
+)  # Service Schedule en gRPC
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user:3203")
+
+# Cache local des films (LRU + TTL). Le service Movie publie un événement à
+# chaque modification (POST /events/movies) qui retire le film du cache; le
+# TTL borne la durée d'une entrée si un événement est perdu. Les films
+# introuvables sont aussi mis en cache, moins longtemps.
+movie_cache = TTLCache(
+    ttl=float(os.getenv("MOVIE_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("MOVIE_CACHE_SIZE", "4096")),
+    negative_ttl=float(os.getenv("MOVIE_CACHE_NEGATIVE_TTL", "10")),
+)
 
 PERSISTENCE_TYPE = os.getenv("PERSISTENCE_TYPE", "MONGODB")
 JSON_FILE_PATH = "{}/data/bookings.json".format(".")
 
+# Disposition des réservations en MongoDB: "nested" (un document par
+# utilisateur) ou "rows" (une ligne par réservation, voir booking_rows.py)
+BOOKING_STORAGE = os.getenv("BOOKING_STORAGE", "nested")
+USE_ROWS = PERSISTENCE_TYPE == "MONGODB" and BOOKING_STORAGE == "rows"
+
+# Nombre maximal de réservations par appel à create_bookings
+BOOKING_BATCH_MAX = int(os.getenv("BOOKING_BATCH_MAX", "100"))
+
 # Connexion MongoDB
 # Le mot de passe est encodé dans docker-compose.yml, sinon on utilise l'encodage par défaut
 default_password = quote_plus("*65%8XPuGaQ#")
@@ -25,10 +60,16 @@ MONGO_URL = os.getenv(
 client = None
 db = None
 collection = None
+rows = None
+store = None
 
 if PERSISTENCE_TYPE == "MONGODB":
     # Connexion avec retry automatique (pymongo gère les reconnexions)
-    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    client = MongoClient(
+        MONGO_URL,
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[MongoCommandMetrics(), MongoCommandTracing()],
+    )
     db = client["bookings"]
     collection = db["bookings"]
 
@@ -44,29 +85,47 @@ if PERSISTENCE_TYPE == "MONGODB":
         print(
             f"Base de données MongoDB déjà initialisée: {collection.count_documents({})} réservations"
         )
-else:
-    print(f"Utilisation de la persistance JSON (Fichier: {JSON_FILE_PATH})")
-
 
-def get_json_data():
-    try:
-        with open(JSON_FILE_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"bookings": []}
+    # Un document de réservations par utilisateur
+    ensure_indexes(collection, [("userid", {"unique": True})])
+
+    if USE_ROWS:
+        # Premier démarrage en lignes: copie des documents imbriqués existants
+        first_start = booking_rows.COLLECTION not in db.list_collection_names()
+        rows = db[booking_rows.COLLECTION]
+        ensure_indexes(rows, booking_rows.INDEXES)
+        if first_start:
+            count = booking_rows.migrate_to_rows(collection, rows)
+            print(
+                f"Réservations copiées en lignes ({booking_rows.COLLECTION}): {count}"
+            )
 
+    # Compteurs de places par séance, calculés au premier démarrage
+    if screenings.init(db):
+        count = screenings.seed(
+            booking_rows.group(rows.find({}, {"_id": 0}).sort(booking_rows.ROW_SORT))
+            if USE_ROWS
+            else collection.find({}, {"_id": 0})
+        )
+        print(f"Compteurs de places initialisés: {count} séances")
+else:
+    print(f"Utilisation de la persistance JSON (Fichier: {JSON_FILE_PATH})")
+    store = JsonStore(JSON_FILE_PATH, "bookings", "userid")
 
-def save_json_data(data):
-    with open(JSON_FILE_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    if screenings.init():
+        count = screenings.seed(store.all())
+        print(f"Compteurs de places initialisés: {count} séances")
 
 
 def get_movie_details(movie_id):
-    """Récupère les détails d'un film depuis le service Movie via GraphQL"""
+    """Récupère les détails d'un film (cache local, sinon service Movie via GraphQL)"""
+    cached = movie_cache.get(movie_id)
+    if cached is not MISSING:
+        return cached
+
     try:
         # Requête GraphQL vers le service Movie
-        query = (
-            """
+        query = """
         query {
             movie_by_id(id: "%s") {
                 id
@@ -75,40 +134,186 @@ def get_movie_details(movie_id):
                 director
             }
         }
-        """
-            % movie_id
-        )
+        """ % movie_id
 
-        response = requests.post(f"{MOVIE_SERVICE_URL}/graphql", json={"query": query})
+        response = clients.http_post(
+            MOVIE_SERVICE_URL, "/graphql", json={"query": query}
+        )
         if response.status_code == 200:
             result = response.json()
             # GraphQL retourne les données dans result['data']
-            if "data" in result and result["data"]["movie_by_id"]:
-                return result["data"]["movie_by_id"]
+            if result.get("data") is not None:
+                movie = result["data"]["movie_by_id"]
+                movie_cache.set(movie_id, movie)
+                return movie
         return None
     except requests.RequestException:
         return None
 
 
+def get_movies_details(movie_ids):
+    """Récupère plusieurs films en un seul appel GraphQL au service Movie.
+
+    Retourne un dictionnaire {id: film}; les films introuvables sont absents.
+    Seuls les films absents du cache local sont demandés.
+    """
+    movies = {}
+    missing = []
+    for movie_id in dict.fromkeys(movie_ids):
+        cached = movie_cache.get(movie_id)
+        if cached is MISSING:
+            missing.append(movie_id)
+        elif cached is not None:
+            movies[movie_id] = cached
+    if not missing:
+        return movies
+
+    try:
+        query = """
+        query($ids: [String!]!) {
+            movies_by_ids(ids: $ids) {
+                id
+                title
+                rating
+                director
+            }
+        }
+        """
+
+        response = clients.http_post(
+            MOVIE_SERVICE_URL,
+            "/graphql",
+            json={"query": query, "variables": {"ids": missing}},
+        )
+        if response.status_code == 200:
+            result = response.json()
+            if result.get("data") is not None:
+                found = {
+                    movie["id"]: movie for movie in result["data"]["movies_by_ids"]
+                }
+                for movie_id in missing:
+                    movie_cache.set(movie_id, found.get(movie_id))
+                movies.update(found)
+        return movies
+    except requests.RequestException:
+        return movies
+
+
+class MovieLoader:
+    """Regroupe les films demandés pendant une requête GraphQL.
+
+    Les résolveurs déclarent les IDs dont ils ont besoin avec `load`, puis
+    `dispatch` les récupère tous en un seul appel au service Movie.
+    """
+
+    def __init__(self):
+        self._movies = {}
+        self._pending = set()
+
+    def load(self, movie_id):
+        if movie_id not in self._movies:
+            self._pending.add(movie_id)
+
+    def load_many(self, movie_ids):
+        for movie_id in movie_ids:
+            self.load(movie_id)
+
+    def dispatch(self):
+        if not self._pending:
+            return
+        pending = sorted(self._pending)
+        self._pending.clear()
+        found = get_movies_details(pending)
+        for movie_id in pending:
+            self._movies[movie_id] = found.get(movie_id)
+
+    def get(self, movie_id):
+        if movie_id not in self._movies:
+            self.load(movie_id)
+            self.dispatch()
+        return self._movies.get(movie_id)
+
+
+def get_movie_loader(info):
+    """Retourne le MovieLoader de la requête en cours (un par requête GraphQL)"""
+    context = getattr(info, "context", None)
+    if context is None:
+        return MovieLoader()
+    if isinstance(context, dict):
+        # Contexte ASGI d'Ariadne: {"request": ...}
+        return context.setdefault("movie_loader", MovieLoader())
+    loader = getattr(context, "movie_loader", None)
+    if loader is None:
+        loader = MovieLoader()
+        setattr(context, "movie_loader", loader)
+    return loader
+
+
 def get_schedule_by_date(date):
     """Récupère le planning d'une date depuis le service Schedule via gRPC"""
     try:
-        # Connexion au service Schedule via gRPC
-        with grpc.insecure_channel(SCHEDULE_SERVICE_URL) as channel:
-            stub = schedule_pb2_grpc.ScheduleStub(channel)
-            request = schedule_pb2.Date(date=date)
-            response = stub.GetByDate(request)
-
-            # Le proto retourne maintenant une liste, on prend le premier élément s'il existe
-            if response.list and len(response.list) > 0:
-                day_schedule = response.list[0]
-                return {"date": day_schedule.date, "movies": list(day_schedule.movies)}
-            return None
+        # Canal gRPC partagé vers le service Schedule
+        stub = clients.schedule_stub(SCHEDULE_SERVICE_URL)
+        request = schedule_pb2.Date(date=date)
+        response = stub.GetByDate(request)
+
+        # Le proto retourne maintenant une liste, on prend le premier élément s'il existe
+        if response.list and len(response.list) > 0:
+            day_schedule = response.list[0]
+            return {"date": day_schedule.date, "movies": list(day_schedule.movies)}
+        return None
     except grpc.RpcError as e:
         print(f"Erreur gRPC lors de la récupération du planning: {e}")
         return None
 
 
+def get_schedules_by_dates(dates):
+    """Récupère le planning de plusieurs dates en un seul appel gRPC.
+
+    Retourne un dictionnaire {date: planning}; les dates sans programmation
+    sont absentes.
+    """
+    dates = list(dict.fromkeys(dates))
+    if not dates:
+        return {}
+
+    try:
+        stub = clients.schedule_stub(SCHEDULE_SERVICE_URL)
+        request = schedule_pb2.DateList(dates=dates)
+        response = stub.GetByDates(request)
+
+        return {
+            day_schedule.date: {
+                "date": day_schedule.date,
+                "movies": list(day_schedule.movies),
+            }
+            for day_schedule in response.list
+        }
+    except grpc.RpcError as e:
+        print(f"Erreur gRPC lors de la récupération du planning: {e}")
+        return {}
+
+
+def stream_schedule(start=None, end=None, batch_size=0):
+    """Parcourt le planning (optionnellement entre deux dates) via StreamAll.
+
+    Les entrées sont produites au fur et à mesure de la réception des lots,
+    sans charger tout le planning en mémoire. Une erreur gRPC, même après
+    les premiers lots, interrompt le parcours par une erreur GraphQL.
+    """
+    stub = clients.schedule_stub(SCHEDULE_SERVICE_URL)
+    request = schedule_pb2.DateRange(
+        start=start or "", end=end or "", batch_size=batch_size
+    )
+    try:
+        for day_schedule_list in stub.StreamAll(request):
+            for day_schedule in day_schedule_list.list:
+                yield {"date": day_schedule.date, "movies": list(day_schedule.movies)}
+    except grpc.RpcError as e:
+        print(f"Erreur gRPC lors de la récupération du planning: {e}")
+        raise Exception(f"Planning indisponible ({e.code().name})")
+
+
 def get_schedule_details(movie_id, date):
     """Vérifie si un film est programmé à une date donnée"""
     schedule = get_schedule_by_date(date)
@@ -120,7 +325,7 @@ def get_schedule_details(movie_id, date):
 def get_user_details(userid):
     """Récupère les détails d'un utilisateur depuis le service User"""
     try:
-        response = requests.get(f"{USER_SERVICE_URL}/users/{userid}")
+        response = clients.http_get(USER_SERVICE_URL, f"/users/{userid}")
         if response.status_code == 200:
             return response.json()
         return None
@@ -129,11 +334,22 @@ def get_user_details(userid):
 
 
 def is_admin_user(userid):
-    """Vérifie si l'utilisateur est un administrateur"""
-    user_details = get_user_details(userid)
-    if user_details and user_details.get("role") == "admin":
-        return True
-    return False
+    """Vérifie si l'utilisateur est un administrateur (résultat mis en cache)"""
+    return is_admin(
+        userid, lambda uid: clients.http_get(USER_SERVICE_URL, f"/users/{uid}")
+    )
+
+
+def evict_movie(event):
+    """Retire du cache le film d'un événement du service Movie.
+
+    `event` = {"event": "movie_added" | "movie_updated" | "movie_deleted", "id": ...}
+    """
+    movie_id = event.get("id") if isinstance(event, dict) else None
+    if not movie_id:
+        raise ValueError("id du film manquant")
+    movie_cache.invalidate(str(movie_id))
+    return {"evicted": str(movie_id), "event": event.get("event")}
 
 
 # ============================================================================
@@ -141,67 +357,105 @@ def is_admin_user(userid):
 # ============================================================================
 
 
-def all_bookings_resolver(obj, info, userid):
-    """Récupère toutes les réservations (accès admin uniquement)"""
+def bookings_page(info, first=None, after=None, path=()):
+    """(réservations, curseur suivant ou None): `first` utilisateurs après `after`"""
+    if USE_ROWS:
+        check_first(first)
+        match = {} if after is None else {"userid": {"$gt": str(after)}}
+        limit = None if first is None else first + 1
+        return split_page(
+            list(rows.aggregate(booking_rows.grouped_pipeline(match, limit))),
+            first,
+            "userid",
+        )
+    elif PERSISTENCE_TYPE == "MONGODB":
+        return mongo_page(
+            collection,
+            "userid",
+            first,
+            after,
+            projection=mongo_projection(info, always=("userid",), path=path),
+        )
+    else:
+        return store_page(store, first, after)
+
+
+def check_admin_user(userid):
     if not userid:
         raise Exception("userid requis pour accéder aux réservations")
 
     if not is_admin_user(userid):
         raise Exception("Accès refusé - droits administrateur requis")
 
-    if PERSISTENCE_TYPE == "MONGODB":
-        bookings_list = list(collection.find({}))
-        # Convertir ObjectId en string pour JSON
-        for booking in bookings_list:
-            if "_id" in booking:
-                booking["_id"] = str(booking["_id"])
-        return bookings_list
-    else:
-        data = get_json_data()
-        return data.get("bookings", [])
+
+def all_bookings_resolver(obj, info, userid, first=None, after=None):
+    """Récupère toutes les réservations (accès admin uniquement).
+
+    Avec `first`/`after`: page de `first` utilisateurs après le userid `after`.
+    """
+    check_admin_user(userid)
+    bookings_list, _ = bookings_page(info, first, after)
+    return bookings_list
+
+
+def bookings_page_resolver(obj, info, userid, first, after=None):
+    """Page de réservations avec le curseur de la suivante (accès admin uniquement)"""
+    check_admin_user(userid)
+    bookings_list, next_cursor = bookings_page(info, first, after, path=("bookings",))
+    return {"bookings": bookings_list, "next_cursor": next_cursor}
 
 
 def bookings_by_user_resolver(obj, info, userid):
     """Récupère toutes les réservations d'un utilisateur"""
-    if PERSISTENCE_TYPE == "MONGODB":
+    if USE_ROWS:
+        return find_user_rows(userid)
+    elif PERSISTENCE_TYPE == "MONGODB":
         booking = collection.find_one({"userid": userid})
         if booking and "_id" in booking:
             booking["_id"] = str(booking["_id"])
         return booking
     else:
-        data = get_json_data()
-        for booking in data.get("bookings", []):
-            if booking["userid"] == userid:
-                return booking
-        return None
+        return store.get(userid)
 
 
-def detailed_bookings_by_user_resolver(obj, info, userid):
-    """Récupère les réservations détaillées d'un utilisateur avec infos des films et horaires"""
-    user_booking = None
+def find_user_booking(userid):
+    """Retourne le document de réservations d'un utilisateur, ou None"""
+    if USE_ROWS:
+        return find_user_rows(userid)
     if PERSISTENCE_TYPE == "MONGODB":
-        user_booking = collection.find_one({"userid": userid})
-    else:
-        data = get_json_data()
-        for booking in data.get("bookings", []):
-            if booking["userid"] == userid:
-                user_booking = booking
-                break
+        return collection.find_one({"userid": userid})
+    return store.get(userid)
+
+
+def find_user_rows(userid):
+    """Réservations d'un utilisateur regroupées depuis ses lignes, ou None"""
+    found = booking_rows.group(
+        rows.find({"userid": userid}, {"_id": 0}).sort(booking_rows.ROW_SORT)
+    )
+    return found[0] if found else None
+
+
+def booked_movies_and_dates(user_booking):
+    """IDs des films et dates d'un document de réservations (sans doublons)"""
+    movie_ids = []
+    for date_entry in user_booking["dates"]:
+        movie_ids.extend(date_entry["movies"])
+    dates = [date_entry["date"] for date_entry in user_booking["dates"]]
+    return list(dict.fromkeys(movie_ids)), dates
 
-    if not user_booking:
-        return None
 
+def build_detailed_bookings(userid, user_booking, movies, schedules):
+    """Assemble la réponse détaillée à partir des films et plannings récupérés"""
     detailed_bookings = []
     for date_entry in user_booking["dates"]:
         date = date_entry["date"]
         movies_details = []
 
-        # Récupération du planning de la date
-        schedule_details = get_schedule_by_date(date)
+        schedule_details = schedules.get(date)
 
         # Récupération des détails pour chaque film réservé
         for movie_id in date_entry["movies"]:
-            movie_details = get_movie_details(movie_id)
+            movie_details = movies.get(movie_id)
 
             if movie_details and schedule_details:
                 movies_details.append(
@@ -214,6 +468,32 @@ def detailed_bookings_by_user_resolver(obj, info, userid):
     return {"userid": userid, "bookings": detailed_bookings}
 
 
+def detailed_bookings_by_user_resolver(obj, info, userid):
+    """Récupère les réservations détaillées d'un utilisateur avec infos des films et horaires"""
+    user_booking = find_user_booking(userid)
+    if not user_booking:
+        return None
+
+    movie_ids, dates = booked_movies_and_dates(user_booking)
+
+    # Récupération de tous les films réservés en un seul appel au service Movie
+    movie_loader = get_movie_loader(info)
+    movie_loader.load_many(movie_ids)
+    movie_loader.dispatch()
+    movies = {movie_id: movie_loader.get(movie_id) for movie_id in movie_ids}
+
+    # Récupération du planning de toutes les dates en un seul appel gRPC
+    schedules = get_schedules_by_dates(dates)
+
+    return build_detailed_bookings(userid, user_booking, movies, schedules)
+
+
+def availability_resolver(obj, info, date):
+    """Places restantes des séances d'une date, lues dans les compteurs"""
+    schedule = get_schedule_by_date(date)
+    return screenings.availability(date, schedule["movies"] if schedule else ())
+
+
 # ============================================================================
 # MUTATION RESOLVERS
 # ============================================================================
@@ -235,77 +515,7 @@ def create_booking_resolver(obj, info, input):
     if not schedule_details:
         raise Exception("Film non programmé à cette date")
 
-    if PERSISTENCE_TYPE == "MONGODB":
-        # Recherche ou création de l'utilisateur
-        user_booking = collection.find_one({"userid": userid})
-
-        if not user_booking:
-            user_booking = {"userid": userid, "dates": []}
-            collection.insert_one(user_booking)
-
-        # Recherche ou création de la date
-        date_entry = None
-        date_index = -1
-        for i, date_item in enumerate(user_booking["dates"]):
-            if date_item["date"] == date:
-                date_entry = date_item
-                date_index = i
-                break
-
-        if not date_entry:
-            date_entry = {"date": date, "movies": []}
-            user_booking["dates"].append(date_entry)
-            date_index = len(user_booking["dates"]) - 1
-
-        # Vérification des doublons
-        if movieid in date_entry["movies"]:
-            raise Exception("Film déjà réservé pour cette date")
-
-        # Ajout de la réservation
-        date_entry["movies"].append(movieid)
-        user_booking["dates"][date_index] = date_entry
-        collection.update_one(
-            {"userid": userid}, {"$set": {"dates": user_booking["dates"]}}
-        )
-    else:
-        data = get_json_data()
-        bookings = data.get("bookings", [])
-        user_booking = None
-        user_booking_index = -1
-
-        for i, b in enumerate(bookings):
-            if b["userid"] == userid:
-                user_booking = b
-                user_booking_index = i
-                break
-
-        if not user_booking:
-            user_booking = {"userid": userid, "dates": []}
-            bookings.append(user_booking)
-            user_booking_index = len(bookings) - 1
-
-        date_entry = None
-        date_index = -1
-        for i, date_item in enumerate(user_booking["dates"]):
-            if date_item["date"] == date:
-                date_entry = date_item
-                date_index = i
-                break
-
-        if not date_entry:
-            date_entry = {"date": date, "movies": []}
-            user_booking["dates"].append(date_entry)
-            date_index = len(user_booking["dates"]) - 1
-
-        if movieid in date_entry["movies"]:
-            raise Exception("Film déjà réservé pour cette date")
-
-        date_entry["movies"].append(movieid)
-        user_booking["dates"][date_index] = date_entry
-        bookings[user_booking_index] = user_booking
-
-        data["bookings"] = bookings
-        save_json_data(data)
+    add_booking(userid, movieid, date)
 
     return {
         "message": "Réservation créée avec succès",
@@ -313,99 +523,386 @@ def create_booking_resolver(obj, info, input):
     }
 
 
-def delete_booking_resolver(obj, info, userid, movieid, date):
-    """Supprimer une réservation spécifique"""
-    if PERSISTENCE_TYPE == "MONGODB":
-        booking = collection.find_one({"userid": userid})
-        if not booking:
-            raise Exception("Réservation non trouvée")
+def add_booking(userid, movieid, date):
+    """Enregistre la réservation (film et programmation déjà vérifiés).
 
-        updated_dates = []
-        found = False
-        for date_entry in booking["dates"]:
-            if date_entry["date"] == date and movieid in date_entry["movies"]:
-                found = True
-                # Suppression du film de la réservation
-                date_entry["movies"].remove(movieid)
-                # Garder la date seulement si elle a encore des films
-                if date_entry["movies"]:
-                    updated_dates.append(date_entry)
-            else:
-                updated_dates.append(date_entry)
-
-        if not found:
-            raise Exception("Réservation non trouvée")
+    La place est prise sur le compteur de la séance avant l'écriture, et
+    rendue si l'écriture échoue (doublon, erreur MongoDB): store_booking
+    n'écrit qu'avec des opérations atomiques, une réservation comptée est
+    donc toujours enregistrée.
+    """
+    screenings.reserve(date, movieid)
+    try:
+        store_booking(userid, movieid, date)
+    except Exception:
+        screenings.release(date, movieid)
+        raise
+
+
+def store_booking(userid, movieid, date):
+    """Écrit la réservation dans le stockage"""
+    if USE_ROWS:
+        # Insertion atomique, l'index unique refuse les doublons
+        try:
+            rows.insert_one({"userid": userid, "date": date, "movieid": movieid})
+        except DuplicateKeyError:
+            raise Exception("Film déjà réservé pour cette date") from None
+    elif PERSISTENCE_TYPE == "MONGODB":
+        # Mises à jour atomiques: deux réservations simultanées du même
+        # utilisateur ne s'écrasent pas
+        while True:
+            # Date déjà réservée: ajout du film s'il n'y est pas encore
+            result = collection.update_one(
+                {"userid": userid, "dates": {"$elemMatch": {"date": date}}},
+                {"$addToSet": {"dates.$.movies": movieid}},
+            )
+            if result.matched_count:
+                if not result.modified_count:
+                    raise Exception("Film déjà réservé pour cette date")
+                return
+            # Nouvelle date (et nouvel utilisateur si besoin)
+            try:
+                collection.update_one(
+                    {"userid": userid, "dates.date": {"$ne": date}},
+                    {"$push": {"dates": {"date": date, "movies": [movieid]}}},
+                    upsert=True,
+                )
+                return
+            except DuplicateKeyError:
+                # Date ajoutée entre-temps par une autre réservation
+                continue
+    else:
+        with store.lock:
+            # Copie du document pour ne pas modifier le cache en cas d'erreur
+            user_booking = copy.deepcopy(store.get(userid)) or {
+                "userid": userid,
+                "dates": [],
+            }
 
-        # Mise à jour ou suppression de la réservation
-        if not updated_dates:
-            collection.delete_one({"userid": userid})
+            date_entry = None
+            for date_item in user_booking["dates"]:
+                if date_item["date"] == date:
+                    date_entry = date_item
+                    break
+
+            if not date_entry:
+                date_entry = {"date": date, "movies": []}
+                user_booking["dates"].append(date_entry)
+
+            if movieid in date_entry["movies"]:
+                raise Exception("Film déjà réservé pour cette date")
+
+            date_entry["movies"].append(movieid)
+            store.put(user_booking)
+
+
+def create_bookings_resolver(obj, info, inputs):
+    """Créer plusieurs réservations en une fois.
+
+    Les films et les programmations sont vérifiés en un appel chacun, puis
+    les réservations valides sont écrites en une opération (un bulk_write de
+    mises à jour atomiques en imbriqué). Le résultat
+    indique le succès ou l'échec de chaque réservation.
+    """
+    check_booking_batch(inputs)
+    movies = get_movies_details([item["movieid"] for item in inputs])
+    schedules = get_schedules_by_dates([item["date"] for item in inputs])
+    results = validate_bookings(inputs, movies, schedules)
+    add_bookings(results)
+    return bulk_booking_response(results)
+
+
+def check_booking_batch(inputs):
+    if len(inputs) > BOOKING_BATCH_MAX:
+        raise Exception(f"Trop de réservations demandées (maximum {BOOKING_BATCH_MAX})")
+
+
+def validate_bookings(inputs, movies, schedules):
+    """Résultat de chaque réservation demandée; success=None si elle reste à écrire"""
+    results = []
+    seen = set()
+    for item in inputs:
+        result = {
+            "userid": item["userid"],
+            "movieid": item["movieid"],
+            "date": item["date"],
+            "success": None,
+            "message": None,
+        }
+        schedule = schedules.get(item["date"])
+        key = (item["userid"], item["date"], item["movieid"])
+        if item["movieid"] not in movies:
+            fail_booking(result, "Film non trouvé")
+        elif not schedule or item["movieid"] not in schedule["movies"]:
+            fail_booking(result, "Film non programmé à cette date")
+        elif key in seen:
+            fail_booking(result, "Film déjà réservé pour cette date")
+        seen.add(key)
+        results.append(result)
+    return results
+
+
+def fail_booking(result, message):
+    result["success"] = False
+    result["message"] = message
+
+
+def add_bookings(results):
+    """Écrit les réservations validées (success=None) et complète leurs résultats"""
+    reserved = []
+    for result in results:
+        if result["success"] is not None:
+            continue
+        try:
+            screenings.reserve(result["date"], result["movieid"])
+            reserved.append(result)
+        except Exception as e:
+            fail_booking(result, str(e))
+
+    if not reserved:
+        return
+    try:
+        errors = store_bookings(reserved)
+    except Exception:
+        for result in reserved:
+            screenings.release(result["date"], result["movieid"])
+        raise
+
+    for result, error in zip(reserved, errors):
+        if error:
+            screenings.release(result["date"], result["movieid"])
+            fail_booking(result, error)
         else:
-            collection.update_one(
-                {"userid": userid}, {"$set": {"dates": updated_dates}}
+            result["success"] = True
+            result["message"] = "Réservation créée avec succès"
+
+
+def store_bookings(items):
+    """Écrit plusieurs réservations; retourne l'erreur de chacune"""
+    if USE_ROWS:
+        errors = [None] * len(items)
+        try:
+            rows.insert_many(
+                [
+                    {
+                        "userid": item["userid"],
+                        "date": item["date"],
+                        "movieid": item["movieid"],
+                    }
+                    for item in items
+                ],
+                ordered=False,
             )
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                if error["code"] != 11000:
+                    raise
+                errors[error["index"]] = "Film déjà réservé pour cette date"
+        return errors
+    elif PERSISTENCE_TYPE == "MONGODB":
+        return store_nested_bookings(items)
     else:
-        data = get_json_data()
-        bookings = data.get("bookings", [])
-        booking = None
-        booking_index = -1
-
-        for i, b in enumerate(bookings):
-            if b["userid"] == userid:
-                booking = b
-                booking_index = i
-                break
-
-        if not booking:
-            raise Exception("Réservation non trouvée")
+        with store.lock:
+            bookings = {}
+            for item in items:
+                booking = store.get(item["userid"])
+                if booking is not None:
+                    bookings[item["userid"]] = copy.deepcopy(booking)
+            errors, changed = apply_bookings(bookings, items)
+            if changed:
+                store.put_many(changed)
+        return errors
+
+
+def store_nested_bookings(items):
+    """Écrit plusieurs réservations imbriquées en une lecture et un bulk_write.
+
+    Mêmes mises à jour atomiques que store_booking (réécrire le tableau dates
+    perdrait les réservations simultanées), envoyées ensemble: ajout du film
+    à une date déjà réservée, ou ajout de la date avec ses films. Chaque
+    opération qui échoue (date ou film ajouté entre-temps, nouvel utilisateur
+    créé en même temps) désigne ses réservations, reprises une par une par
+    store_booking.
+    """
+    userids = list(dict.fromkeys(item["userid"] for item in items))
+    booked = {
+        (booking["userid"], entry["date"]): set(entry["movies"])
+        for booking in collection.find(
+            {"userid": {"$in": userids}}, {"_id": 0, "userid": 1, "dates": 1}
+        )
+        for entry in booking.get("dates", [])
+    }
 
-        updated_dates = []
-        found = False
-        for date_entry in booking["dates"]:
-            if date_entry["date"] == date and movieid in date_entry["movies"]:
-                found = True
-                date_entry["movies"].remove(movieid)
-                if date_entry["movies"]:
-                    updated_dates.append(date_entry)
-            else:
-                updated_dates.append(date_entry)
+    errors = [None] * len(items)
+    operations = []
+    targets = []  # indices des réservations écrites par chaque opération
+    new_dates = {}  # (userid, date) -> indices des réservations
+    for index, item in enumerate(items):
+        userid, date, movieid = item["userid"], item["date"], item["movieid"]
+        movies = booked.get((userid, date))
+        if movies is None:
+            new_dates.setdefault((userid, date), []).append(index)
+        elif movieid in movies:
+            errors[index] = "Film déjà réservé pour cette date"
+        else:
+            # Sans correspondance (film réservé entre-temps), l'upsert échoue
+            # sur l'opérateur positionnel: l'erreur désigne la réservation
+            operations.append(
+                UpdateOne(
+                    {
+                        "userid": userid,
+                        "dates": {
+                            "$elemMatch": {"date": date, "movies": {"$ne": movieid}}
+                        },
+                    },
+                    {"$push": {"dates.$.movies": movieid}},
+                    upsert=True,
+                )
+            )
+            targets.append([index])
+    for (userid, date), indices in new_dates.items():
+        movies = [items[index]["movieid"] for index in indices]
+        operations.append(
+            UpdateOne(
+                {"userid": userid, "dates.date": {"$ne": date}},
+                {"$push": {"dates": {"date": date, "movies": movies}}},
+                upsert=True,
+            )
+        )
+        targets.append(indices)
+    if not operations:
+        return errors
+
+    try:
+        result = collection.bulk_write(operations, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+    for error in result["writeErrors"]:
+        for index in targets[error["index"]]:
+            item = items[index]
+            try:
+                store_booking(item["userid"], item["movieid"], item["date"])
+            except Exception as e:
+                errors[index] = str(e)
+    return errors
+
+
+def apply_bookings(bookings, items):
+    """Ajoute les réservations aux documents {userid: réservations}.
+
+    Retourne l'erreur de chaque réservation (None si ajoutée) et les
+    documents modifiés.
+    """
+    errors = []
+    changed = {}
+    for item in items:
+        booking = bookings.setdefault(
+            item["userid"], {"userid": item["userid"], "dates": []}
+        )
+        date_entry = next(
+            (entry for entry in booking["dates"] if entry["date"] == item["date"]),
+            None,
+        )
+        if date_entry is None:
+            date_entry = {"date": item["date"], "movies": []}
+            booking["dates"].append(date_entry)
+        if item["movieid"] in date_entry["movies"]:
+            errors.append("Film déjà réservé pour cette date")
+            continue
+        date_entry["movies"].append(item["movieid"])
+        changed[item["userid"]] = booking
+        errors.append(None)
+    return errors, list(changed.values())
+
+
+def bulk_booking_response(results):
+    created = sum(1 for result in results if result["success"])
+    return {
+        "message": f"{created} réservation(s) créée(s) sur {len(results)}",
+        "created": created,
+        "results": results,
+    }
 
-        if not found:
+
+def delete_booking_resolver(obj, info, userid, movieid, date):
+    """Supprimer une réservation spécifique"""
+    if USE_ROWS:
+        result = rows.delete_one({"userid": userid, "date": date, "movieid": movieid})
+        if result.deleted_count == 0:
             raise Exception("Réservation non trouvée")
+    elif PERSISTENCE_TYPE == "MONGODB":
+        result = collection.update_one(
+            {
+                "userid": userid,
+                "dates": {"$elemMatch": {"date": date, "movies": movieid}},
+            },
+            {"$pull": {"dates.$.movies": movieid}},
+        )
+        if not result.modified_count:
+            raise Exception("Réservation non trouvée")
+        # Retrait de la date si elle n'a plus de films, puis du document vide
+        collection.update_one(
+            {"userid": userid},
+            {"$pull": {"dates": {"date": date, "movies": {"$size": 0}}}},
+        )
+        collection.delete_one({"userid": userid, "dates": {"$size": 0}})
+    else:
+        with store.lock:
+            booking = copy.deepcopy(store.get(userid))
+            if not booking:
+                raise Exception("Réservation non trouvée")
+
+            updated_dates = []
+            found = False
+            for date_entry in booking["dates"]:
+                if date_entry["date"] == date and movieid in date_entry["movies"]:
+                    found = True
+                    date_entry["movies"].remove(movieid)
+                    if date_entry["movies"]:
+                        updated_dates.append(date_entry)
+                else:
+                    updated_dates.append(date_entry)
 
-        if not updated_dates:
-            bookings.pop(booking_index)
-        else:
-            booking["dates"] = updated_dates
-            bookings[booking_index] = booking
+            if not found:
+                raise Exception("Réservation non trouvée")
 
-        data["bookings"] = bookings
-        save_json_data(data)
+            if not updated_dates:
+                store.delete(userid)
+            else:
+                booking["dates"] = updated_dates
+                store.put(booking)
 
+    screenings.release(date, movieid)
     return {"message": "Réservation supprimée avec succès"}
 
 
 def delete_all_user_bookings_resolver(obj, info, userid):
     """Supprimer toutes les réservations d'un utilisateur"""
-    if PERSISTENCE_TYPE == "MONGODB":
-        result = collection.delete_one({"userid": userid})
-        if result.deleted_count == 0:
-            raise Exception("Aucune réservation trouvée pour cet utilisateur")
+    if USE_ROWS:
+        # Les lignes lues sont supprimées en une seule opération
+        deleted = list(rows.find({"userid": userid}, {"date": 1, "movieid": 1}))
+        if deleted:
+            rows.delete_many(
+                {"userid": userid, "_id": {"$in": [row["_id"] for row in deleted]}}
+            )
+    elif PERSISTENCE_TYPE == "MONGODB":
+        booking = collection.find_one_and_delete({"userid": userid})
+        deleted = booking_rows.flatten(booking) if booking else []
     else:
-        data = get_json_data()
-        bookings = data.get("bookings", [])
-        new_bookings = []
-        found = False
-
-        for b in bookings:
-            if b["userid"] == userid:
-                found = True
-            else:
-                new_bookings.append(b)
+        booking = store.delete(userid)
+        deleted = booking_rows.flatten(booking) if booking else []
 
-        if not found:
-            raise Exception("Aucune réservation trouvée pour cet utilisateur")
-
-        data["bookings"] = new_bookings
-        save_json_data(data)
+    if not deleted:
+        raise Exception("Aucune réservation trouvée pour cet utilisateur")
+    for row in deleted:
+        screenings.release(row["date"], row["movieid"])
 
     return {"message": f"Toutes les réservations de {userid} ont été supprimées"}
+
+
+def set_screening_capacity_resolver(obj, info, userid, date, movieid, capacity):
+    """Change la capacité d'une séance (accès admin uniquement)"""
+    if not is_admin_user(userid):
+        raise Exception("Accès refusé - droits administrateur requis")
+
+    return screenings.set_capacity(date, movieid, capacity)
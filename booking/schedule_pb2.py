@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0eschedule.proto\x12\x08schedule\"+\n\x0b\x44\x61ySchedule\x12\x0c\n\x04\x64\x61te\x18\x01 \x01(\t\x12\x0e\n\x06movies\x18\x02 \x03(\t\"6\n\x0f\x44\x61yScheduleList\x12#\n\x04list\x18\x01 \x03(\x0b\x32\x15.schedule.DaySchedule\"\x14\n\x04\x44\x61te\x12\x0c\n\x04\x64\x61te\x18\x01 \x01(\t\"!\n\x05Movie\x12\x0c\n\x04\x64\x61te\x18\x02 \x01(\t\x12\n\n\x02id\x18\x01 \x01(\t\"\x07\n\x05\x45mpty2\xeb\x01\n\x08Schedule\x12\x33\n\rAddToSchedule\x12\x0f.schedule.Movie\x1a\x0f.schedule.Empty\"\x00\x12\x38\n\x12RemoveFromSchedule\x12\x0f.schedule.Movie\x1a\x0f.schedule.Empty\"\x00\x12\x36\n\x06GetAll\x12\x0f.schedule.Empty\x1a\x19.schedule.DayScheduleList\"\x00\x12\x38\n\tGetByDate\x12\x0e.schedule.Date\x1a\x19.schedule.DayScheduleList\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0eschedule.proto\x12\x08schedule\"+\n\x0b\x44\x61ySchedule\x12\x0c\n\x04\x64\x61te\x18\x01 \x01(\t\x12\x0e\n\x06movies\x18\x02 \x03(\t\"6\n\x0f\x44\x61yScheduleList\x12#\n\x04list\x18\x01 \x03(\x0b\x32\x15.schedule.DaySchedule\"\x14\n\x04\x44\x61te\x12\x0c\n\x04\x64\x61te\x18\x01 \x01(\t\"\x19\n\x08\x44\x61teList\x12\r\n\x05\x64\x61tes\x18\x01 \x03(\t\";\n\tDateRange\x12\r\n\x05start\x18\x01 \x01(\t\x12\x0b\n\x03\x65nd\x18\x02 \x01(\t\x12\x12\n\nbatch_size\x18\x03 \x01(\x05\"!\n\x05Movie\x12\x0c\n\x04\x64\x61te\x18\x02 \x01(\t\x12\n\n\x02id\x18\x01 \x01(\t\"\x07\n\x05\x45mpty2\xeb\x02\n\x08Schedule\x12\x33\n\rAddToSchedule\x12\x0f.schedule.Movie\x1a\x0f.schedule.Empty\"\x00\x12\x38\n\x12RemoveFromSchedule\x12\x0f.schedule.Movie\x1a\x0f.schedule.Empty\"\x00\x12\x36\n\x06GetAll\x12\x0f.schedule.Empty\x1a\x19.schedule.DayScheduleList\"\x00\x12\x38\n\tGetByDate\x12\x0e.schedule.Date\x1a\x19.schedule.DayScheduleList\"\x00\x12=\n\nGetByDates\x12\x12.schedule.DateList\x1a\x19.schedule.DayScheduleList\"\x00\x12?\n\tStreamAll\x12\x13.schedule.DateRange\x1a\x19.schedule.DayScheduleList\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -37,10 +37,14 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_DAYSCHEDULELIST']._serialized_end=127
   _globals['_DATE']._serialized_start=129
   _globals['_DATE']._serialized_end=149
-  _globals['_MOVIE']._serialized_start=151
-  _globals['_MOVIE']._serialized_end=184
-  _globals['_EMPTY']._serialized_start=186
-  _globals['_EMPTY']._serialized_end=193
-  _globals['_SCHEDULE']._serialized_start=196
-  _globals['_SCHEDULE']._serialized_end=431
+  _globals['_DATELIST']._serialized_start=151
+  _globals['_DATELIST']._serialized_end=176
+  _globals['_DATERANGE']._serialized_start=178
+  _globals['_DATERANGE']._serialized_end=237
+  _globals['_MOVIE']._serialized_start=239
+  _globals['_MOVIE']._serialized_end=272
+  _globals['_EMPTY']._serialized_start=274
+  _globals['_EMPTY']._serialized_end=281
+  _globals['_SCHEDULE']._serialized_start=284
+  _globals['_SCHEDULE']._serialized_end=647
 # @@protoc_insertion_point(module_scope)
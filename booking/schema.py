@@ -0,0 +1,56 @@
+"""Schéma GraphQL du service Booking, partagé par booking.py et asgi.py.
+
+Chaque champ est lié une seule fois à son résolveur de resolvers.py.
+`make_schema` construit le schéma exécutable: booking.py l'utilise tel quel,
+asgi.py enveloppe chaque résolveur pour l'exécuter dans son pool de threads
+et remplace les champs qui interrogent plusieurs services en parallèle.
+"""
+
+from ariadne import (
+    MutationType,
+    QueryType,
+    load_schema_from_path,
+    make_executable_schema,
+)
+
+import resolvers as r
+
+type_defs = load_schema_from_path("booking.graphql")
+
+QUERY_RESOLVERS = {
+    "all_bookings": r.all_bookings_resolver,
+    "bookings_page": r.bookings_page_resolver,
+    "bookings_by_user": r.bookings_by_user_resolver,
+    "detailed_bookings_by_user": r.detailed_bookings_by_user_resolver,
+    "availability": r.availability_resolver,
+}
+
+MUTATION_RESOLVERS = {
+    "create_booking": r.create_booking_resolver,
+    "create_bookings": r.create_bookings_resolver,
+    "delete_booking": r.delete_booking_resolver,
+    "delete_all_user_bookings": r.delete_all_user_bookings_resolver,
+    "set_screening_capacity": r.set_screening_capacity_resolver,
+}
+
+
+def make_schema(wrap=None, overrides=None):
+    """Schéma exécutable du service.
+
+    `wrap(résolveur)` adapte chaque résolveur de resolvers.py; `overrides`
+    ({champ: résolveur}) remplace des champs de Query ou Mutation.
+    """
+    overrides = overrides or {}
+    query = QueryType()
+    mutation = MutationType()
+    for bindable, resolvers in (
+        (query, QUERY_RESOLVERS),
+        (mutation, MUTATION_RESOLVERS),
+    ):
+        for field, resolver in resolvers.items():
+            if field in overrides:
+                resolver = overrides[field]
+            elif wrap is not None:
+                resolver = wrap(resolver)
+            bindable.set_field(field, resolver)
+    return make_executable_schema(type_defs, query, mutation)
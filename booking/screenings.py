@@ -0,0 +1,227 @@
+"""Capacité des séances et compteur de places réservées.
+
+Une séance est un film programmé à une date. Pour chaque séance réservée au
+moins une fois, un compteur {date, movieid, capacity, booked, available} est
+tenu à jour à chaque réservation et annulation. Refuser une réservation sur
+une séance complète ne demande donc qu'une mise à jour conditionnelle du
+compteur (`available > 0`), sans compter les réservations existantes.
+
+Les compteurs sont calculés une seule fois à partir des réservations
+existantes, au premier démarrage (collection ou fichier absent).
+DEFAULT_SCREENING_CAPACITY est la capacité d'une séance sans compteur.
+"""
+
+import os
+from collections import Counter
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from json_store import JsonStore
+from mongo_indexes import ensure_indexes
+
+DEFAULT_SCREENING_CAPACITY = int(os.getenv("DEFAULT_SCREENING_CAPACITY", "100"))
+
+COLLECTION = "screenings"
+JSON_FILE_PATH = "{}/data/screenings.json".format(".")
+
+# Un compteur par séance; l'index sert aussi à availability(date)
+INDEXES = [
+    ([("date", ASCENDING), ("movieid", ASCENDING)], {"unique": True}),
+]
+
+FIELDS = ("date", "movieid", "capacity", "booked", "available")
+
+collection = None
+store = None
+
+
+def _key(date, movieid):
+    # Les dates (AAAAMMJJ) ne contiennent pas ":": les clés d'une même date
+    # se suivent dans l'ordre trié du JsonStore
+    return f"{date}:{movieid}"
+
+
+def _counter(date, movieid, capacity, booked=0):
+    return {
+        "date": date,
+        "movieid": movieid,
+        "capacity": capacity,
+        "booked": booked,
+        "available": capacity - booked,
+    }
+
+
+def init(db=None):
+    """Ouvre les compteurs (MongoDB si `db` est donné, sinon JSON).
+
+    Retourne True s'ils viennent d'être créés et doivent être calculés avec
+    `seed`.
+    """
+    global collection, store
+    if db is not None:
+        first_start = COLLECTION not in db.list_collection_names()
+        collection = db[COLLECTION]
+        ensure_indexes(collection, INDEXES)
+        return first_start
+
+    first_start = not os.path.exists(JSON_FILE_PATH)
+    store = JsonStore(JSON_FILE_PATH, "screenings", "screening")
+    return first_start
+
+
+def seed(bookings):
+    """Crée les compteurs à partir des réservations {userid, dates[]} existantes"""
+    counts = Counter(
+        (date_entry["date"], movieid)
+        for booking in bookings
+        for date_entry in booking["dates"]
+        for movieid in set(date_entry["movies"])
+    )
+    counters = [
+        _counter(date, movieid, max(DEFAULT_SCREENING_CAPACITY, booked), booked)
+        for (date, movieid), booked in counts.items()
+    ]
+    if not counters:
+        return 0
+
+    if collection is not None:
+        collection.insert_many(counters, ordered=False)
+    else:
+        store.put_many(
+            [
+                dict(counter, screening=_key(counter["date"], counter["movieid"]))
+                for counter in counters
+            ]
+        )
+    return len(counters)
+
+
+def reserve(date, movieid):
+    """Prend une place pour la séance, ou lève une exception si elle est complète"""
+    if collection is not None:
+        query = {"date": date, "movieid": movieid}
+        while True:
+            # Cas courant: une seule mise à jour conditionnelle et atomique
+            result = collection.update_one(
+                dict(query, available={"$gt": 0}),
+                {"$inc": {"available": -1, "booked": 1}},
+            )
+            if result.modified_count:
+                return
+            if collection.count_documents(query, limit=1):
+                raise Exception("Séance complète")
+            # Première réservation de la séance
+            if DEFAULT_SCREENING_CAPACITY <= 0:
+                raise Exception("Séance complète")
+            try:
+                collection.insert_one(
+                    _counter(date, movieid, DEFAULT_SCREENING_CAPACITY, 1)
+                )
+                return
+            except DuplicateKeyError:
+                # Compteur créé entre-temps par une autre réservation
+                continue
+    else:
+        with store.lock:
+            counter = store.get(_key(date, movieid)) or dict(
+                _counter(date, movieid, DEFAULT_SCREENING_CAPACITY),
+                screening=_key(date, movieid),
+            )
+            if counter["available"] <= 0:
+                raise Exception("Séance complète")
+            store.put(
+                dict(
+                    counter,
+                    booked=counter["booked"] + 1,
+                    available=counter["available"] - 1,
+                )
+            )
+
+
+def release(date, movieid):
+    """Rend la place d'une réservation annulée"""
+    if collection is not None:
+        collection.update_one(
+            {"date": date, "movieid": movieid, "booked": {"$gt": 0}},
+            {"$inc": {"available": 1, "booked": -1}},
+        )
+    else:
+        with store.lock:
+            counter = store.get(_key(date, movieid))
+            if counter and counter["booked"] > 0:
+                store.put(
+                    dict(
+                        counter,
+                        booked=counter["booked"] - 1,
+                        available=counter["available"] + 1,
+                    )
+                )
+
+
+def set_capacity(date, movieid, capacity):
+    """Change la capacité d'une séance; retourne le compteur mis à jour"""
+    if capacity < 0:
+        raise Exception("La capacité doit être positive")
+
+    if collection is not None:
+        query = {"date": date, "movieid": movieid}
+        while True:
+            counter = collection.find_one(query, {"_id": 0})
+            if counter is None:
+                try:
+                    collection.insert_one(_counter(date, movieid, capacity))
+                    return _counter(date, movieid, capacity)
+                except DuplicateKeyError:
+                    continue
+            if capacity < counter["booked"]:
+                raise Exception("Capacité inférieure au nombre de places réservées")
+            # Mise à jour seulement si aucune réservation n'a eu lieu entre-temps
+            result = collection.update_one(
+                dict(query, booked=counter["booked"]),
+                {
+                    "$set": {
+                        "capacity": capacity,
+                        "available": capacity - counter["booked"],
+                    }
+                },
+            )
+            if result.matched_count:
+                return _counter(date, movieid, capacity, counter["booked"])
+    else:
+        with store.lock:
+            counter = store.get(_key(date, movieid))
+            booked = counter["booked"] if counter else 0
+            if capacity < booked:
+                raise Exception("Capacité inférieure au nombre de places réservées")
+            updated = _counter(date, movieid, capacity, booked)
+            store.put(dict(updated, screening=_key(date, movieid)))
+            return updated
+
+
+def for_date(date):
+    """Compteurs des séances d'une date, triés par film"""
+    if collection is not None:
+        return list(
+            collection.find(
+                {"date": date},
+                {"_id": 0, **{field: 1 for field in FIELDS}},
+            ).sort("movieid", ASCENDING)
+        )
+    return [
+        {field: counter[field] for field in FIELDS}
+        for counter in store.range(_key(date, ""), f"{date};")
+    ]
+
+
+def availability(date, scheduled_movies=()):
+    """Places des séances d'une date.
+
+    Les films programmés (`scheduled_movies`) sans compteur n'ont encore
+    aucune réservation: ils ont la capacité par défaut.
+    """
+    counters = {counter["movieid"]: counter for counter in for_date(date)}
+    for movieid in scheduled_movies:
+        if movieid not in counters:
+            counters[movieid] = _counter(date, movieid, DEFAULT_SCREENING_CAPACITY)
+    return [counters[movieid] for movieid in sorted(counters)]
@@ -0,0 +1,37 @@
+import asyncio
+import warnings
+
+
+def lifespan(app):
+    """Messages envoyés par l'application pour un démarrage puis un arrêt"""
+    events = asyncio.Queue()
+    messages = []
+
+    async def receive():
+        return await events.get()
+
+    async def send(message):
+        messages.append(message["type"])
+
+    async def run():
+        for event in ("lifespan.startup", "lifespan.shutdown"):
+            events.put_nowait({"type": event})
+        await app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send)
+
+    asyncio.run(run())
+    return messages
+
+
+def test_shutdown_closes_the_executor_and_the_connections(service):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        asgi = service("booking", "asgi", PERSISTENCE_TYPE="JSON")
+    asgi.clients.http_session(asgi.r.MOVIE_SERVICE_URL)
+    assert asgi.clients._sessions
+
+    assert lifespan(asgi.app) == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+    assert not asgi.clients._sessions
+    assert asgi._executor._shutdown
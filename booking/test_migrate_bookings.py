@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def migrate(mongo, service, monkeypatch):
+    """Lance migrate_bookings.main() avec les arguments donnés"""
+    module = service("booking", "migrate_bookings")
+
+    def run(*args):
+        monkeypatch.setattr("sys.argv", ["migrate_bookings.py", *args])
+        module.main()
+
+    return run
+
+
+@pytest.fixture
+def db(mongo):
+    db = mongo["bookings"]
+    with open("data/bookings.json") as f:
+        db["bookings"].insert_many(json.load(f)["bookings"])
+    return db
+
+
+def documents(collection):
+    return sorted(collection.find({}, {"_id": 0}), key=lambda doc: doc["userid"])
+
+
+def test_nested_to_rows_and_back_keeps_documents(migrate, db):
+    before = documents(db["bookings"])
+
+    migrate("--to", "rows")
+    assert db["booking_rows"].count_documents({}) == sum(
+        len(date_entry["movies"]) for doc in before for date_entry in doc["dates"]
+    )
+
+    db["bookings"].drop()
+    migrate("--to", "nested")
+
+    assert documents(db["bookings"]) == before
+
+
+def test_migration_is_idempotent(migrate, db):
+    migrate("--to", "rows")
+    count = db["booking_rows"].count_documents({})
+
+    migrate("--to", "rows")
+
+    assert db["booking_rows"].count_documents({}) == count
+
+
+def test_back_to_nested_removes_users_without_rows(migrate, db):
+    migrate("--to", "rows")
+    db["booking_rows"].delete_many({"userid": "chris_rivers"})
+
+    migrate("--to", "nested")
+
+    assert db["bookings"].find_one({"userid": "chris_rivers"}) is None
+
+
+def test_dry_run_writes_nothing(migrate, db, capsys):
+    before = documents(db["bookings"])
+
+    migrate("--to", "rows", "--dry-run")
+    migrate("--to", "nested", "--dry-run")
+
+    assert "booking_rows" not in db.list_collection_names()
+    assert documents(db["bookings"]) == before
+    assert "Avant:" in capsys.readouterr().out
@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import pytest
+
+import ttl_cache
+
+MOVIES = {
+    "amelie": {"id": "amelie", "title": "Amélie", "rating": 8.3, "director": "Jeunet"},
+    "creed": {"id": "creed", "title": "Creed", "rating": 6.9, "director": "Coogler"},
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return {"data": self._data}
+
+
+class FakeMovieService:
+    """Remplace clients.http_post: réponses tirées de MOVIES, appels comptés"""
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.calls = []
+
+    def install(self, r):
+        self.monkeypatch.setattr(r.clients, "http_post", self.http_post)
+        return r
+
+    def http_post(self, base_url, path, json):
+        if "variables" in json:
+            ids = json["variables"]["ids"]
+            self.calls.append(ids)
+            return FakeResponse(
+                {"movies_by_ids": [MOVIES[i] for i in ids if i in MOVIES]}
+            )
+        movie_id = json["query"].split('"')[1]
+        self.calls.append(movie_id)
+        return FakeResponse({"movie_by_id": MOVIES.get(movie_id)})
+
+
+@pytest.fixture
+def movie_service(monkeypatch):
+    return FakeMovieService(monkeypatch)
+
+
+@pytest.fixture
+def r(service, movie_service):
+    return movie_service.install(
+        service("booking", "resolvers", PERSISTENCE_TYPE="JSON")
+    )
+
+
+def test_second_lookup_is_served_from_the_cache(r, movie_service):
+    assert r.get_movie_details("amelie") == MOVIES["amelie"]
+    assert r.get_movie_details("amelie") == MOVIES["amelie"]
+
+    assert len(movie_service.calls) == 1
+    stats = r.movie_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_batch_lookup_only_requests_missing_movies(r, movie_service):
+    r.get_movie_details("amelie")
+
+    movies = r.get_movies_details(["amelie", "creed", "amelie"])
+    assert movies == MOVIES
+    assert r.get_movies_details(["creed"]) == {"creed": MOVIES["creed"]}
+
+    assert movie_service.calls[1:] == [["creed"]]
+    stats = r.movie_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_unknown_movies_are_cached_for_the_negative_ttl(r, movie_service, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: clock["now"])
+
+    assert r.get_movie_details("unknown") is None
+    assert r.get_movies_details(["unknown", "other"]) == {}
+    assert r.get_movie_details("other") is None
+    assert len(movie_service.calls) == 2
+
+    clock["now"] += r.movie_cache.negative_ttl
+    assert r.get_movie_details("unknown") is None
+    assert len(movie_service.calls) == 3
+
+
+def test_evict_movie_forces_a_new_lookup(r, movie_service):
+    r.get_movie_details("amelie")
+
+    assert r.evict_movie({"event": "movie_updated", "id": "amelie"}) == {
+        "evicted": "amelie",
+        "event": "movie_updated",
+    }
+    r.get_movie_details("amelie")
+
+    assert len(movie_service.calls) == 2
+    assert r.movie_cache.stats()["invalidations"] == 1
+    with pytest.raises(ValueError):
+        r.evict_movie({"event": "movie_updated"})
+
+
+def test_flask_route_evicts_the_movie(service, movie_service):
+    booking = service("booking", "booking", PERSISTENCE_TYPE="JSON")
+    movie_service.install(booking.r)
+    booking.r.get_movie_details("amelie")
+    client = booking.app.test_client()
+
+    response = client.post(
+        "/events/movies", json={"event": "movie_deleted", "id": "amelie"}
+    )
+    assert response.status_code == 200
+    assert response.get_json() == {"evicted": "amelie", "event": "movie_deleted"}
+    assert client.post("/events/movies", data="pas du json").status_code == 400
+
+    booking.r.get_movie_details("amelie")
+    assert len(movie_service.calls) == 2
+
+
+def asgi_post(app, path, body):
+    """(statut, corps JSON) d'un POST envoyé directement à l'application ASGI"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = messages[0]["status"]
+    return status, json.loads(b"".join(m.get("body", b"") for m in messages[1:]))
+
+
+def test_asgi_route_evicts_the_movie(service, movie_service):
+    asgi = service("booking", "asgi", PERSISTENCE_TYPE="JSON")
+    movie_service.install(asgi.r)
+    asgi.r.get_movie_details("amelie")
+
+    assert asgi_post(
+        asgi.app, "/events/movies", b'{"event": "movie_updated", "id": "amelie"}'
+    ) == (200, {"evicted": "amelie", "event": "movie_updated"})
+    assert asgi_post(asgi.app, "/events/movies", b"{}")[0] == 400
+
+    asgi.r.get_movie_details("amelie")
+    assert len(movie_service.calls) == 2
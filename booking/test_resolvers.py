@@ -0,0 +1,401 @@
+import threading
+
+import pytest
+
+MOVIE = "267eedb8-0f5d-42d5-8f43-72426b9fb3e6"
+OTHER_MOVIE = "7daf7208-be4d-4944-a3ae-c1c2f516f3e6"
+CAPACITY = 5
+
+
+@pytest.fixture(params=["nested", "rows"])
+def r(request, mongo, service):
+    """Résolveurs de Booking sur MongoDB (mongomock), dans les deux dispositions"""
+    return service(
+        "booking",
+        "resolvers",
+        PERSISTENCE_TYPE="MONGODB",
+        BOOKING_STORAGE=request.param,
+    )
+
+
+@pytest.fixture(params=["JSON", "nested", "rows"])
+def storage(request, mongo, service, monkeypatch):
+    """Résolveurs de Booking dans chaque stockage, séances de CAPACITY places"""
+    monkeypatch.setenv("DEFAULT_SCREENING_CAPACITY", str(CAPACITY))
+    if request.param == "JSON":
+        return service("booking", "resolvers", PERSISTENCE_TYPE="JSON")
+    return service(
+        "booking",
+        "resolvers",
+        PERSISTENCE_TYPE="MONGODB",
+        BOOKING_STORAGE=request.param,
+    )
+
+
+@pytest.fixture
+def nested(mongo, service):
+    return service(
+        "booking", "resolvers", PERSISTENCE_TYPE="MONGODB", BOOKING_STORAGE="nested"
+    )
+
+
+@pytest.fixture
+def rows(mongo, service, monkeypatch):
+    r = service(
+        "booking", "resolvers", PERSISTENCE_TYPE="MONGODB", BOOKING_STORAGE="rows"
+    )
+    monkeypatch.setattr(r, "is_admin_user", lambda userid: True)
+    return r
+
+
+def test_store_booking_adds_user_date_and_movie(r):
+    r.store_booking("new_user", MOVIE, "20151201")
+    r.store_booking("new_user", OTHER_MOVIE, "20151201")
+    r.store_booking("new_user", MOVIE, "20151202")
+
+    assert r.find_user_booking("new_user")["dates"] == [
+        {"date": "20151201", "movies": [MOVIE, OTHER_MOVIE]},
+        {"date": "20151202", "movies": [MOVIE]},
+    ]
+
+
+def test_store_booking_refuses_duplicates(r):
+    r.store_booking("new_user", MOVIE, "20151201")
+
+    with pytest.raises(Exception, match="déjà réservé"):
+        r.store_booking("new_user", MOVIE, "20151201")
+
+    assert r.find_user_booking("new_user")["dates"] == [
+        {"date": "20151201", "movies": [MOVIE]}
+    ]
+
+
+def test_delete_booking_removes_empty_dates_and_documents(r):
+    r.store_booking("new_user", MOVIE, "20151201")
+    r.store_booking("new_user", OTHER_MOVIE, "20151201")
+    r.store_booking("new_user", MOVIE, "20151202")
+
+    r.delete_booking_resolver(None, None, "new_user", MOVIE, "20151202")
+    assert r.find_user_booking("new_user")["dates"] == [
+        {"date": "20151201", "movies": [MOVIE, OTHER_MOVIE]}
+    ]
+
+    r.delete_booking_resolver(None, None, "new_user", MOVIE, "20151201")
+    r.delete_booking_resolver(None, None, "new_user", OTHER_MOVIE, "20151201")
+    assert r.find_user_booking("new_user") is None
+
+    with pytest.raises(Exception, match="non trouvée"):
+        r.delete_booking_resolver(None, None, "new_user", MOVIE, "20151201")
+
+
+def test_nested_store_booking_does_not_rewrite_other_dates(nested):
+    nested.store_booking("new_user", MOVIE, "20151201")
+    # Écriture concurrente d'une autre date, invisible pour l'appel suivant
+    nested.collection.update_one(
+        {"userid": "new_user"},
+        {"$push": {"dates": {"date": "20151203", "movies": [MOVIE]}}},
+    )
+
+    nested.store_booking("new_user", OTHER_MOVIE, "20151201")
+
+    assert [d["date"] for d in nested.find_user_booking("new_user")["dates"]] == [
+        "20151201",
+        "20151203",
+    ]
+
+
+def test_delete_all_user_bookings_releases_seats(r):
+    r.add_booking("new_user", MOVIE, "20151210")
+    r.add_booking("new_user", OTHER_MOVIE, "20151210")
+
+    r.delete_all_user_bookings_resolver(None, None, "new_user")
+
+    assert r.find_user_booking("new_user") is None
+    assert [c["booked"] for c in r.screenings.for_date("20151210")] == [0, 0]
+    with pytest.raises(Exception, match="Aucune réservation"):
+        r.delete_all_user_bookings_resolver(None, None, "new_user")
+
+
+def test_rows_pages_group_only_the_selected_users(rows):
+    everything = rows.all_bookings_resolver(None, None, "admin")
+    userids = sorted(booking["userid"] for booking in everything)
+
+    first = rows.all_bookings_resolver(None, None, "admin", first=1)
+    rest = rows.all_bookings_resolver(
+        None, None, "admin", after=first[-1]["userid"], first=100
+    )
+
+    assert [b["userid"] for b in first + rest] == userids
+    by_user = {booking["userid"]: booking for booking in everything}
+    for booking in first + rest:
+        assert sorted(booking["dates"], key=lambda d: d["date"]) == sorted(
+            by_user[booking["userid"]]["dates"], key=lambda d: d["date"]
+        )
+
+
+def run_concurrently(calls):
+    """Lance les appels en même temps; retourne le nombre de réussites"""
+    barrier = threading.Barrier(len(calls))
+    succeeded = []
+
+    def run(call):
+        barrier.wait()
+        try:
+            call()
+            succeeded.append(call)
+        except Exception:
+            pass
+
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(succeeded)
+
+
+def stored(r, date, movieid):
+    """Réservations enregistrées pour une séance, tous utilisateurs confondus"""
+    if r.USE_ROWS:
+        bookings = r.booking_rows.group(r.rows.find({}, {"_id": 0}))
+    elif r.PERSISTENCE_TYPE == "MONGODB":
+        bookings = r.collection.find({}, {"_id": 0})
+    else:
+        bookings = r.store.all()
+    return sum(
+        date_entry["movies"].count(movieid)
+        for booking in bookings
+        for date_entry in booking["dates"]
+        if date_entry["date"] == date
+    )
+
+
+def test_concurrent_bookings_never_exceed_capacity(storage):
+    calls = [
+        lambda i=i: storage.add_booking(f"user{i}", MOVIE, "20151220")
+        for i in range(CAPACITY * 3)
+    ]
+
+    created = run_concurrently(calls)
+
+    (counter,) = storage.screenings.for_date("20151220")
+    assert created == CAPACITY
+    assert counter["booked"] == CAPACITY
+    assert counter["available"] == 0
+    assert stored(storage, "20151220", MOVIE) == CAPACITY
+
+
+def test_concurrent_bookings_of_one_user_are_all_stored(storage):
+    # Même utilisateur, même date: chaque film a sa propre séance
+    movies = [f"movie{i}" for i in range(CAPACITY * 2)]
+    calls = [
+        lambda movie=movie: storage.add_booking("new_user", movie, "20151221")
+        for movie in movies
+    ]
+
+    created = run_concurrently(calls)
+
+    assert created == len(movies)
+    booking = storage.find_user_booking("new_user")
+    assert sorted(booking["dates"][0]["movies"]) == sorted(movies)
+    assert sum(c["booked"] for c in storage.screenings.for_date("20151221")) == len(
+        movies
+    )
+
+
+def test_failed_write_releases_the_seat(storage, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("écriture impossible")
+
+    monkeypatch.setattr(storage, "store_booking", fail)
+
+    with pytest.raises(RuntimeError):
+        storage.add_booking("new_user", MOVIE, "20151222")
+
+    (counter,) = storage.screenings.for_date("20151222")
+    assert counter["booked"] == 0
+    assert counter["available"] == CAPACITY
+
+
+@pytest.fixture
+def batch(storage, monkeypatch):
+    """create_bookings sans les services Movie et Schedule"""
+    monkeypatch.setattr(
+        storage,
+        "get_movies_details",
+        lambda ids: {i: {"id": i} for i in ids if i != "unknown"},
+    )
+    monkeypatch.setattr(
+        storage,
+        "get_schedules_by_dates",
+        lambda dates: {
+            date: {
+                "date": date,
+                "movies": [MOVIE, OTHER_MOVIE],
+            }
+            for date in dates
+            if date != "19990101"
+        },
+    )
+    return storage
+
+
+def item(userid, movieid=MOVIE, date="20151230"):
+    return {"userid": userid, "movieid": movieid, "date": date}
+
+
+def booked(r, date="20151230"):
+    return {c["movieid"]: c["booked"] for c in r.screenings.for_date(date)}
+
+
+def test_create_bookings_reports_each_failure(batch):
+    response = batch.create_bookings_resolver(
+        None,
+        None,
+        [
+            item("a"),
+            item("b", movieid="unknown"),
+            item("c", date="19990101"),
+            item("d", movieid=OTHER_MOVIE),
+        ],
+    )
+
+    assert response["created"] == 2
+    assert [(r["success"], r["message"]) for r in response["results"]] == [
+        (True, "Réservation créée avec succès"),
+        (False, "Film non trouvé"),
+        (False, "Film non programmé à cette date"),
+        (True, "Réservation créée avec succès"),
+    ]
+    assert booked(batch) == {MOVIE: 1, OTHER_MOVIE: 1}
+    assert batch.find_user_booking("b") is None
+
+
+def test_create_bookings_refuses_duplicates_in_one_batch(batch):
+    response = batch.create_bookings_resolver(
+        None, None, [item("a"), item("a"), item("a", movieid=OTHER_MOVIE)]
+    )
+
+    assert [r["success"] for r in response["results"]] == [True, False, True]
+    assert response["results"][1]["message"] == "Film déjà réservé pour cette date"
+    assert booked(batch) == {MOVIE: 1, OTHER_MOVIE: 1}
+    assert stored(batch, "20151230", MOVIE) == 1
+
+
+def test_create_bookings_refuses_already_stored_bookings(batch):
+    batch.add_booking("a", MOVIE, "20151230")
+
+    response = batch.create_bookings_resolver(None, None, [item("a"), item("b")])
+
+    assert [r["success"] for r in response["results"]] == [False, True]
+    assert booked(batch) == {MOVIE: 2}
+    assert stored(batch, "20151230", MOVIE) == 2
+
+
+def test_create_bookings_stops_at_capacity(batch):
+    response = batch.create_bookings_resolver(
+        None, None, [item(f"user{i}") for i in range(CAPACITY + 2)]
+    )
+
+    assert response["created"] == CAPACITY
+    assert [r["message"] for r in response["results"][CAPACITY:]] == [
+        "Séance complète"
+    ] * 2
+    assert booked(batch) == {MOVIE: CAPACITY}
+
+
+def test_rejected_batch_leaves_seat_counters_unchanged(batch, monkeypatch):
+    batch.add_booking("a", MOVIE, "20151230")
+
+    monkeypatch.setattr(batch, "BOOKING_BATCH_MAX", 2)
+    with pytest.raises(Exception, match="Trop de réservations"):
+        batch.create_bookings_resolver(None, None, [item("b"), item("c"), item("d")])
+    assert booked(batch) == {MOVIE: 1}
+
+    monkeypatch.setattr(batch, "BOOKING_BATCH_MAX", 100)
+
+    def fail(items):
+        raise RuntimeError("écriture impossible")
+
+    monkeypatch.setattr(batch, "store_bookings", fail)
+    with pytest.raises(RuntimeError):
+        batch.create_bookings_resolver(None, None, [item("b"), item("c")])
+    assert booked(batch) == {MOVIE: 1}
+
+
+class CountingCollection:
+    """Collection MongoDB qui compte les commandes envoyées"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+def dates(r, userid):
+    return {
+        entry["date"]: entry["movies"] for entry in r.find_user_booking(userid)["dates"]
+    }
+
+
+def test_nested_store_bookings_uses_one_read_and_one_bulk_write(nested, monkeypatch):
+    counting = CountingCollection(nested.collection)
+    monkeypatch.setattr(nested, "collection", counting)
+
+    errors = nested.store_bookings(
+        [
+            item("chris_rivers", OTHER_MOVIE, "20151201"),
+            item("chris_rivers", MOVIE, "20151201"),
+            item("chris_rivers", MOVIE, "20151203"),
+            item("chris_rivers", OTHER_MOVIE, "20151203"),
+            item("new_user"),
+        ]
+    )
+
+    assert errors == [None, "Film déjà réservé pour cette date", None, None, None]
+    assert counting.calls == ["find", "bulk_write"]
+    assert dates(nested, "chris_rivers") == {
+        "20151201": [MOVIE, OTHER_MOVIE],
+        "20151203": [MOVIE, OTHER_MOVIE],
+    }
+    assert dates(nested, "new_user") == {"20151230": [MOVIE]}
+
+
+def test_nested_store_bookings_retries_items_written_concurrently(nested, monkeypatch):
+    collection = nested.collection
+    find = collection.find
+
+    def find_then_concurrent_writes(*args, **kwargs):
+        documents = list(find(*args, **kwargs))
+        # Réservations simultanées, écrites après la lecture de store_bookings
+        nested.store_booking("chris_rivers", OTHER_MOVIE, "20151201")
+        nested.store_booking("chris_rivers", MOVIE, "20151203")
+        nested.store_booking("new_user", OTHER_MOVIE, "20151230")
+        return documents
+
+    counting = CountingCollection(collection)
+    monkeypatch.setattr(counting, "find", find_then_concurrent_writes, raising=False)
+    monkeypatch.setattr(nested, "collection", counting)
+
+    errors = nested.store_bookings(
+        [
+            item("chris_rivers", OTHER_MOVIE, "20151201"),
+            item("chris_rivers", OTHER_MOVIE, "20151203"),
+            item("new_user"),
+        ]
+    )
+
+    assert errors == ["Film déjà réservé pour cette date", None, None]
+    assert dates(nested, "chris_rivers") == {
+        "20151201": [MOVIE, OTHER_MOVIE],
+        "20151203": [MOVIE, OTHER_MOVIE],
+    }
+    assert dates(nested, "new_user") == {"20151230": [OTHER_MOVIE, MOVIE]}
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from conftest import free_port
+
+
+@pytest.fixture
+def schedule(schedule_server):
+    """(servicer, dates du planning): Schedule en JSON dans ce processus"""
+    _, servicer, target = schedule_server("sync", PERSISTENCE_TYPE="JSON")
+    with open("data/times.json") as f:
+        dates = sorted(entry["date"] for entry in json.load(f)["schedule"])
+    return servicer, target, dates
+
+
+@pytest.fixture
+def r(schedule, service):
+    servicer, target, dates = schedule
+    r = service(
+        "booking", "resolvers", PERSISTENCE_TYPE="JSON", SCHEDULE_SERVICE_URL=target
+    )
+    yield r
+    r.clients.close_all()
+
+
+def test_stream_schedule_yields_every_date_in_order(schedule, r):
+    servicer, target, dates = schedule
+
+    entries = list(r.stream_schedule(batch_size=2))
+
+    assert [entry["date"] for entry in entries] == dates
+    assert all(entry["movies"] for entry in entries)
+    assert r.clients.connection_stats()["grpc"][target]["calls"] == 1
+
+
+def test_stream_schedule_respects_the_date_range(schedule, r):
+    servicer, target, dates = schedule
+
+    entries = list(r.stream_schedule(start=dates[1], end=dates[-2], batch_size=1))
+
+    assert [entry["date"] for entry in entries] == dates[1:-1]
+
+
+def test_stream_schedule_maps_server_errors(schedule, r, monkeypatch):
+    servicer, target, dates = schedule
+
+    def failing_range(start, end):
+        yield {"date": dates[0], "movies": []}
+        raise RuntimeError("base indisponible")
+
+    monkeypatch.setattr(servicer.store, "range", failing_range)
+
+    entries = r.stream_schedule(batch_size=1)
+    assert next(entries)["date"] == dates[0]
+    with pytest.raises(Exception, match=r"Planning indisponible \(UNKNOWN\)"):
+        next(entries)
+
+
+def test_stream_schedule_maps_an_unreachable_service(service, monkeypatch):
+    r = service(
+        "booking",
+        "resolvers",
+        PERSISTENCE_TYPE="JSON",
+        SCHEDULE_SERVICE_URL=f"127.0.0.1:{free_port()}",
+    )
+    try:
+        with pytest.raises(Exception, match=r"Planning indisponible \(UNAVAILABLE\)"):
+            list(r.stream_schedule())
+    finally:
+        r.clients.close_all()
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from ariadne import graphql, graphql_sync
+
+QUERY = """
+query {
+    bookings_by_user(userid: "chris_rivers") { userid dates { date movies } }
+}
+"""
+
+EXPECTED = {
+    "bookings_by_user": {
+        "userid": "chris_rivers",
+        "dates": [
+            {"date": "20151201", "movies": ["267eedb8-0f5d-42d5-8f43-72426b9fb3e6"]}
+        ],
+    }
+}
+
+
+@pytest.fixture
+def modules(service):
+    """(booking_schema, asgi) sur le stockage JSON"""
+    booking_schema = service("booking", "schema", PERSISTENCE_TYPE="JSON")
+    return booking_schema, service("booking", "asgi")
+
+
+def test_every_field_has_a_resolver(modules):
+    booking_schema, asgi = modules
+    for schema in (booking_schema.make_schema(), asgi.schema):
+        for type_name in ("Query", "Mutation"):
+            fields = schema.type_map[type_name].fields
+            assert all(field.resolve is not None for field in fields.values())
+
+
+def test_flask_and_asgi_schemas_give_the_same_result(modules):
+    booking_schema, asgi = modules
+
+    success, result = graphql_sync(booking_schema.make_schema(), {"query": QUERY})
+    assert success and result["data"] == EXPECTED
+
+    success, result = asyncio.run(graphql(asgi.schema, {"query": QUERY}))
+    assert success and result["data"] == EXPECTED
+
+
+@pytest.mark.parametrize("storage", ["JSON", "nested", "rows"])
+def test_bookings_page_returns_the_next_cursor(storage, mongo, service, monkeypatch):
+    booking_schema = service(
+        "booking",
+        "schema",
+        PERSISTENCE_TYPE="JSON" if storage == "JSON" else "MONGODB",
+        BOOKING_STORAGE=storage,
+    )
+    monkeypatch.setattr(booking_schema.r, "is_admin_user", lambda userid: True)
+    schema = booking_schema.make_schema()
+    document = """
+    query($after: String) {
+        bookings_page(userid: "admin", first: 2, after: $after) {
+            bookings { userid dates { date } }
+            next_cursor
+        }
+    }
+    """
+
+    userids = []
+    after = None
+    while True:
+        success, result = graphql_sync(
+            schema, {"query": document, "variables": {"after": after}}
+        )
+        assert success and "errors" not in result, result
+        page = result["data"]["bookings_page"]
+        userids.extend(booking["userid"] for booking in page["bookings"])
+        assert all(booking["dates"] for booking in page["bookings"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+        assert after == userids[-1]
+
+    assert userids == ["chris_rivers", "dwight_schrute", "garret_heaton"]
@@ -0,0 +1,46 @@
+"""Vérification des droits administrateur auprès du service User, avec cache.
+
+Partagé par Movie et Booking. Un utilisateur rétrogradé perd ses droits au
+plus ADMIN_CACHE_TTL secondes après la modification.
+"""
+
+import os
+
+from ttl_cache import MISSING, TTLCache
+
+admin_cache = TTLCache(
+    ttl=float(os.getenv("ADMIN_CACHE_TTL", "30")),
+    maxsize=int(os.getenv("ADMIN_CACHE_SIZE", "1024")),
+    negative_ttl=float(os.getenv("ADMIN_CACHE_NEGATIVE_TTL", "10")),
+)
+
+
+def is_admin(userid, fetch_user):
+    """Retourne True si `userid` a le rôle admin.
+
+    `fetch_user(userid)` interroge le service User et retourne la réponse
+    HTTP. Les erreurs réseau et les réponses inattendues ne sont pas mises
+    en cache.
+    """
+    if not userid:
+        return False
+
+    cached = admin_cache.get(userid)
+    if cached is not MISSING:
+        return cached
+
+    try:
+        response = fetch_user(userid)
+    except Exception as e:
+        print(f"Error checking admin status: {e}")
+        return False
+
+    if response.status_code == 200:
+        result = response.json().get("role", "") == "admin"
+    elif response.status_code == 404:
+        result = False
+    else:
+        return False
+
+    admin_cache.set(userid, result)
+    return result
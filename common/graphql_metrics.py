@@ -0,0 +1,79 @@
+"""Extension Ariadne mesurant les requêtes GraphQL et chaque résolveur.
+
+Les champs résolus par le résolveur par défaut (lecture d'un attribut) et
+l'introspection ne sont pas mesurés: seuls les résolveurs du service le sont,
+avec un histogramme par type et champ (ex: Query.all_movies).
+"""
+
+import time
+
+from ariadne.contrib.tracing.utils import should_trace
+from ariadne.types import Extension
+from graphql.pyutils import is_awaitable
+
+import metrics
+
+request_duration = metrics.histogram(
+    "graphql_request_duration_seconds",
+    "Durée d'exécution des requêtes GraphQL",
+)
+request_errors = metrics.counter(
+    "graphql_request_errors_total",
+    "Requêtes GraphQL terminées avec des erreurs",
+)
+resolver_duration = metrics.histogram(
+    "graphql_resolver_duration_seconds",
+    "Durée des résolveurs GraphQL",
+    ["type", "field"],
+)
+resolver_errors = metrics.counter(
+    "graphql_resolver_errors_total",
+    "Résolveurs GraphQL ayant levé une exception",
+    ["type", "field"],
+)
+
+
+class ResolverMetrics(Extension):
+    """Une instance par requête GraphQL (créée par Ariadne)"""
+
+    def __init__(self):
+        self._started_at = None
+
+    def request_started(self, context):
+        self._started_at = time.perf_counter()
+
+    def request_finished(self, context):
+        if self._started_at is not None:
+            request_duration.observe(time.perf_counter() - self._started_at)
+
+    def has_errors(self, errors, context):
+        request_errors.inc()
+
+    def resolve(self, next_, obj, info, **kwargs):
+        if not should_trace(info):
+            return next_(obj, info, **kwargs)
+
+        labels = {"type": info.parent_type.name, "field": info.field_name}
+        start = time.perf_counter()
+        try:
+            result = next_(obj, info, **kwargs)
+        except Exception:
+            resolver_errors.inc(**labels)
+            resolver_duration.observe(time.perf_counter() - start, **labels)
+            raise
+
+        if not is_awaitable(result):
+            resolver_duration.observe(time.perf_counter() - start, **labels)
+            return result
+
+        # Résolveur asynchrone (asgi.py): mesure jusqu'à la fin de l'attente
+        async def await_result():
+            try:
+                return await result
+            except Exception:
+                resolver_errors.inc(**labels)
+                raise
+            finally:
+                resolver_duration.observe(time.perf_counter() - start, **labels)
+
+        return await_result()
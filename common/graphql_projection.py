@@ -0,0 +1,55 @@
+"""Projection MongoDB déduite des champs demandés par une requête GraphQL.
+
+Seuls les champs sélectionnés (fragments compris) sont lus depuis MongoDB, au
+lieu du document entier.
+"""
+
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def _fields(info, selection_sets):
+    """Champs (FieldNode) des sélections, fragments développés"""
+    for selection_set in selection_sets:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection
+            elif isinstance(selection, InlineFragmentNode):
+                yield from _fields(info, [selection.selection_set])
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = info.fragments[selection.name.value]
+                yield from _fields(info, [fragment.selection_set])
+
+
+def selected_fields(info, path=()):
+    """Noms des champs sélectionnés sous le champ en cours de résolution.
+
+    `path` descend dans des sous-champs: ("movies",) donne les champs des
+    films d'une page {movies, next_cursor}. Les alias sont ignorés (nom réel
+    du champ).
+    """
+    selection_sets = [
+        field_node.selection_set
+        for field_node in info.field_nodes
+        if field_node.selection_set is not None
+    ]
+    for name in path:
+        selection_sets = [
+            field.selection_set
+            for field in _fields(info, selection_sets)
+            if field.name.value == name and field.selection_set is not None
+        ]
+
+    fields = []
+    for field in _fields(info, selection_sets):
+        name = field.name.value
+        if not name.startswith("__") and name not in fields:
+            fields.append(name)
+    return fields
+
+
+def mongo_projection(info, always=(), path=()):
+    """Projection {champ: 1} des champs demandés, plus ceux de `always`"""
+    projection = {"_id": 0}
+    for field in (*always, *selected_fields(info, path)):
+        projection[field] = 1
+    return projection
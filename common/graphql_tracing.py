@@ -0,0 +1,49 @@
+"""Extension Ariadne ouvrant un span pour chaque résolveur du service.
+
+Comme pour les métriques (graphql_metrics.py), les champs lus directement sur
+l'objet et l'introspection sont ignorés. Le span du résolveur est courant
+pendant son exécution: les commandes MongoDB et les appels aux autres
+services qu'il déclenche deviennent ses enfants.
+"""
+
+from ariadne.contrib.tracing.utils import should_trace
+from ariadne.types import Extension
+from graphql.pyutils import is_awaitable
+
+import tracing
+
+
+class ResolverTracing(Extension):
+    def resolve(self, next_, obj, info, **kwargs):
+        if not should_trace(info):
+            return next_(obj, info, **kwargs)
+
+        span = tracing.start_span(
+            f"{info.parent_type.name}.{info.field_name}", "internal"
+        )
+        token = tracing.activate(span)
+        try:
+            result = next_(obj, info, **kwargs)
+        except Exception as e:
+            span.end(e)
+            raise
+        finally:
+            tracing.deactivate(token)
+
+        if not is_awaitable(result):
+            span.end()
+            return result
+
+        # Résolveur asynchrone (asgi.py): le corps s'exécute pendant l'attente
+        async def await_result():
+            token = tracing.activate(span)
+            try:
+                return await result
+            except Exception as e:
+                span.end(e)
+                raise
+            finally:
+                tracing.deactivate(token)
+                span.end()
+
+        return await_result()
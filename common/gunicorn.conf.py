@@ -0,0 +1,30 @@
+"""Configuration gunicorn commune aux services Flask (SERVER_MODE=production).
+
+Le port et l'application sont passés par start.sh.
+"""
+
+import multiprocessing
+import os
+
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+# Pas de preload_app: chaque worker importe l'application après le fork. Le
+# MongoClient, les caches, les verrous et les pools de threads sont créés à
+# l'import, et un MongoClient ne doit pas être partagé entre processus forkés
+preload_app = False
+
+# Arrêt propre: les requêtes en cours ont graceful_timeout secondes pour finir
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+if os.getenv("PERSISTENCE_TYPE", "MONGODB") == "JSON" and workers > 1:
+    # Chaque processus garde sa propre copie des fichiers JSON en mémoire:
+    # plusieurs workers écraseraient mutuellement leurs écritures
+    print("Persistance JSON: un seul worker gunicorn (les threads restent actifs)")
+    workers = 1
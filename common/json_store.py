@@ -0,0 +1,318 @@
+"""Persistance JSON en mémoire, partagée par tous les services.
+
+Le fichier est lu une seule fois puis gardé en mémoire, indexé par clé
+primaire (`id`, `userid`, `date`...). Il n'est relu que si sa date de
+modification change (édition manuelle, autre processus).
+
+Avec JSON_JOURNAL=1, chaque modification est ajoutée sur une ligne d'un
+journal (`<fichier>.journal`) au lieu de réécrire tout le fichier. Le journal
+est rejoué au chargement et fusionné dans le fichier (compactage) toutes les
+JSON_JOURNAL_COMPACT_EVERY écritures.
+
+Des index secondaires (`add_index`) permettent de retrouver un document par
+un autre champ que la clé primaire sans parcourir toute la collection.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# Intervalle minimal (s) entre deux vérifications de la date de modification
+CHECK_INTERVAL = float(os.getenv("JSON_STORE_CHECK_INTERVAL", "1.0"))
+
+JOURNAL_ENABLED = os.getenv("JSON_JOURNAL", "0").lower() in ("1", "true", "yes")
+JOURNAL_COMPACT_EVERY = int(os.getenv("JSON_JOURNAL_COMPACT_EVERY", "1000"))
+# fsync après chaque ligne: plus lent, mais aucune écriture perdue en cas de panne
+JOURNAL_FSYNC = os.getenv("JSON_JOURNAL_FSYNC", "0").lower() in ("1", "true", "yes")
+
+
+class JsonStore:
+    """Collection d'un fichier JSON indexée par `key`.
+
+    Les documents retournés sont ceux du cache: ils ne doivent pas être
+    modifiés directement, il faut passer par `put` ou `delete`.
+    """
+
+    def __init__(
+        self,
+        path,
+        collection,
+        key,
+        journal=None,
+        compact_every=None,
+    ):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.collection = collection
+        self.key = key
+        self.journal = JOURNAL_ENABLED if journal is None else journal
+        self.compact_every = compact_every or JOURNAL_COMPACT_EVERY
+        self.lock = threading.RLock()
+        self._docs = {}
+        self._sorted_keys = None
+        self._extra = {}
+        self._version = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._journal_file = None
+        self._journal_entries = 0
+        # nom -> (fonction de calcul de la valeur, {valeur: {clé: None}})
+        self._indexes = {}
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+
+    def _stat(self):
+        """Signature des fichiers sur disque (fichier principal et journal)"""
+        version = []
+        for path in (self.path, self.journal_path):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+
+        docs = data.pop(self.collection, [])
+        self._docs = {str(doc[self.key]): doc for doc in docs}
+        self._sorted_keys = None
+        self._extra = data
+        self._journal_entries = self._replay()
+        self._rebuild_indexes()
+        self._loaded = True
+
+    def _replay(self):
+        """Rejoue le journal sur les documents chargés, retourne le nombre d'entrées"""
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return 0
+
+        count = 0
+        valid_size = 0
+        truncated = False
+        with f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("ligne incomplète")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal: on l'ignore
+                    truncated = True
+                    break
+                if entry["op"] == "put":
+                    doc = entry["doc"]
+                    self._docs[str(doc[self.key])] = doc
+                elif entry["op"] == "delete":
+                    self._docs.pop(str(entry["key"]), None)
+                valid_size += len(line)
+                count += 1
+
+        if truncated:
+            # Les prochaines lignes doivent repartir d'une fin de ligne valide
+            os.truncate(self.journal_path, valid_size)
+        return count
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < CHECK_INTERVAL:
+            return
+        with self.lock:
+            self._checked_at = now
+            version = self._stat()
+            if not self._loaded or version != self._version:
+                self._close_journal()
+                self._load()
+                self._version = version
+
+    # ------------------------------------------------------------------
+    # Index secondaires
+    # ------------------------------------------------------------------
+
+    def add_index(self, name, value_of):
+        """Déclare un index secondaire: `value_of(doc)` donne la valeur indexée"""
+        with self.lock:
+            self._indexes[name] = (value_of, {})
+            if self._loaded:
+                self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        for name, (value_of, entries) in self._indexes.items():
+            entries.clear()
+            for key, doc in self._docs.items():
+                entries.setdefault(value_of(doc), {})[key] = None
+
+    def _index_remove(self, key, doc):
+        for value_of, entries in self._indexes.values():
+            value = value_of(doc)
+            keys = entries.get(value)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del entries[value]
+
+    def _index_add(self, key, doc):
+        for value_of, entries in self._indexes.values():
+            entries.setdefault(value_of(doc), {})[key] = None
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def _save(self):
+        data = {self.collection: list(self._docs.values()), **self._extra}
+        # Écriture dans un fichier temporaire puis renommage atomique
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+        # Le fichier contient maintenant tout le journal
+        self._close_journal()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_entries = 0
+        self._version = self._stat()
+
+    def _close_journal(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def _append(self, entry):
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "a")
+        self._journal_file.write(json.dumps(entry) + "\n")
+        self._journal_file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self._journal_file.fileno())
+        self._journal_entries += 1
+
+        if self._journal_entries >= self.compact_every:
+            self._save()
+        else:
+            self._version = self._stat()
+
+    def _persist(self, entry):
+        if self.journal:
+            self._append(entry)
+        else:
+            self._save()
+
+    def compact(self):
+        """Fusionne le journal dans le fichier principal"""
+        with self.lock:
+            self._refresh()
+            if self._journal_entries:
+                self._save()
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def all(self):
+        self._refresh()
+        return list(self._docs.values())
+
+    def get(self, key):
+        self._refresh()
+        return self._docs.get(str(key))
+
+    def get_by(self, index, value):
+        """Premier document dont l'index `index` vaut `value`, ou None"""
+        self._refresh()
+        with self.lock:
+            keys = self._indexes[index][1].get(value)
+            if not keys:
+                return None
+            return self._docs.get(next(iter(keys)))
+
+    def range(self, start=None, end=None, include_start=True):
+        """Parcourt les documents par clé croissante, entre `start` et `end` inclus"""
+        self._refresh()
+        with self.lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self._docs)
+            keys = self._sorted_keys
+
+        if start is None:
+            index = 0
+        elif include_start:
+            index = bisect.bisect_left(keys, str(start))
+        else:
+            index = bisect.bisect_right(keys, str(start))
+
+        for i in range(index, len(keys)):
+            key = keys[i]
+            if end is not None and key > str(end):
+                break
+            doc = self._docs.get(key)
+            if doc is not None:
+                yield doc
+
+    def __contains__(self, key):
+        self._refresh()
+        return str(key) in self._docs
+
+    def __len__(self):
+        self._refresh()
+        return len(self._docs)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def put(self, doc):
+        """Insère ou remplace le document ayant la même clé"""
+        with self.lock:
+            self._refresh()
+            key = str(doc[self.key])
+            old = self._docs.get(key)
+            if old is None:
+                self._sorted_keys = None
+            else:
+                self._index_remove(key, old)
+            self._docs[key] = doc
+            self._index_add(key, doc)
+            self._persist({"op": "put", "doc": doc})
+        return doc
+
+    def put_many(self, docs):
+        """Insère ou remplace plusieurs documents en une seule écriture"""
+        with self.lock:
+            self._refresh()
+            for doc in docs:
+                key = str(doc[self.key])
+                old = self._docs.get(key)
+                if old is None:
+                    self._sorted_keys = None
+                else:
+                    self._index_remove(key, old)
+                self._docs[key] = doc
+                self._index_add(key, doc)
+                if self.journal:
+                    self._append({"op": "put", "doc": doc})
+            if not self.journal:
+                self._save()
+
+    def delete(self, key):
+        """Supprime un document, retourne le document supprimé ou None"""
+        with self.lock:
+            self._refresh()
+            doc = self._docs.pop(str(key), None)
+            if doc is not None:
+                self._sorted_keys = None
+                self._index_remove(str(key), doc)
+                self._persist({"op": "delete", "key": str(key)})
+        return doc
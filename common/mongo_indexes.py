@@ -0,0 +1,133 @@
+"""Création des index MongoDB au démarrage des services.
+
+Chaque service déclare ses index et appelle `ensure_indexes` après
+l'initialisation de sa collection. `create_index` est idempotent: relancer un
+service ne recrée rien. Un rapport vérifie ensuite, avec `explain()`, que les
+recherches par champ indexé passent bien par l'index (IXSCAN) et non par un
+parcours complet de la collection (COLLSCAN).
+
+MONGO_INDEX_REPORT=0 désactive le rapport.
+"""
+
+import os
+
+from pymongo.errors import OperationFailure
+
+INDEX_REPORT = os.getenv("MONGO_INDEX_REPORT", "1").lower() in ("1", "true", "yes")
+
+# Code MongoDB d'une clé dupliquée (index unique impossible à créer)
+DUPLICATE_KEY = 11000
+# Index déjà existant avec d'autres options (ex: non unique)
+INDEX_CONFLICT_CODES = (85, 86)
+# Nombre maximal de valeurs en double affichées
+DUPLICATES_SHOWN = int(os.getenv("MONGO_DUPLICATES_SHOWN", "10"))
+
+# Étapes d'un plan d'exécution qui utilisent un index
+INDEX_STAGES = {"IXSCAN", "EXPRESS_IXSCAN", "IDHACK", "COUNT_SCAN", "DISTINCT_SCAN"}
+
+
+def ensure_indexes(collection, indexes):
+    """Crée les index de `collection`.
+
+    `indexes` est une liste de (clés, options), ex: [("id", {"unique": True})].
+    Les clés sont un champ ou, pour un index composé, une liste de
+    (champ, sens): [("userid", 1), ("date", 1)].
+    Si des doublons empêchent un index unique, un index simple est créé à la
+    place pour garder des recherches indexées, et les valeurs en double sont
+    affichées.
+    """
+    for keys, options in indexes:
+        field = "+".join(_fields(keys))
+        try:
+            collection.create_index(keys, **options)
+        except OperationFailure as e:
+            if e.code == DUPLICATE_KEY and options.get("unique"):
+                print(
+                    f"Index unique {collection.name}.{field} impossible: "
+                    "valeurs en double. Index non unique créé à la place."
+                )
+                report_duplicates(collection, _fields(keys))
+                fallback = {k: v for k, v in options.items() if k != "unique"}
+                collection.create_index(keys, **fallback)
+            elif e.code in INDEX_CONFLICT_CODES:
+                print(
+                    f"Index {collection.name}.{field} déjà présent avec d'autres "
+                    f"options, conservé tel quel: {e}"
+                )
+            else:
+                raise
+
+    if INDEX_REPORT:
+        report_query_plans(collection, [keys for keys, _ in indexes])
+
+
+def _fields(keys):
+    if isinstance(keys, str):
+        return [keys]
+    return [field for field, _ in keys]
+
+
+def find_duplicates(collection, fields, limit=DUPLICATES_SHOWN):
+    """Valeurs de `fields` partagées par plusieurs documents, les plus
+    fréquentes d'abord: [({champ: valeur}, nombre de documents)]"""
+    pipeline = [
+        {"$group": {"_id": {f: f"${f}" for f in fields}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    return [
+        (group["_id"], group["count"])
+        for group in collection.aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+def report_duplicates(collection, fields, limit=DUPLICATES_SHOWN):
+    """Affiche les valeurs en double de `fields`; retourne leur liste"""
+    duplicates = find_duplicates(collection, fields, limit)
+    field = "+".join(fields)
+    for values, count in duplicates:
+        shown = ", ".join(f"{f}={values.get(f)!r}" for f in fields)
+        print(f"Doublon {collection.name}.{field}: {shown} ({count} documents)")
+    return duplicates
+
+
+def _plan_stages(plan):
+    """Liste les étapes d'un plan d'exécution (arbre de inputStage(s))"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            if isinstance(value, (dict, list)):
+                stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def report_query_plans(collection, indexes):
+    """Affiche, pour chaque index, si une recherche par égalité l'utilise"""
+    for keys in indexes:
+        fields = _fields(keys)
+        field = "+".join(fields)
+        sample = collection.find_one({fields[0]: {"$exists": True}})
+        if sample is None:
+            print(f"Plan {collection.name}.{field}: collection vide, non vérifié")
+            continue
+
+        try:
+            explain = collection.find({f: sample.get(f) for f in fields}).explain()
+        except (AttributeError, NotImplementedError, OperationFailure) as e:
+            print(f"Plan {collection.name}.{field}: explain indisponible ({e})")
+            continue
+
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan"))
+        used = INDEX_STAGES.intersection(stages)
+        status = "OK" if used else "ATTENTION"
+        print(
+            f"Plan {collection.name}.{field}: {status} "
+            f"({' > '.join(stages) or 'plan inconnu'})"
+        )
@@ -0,0 +1,68 @@
+"""Durée des commandes MongoDB, mesurée par le monitoring de pymongo.
+
+À passer au client: MongoClient(url, event_listeners=[MongoCommandMetrics()]).
+Chaque commande (find, insert, update, aggregate...) est comptée par
+collection, avec sa durée rapportée par le pilote.
+"""
+
+import threading
+
+from pymongo import monitoring
+
+import metrics
+
+command_duration = metrics.histogram(
+    "mongodb_command_duration_seconds",
+    "Durée des commandes MongoDB",
+    ["command", "collection"],
+)
+command_failures = metrics.counter(
+    "mongodb_command_failures_total",
+    "Commandes MongoDB en échec",
+    ["command", "collection"],
+)
+
+# Commandes internes du pilote, trop fréquentes pour être utiles
+IGNORED_COMMANDS = {
+    "hello",
+    "ismaster",
+    "isMaster",
+    "ping",
+    "saslStart",
+    "saslContinue",
+}
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (connexion, request_id) -> collection, le temps de la commande
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event):
+        with self._lock:
+            collection = self._collections.pop(
+                (event.connection_id, event.request_id), None
+            )
+        if collection is None:
+            return None
+        labels = {"command": event.command_name, "collection": collection}
+        command_duration.observe(event.duration_micros / 1e6, **labels)
+        return labels
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels is not None:
+            command_failures.inc(**labels)
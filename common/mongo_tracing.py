@@ -0,0 +1,47 @@
+"""Spans des commandes MongoDB, à partir du monitoring de pymongo.
+
+À passer au client: MongoClient(url, event_listeners=[MongoCommandTracing()]).
+Une commande n'est tracée que si elle est lancée pendant une requête tracée
+(span courant): l'initialisation des collections au démarrage est ignorée.
+"""
+
+import threading
+
+from pymongo import monitoring
+
+import tracing
+from mongo_metrics import IGNORED_COMMANDS
+
+
+class MongoCommandTracing(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (connexion, request_id) -> span, le temps de la commande
+        self._spans = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS or tracing.current_span() is None:
+            return
+        collection = event.command.get(event.command_name)
+        span = tracing.start_span(
+            f"mongodb.{event.command_name}",
+            "client",
+            attributes={
+                "db": event.database_name,
+                "collection": collection if isinstance(collection, str) else "",
+            },
+        )
+        with self._lock:
+            self._spans[(event.connection_id, event.request_id)] = span
+
+    def _finish(self, event, error=None):
+        with self._lock:
+            span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.end(error)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, str(event.failure.get("errmsg", "échec")))
@@ -0,0 +1,54 @@
+"""Appels sortants vers les autres services: durée et statut par service cible.
+
+Chaque appel est mesuré pour /metrics (outbound_request_duration_seconds et
+outbound_requests_total, labels target / operation / status) et tracé par un
+span client dont le `traceparent` est transmis au service appelé. Les appels
+HTTP passent par `http_request`; les appels gRPC de Booking enregistrent leur
+statut avec `record` (voir booking/clients.py).
+"""
+
+import time
+
+import metrics
+import tracing
+
+outbound_duration = metrics.histogram(
+    "outbound_request_duration_seconds",
+    "Durée des appels aux autres services",
+    ["target", "operation"],
+)
+outbound_requests = metrics.counter(
+    "outbound_requests_total",
+    "Appels aux autres services, par statut (code HTTP ou gRPC, error)",
+    ["target", "operation", "status"],
+)
+
+
+def record(target, operation, start, status):
+    """Enregistre un appel commencé à `start` (time.perf_counter())"""
+    outbound_duration.observe(
+        time.perf_counter() - start, target=target, operation=operation
+    )
+    outbound_requests.inc(target=target, operation=operation, status=status)
+
+
+def http_request(session, method, base_url, path="", **kwargs):
+    """Requête HTTP `method` vers `base_url + path`, mesurée et tracée.
+
+    `session` est une requests.Session (ou le module requests). Une requête
+    sans réponse (connexion refusée, délai dépassé) est comptée avec le
+    statut "error" et son exception est propagée.
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        with tracing.span(
+            f"HTTP {method}", "client", target=base_url, path=path
+        ) as span:
+            kwargs["headers"] = tracing.inject(kwargs.get("headers"))
+            response = session.request(method, f"{base_url}{path}", **kwargs)
+            status = str(response.status_code)
+            span.set_attribute("http.status", response.status_code)
+        return response
+    finally:
+        record(base_url, method, start, status)
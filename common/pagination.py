@@ -0,0 +1,55 @@
+"""Pagination par curseur (`first` / `after`) des listes complètes.
+
+Le curseur est la clé du dernier élément de la page précédente (`id`,
+`userid`...): la page suivante commence juste après, par ordre croissant de
+clé. En MongoDB la requête `{clé: {"$gt": after}}` triée par clé utilise
+l'index unique; en JSON, `JsonStore.range` parcourt les clés triées.
+
+Sans `first` ni `after`, toute la collection est retournée comme avant.
+"""
+
+from itertools import islice
+
+from pymongo import ASCENDING
+
+
+def check_first(first):
+    if first is not None and first < 1:
+        raise ValueError("first doit être un entier strictement positif")
+
+
+def split_page(docs, first, key):
+    """Coupe la page à `first` éléments; curseur suivant s'il en reste"""
+    if first is not None and len(docs) > first:
+        docs = docs[:first]
+        return docs, str(docs[-1][key])
+    return docs, None
+
+
+def mongo_page(collection, key, first=None, after=None, projection=None):
+    """Retourne (documents, curseur suivant ou None) depuis MongoDB.
+
+    `projection` doit inclure `key` pour calculer le curseur suivant.
+    """
+    check_first(first)
+    if first is None and after is None:
+        return list(collection.find({}, projection)), None
+
+    query = {} if after is None else {key: {"$gt": str(after)}}
+    cursor = collection.find(query, projection).sort(key, ASCENDING)
+    if first is not None:
+        # Un élément de plus pour savoir s'il existe une page suivante
+        cursor = cursor.limit(first + 1)
+    return split_page(list(cursor), first, key)
+
+
+def store_page(store, first=None, after=None):
+    """Retourne (documents, curseur suivant ou None) depuis un JsonStore"""
+    check_first(first)
+    if first is None and after is None:
+        return store.all(), None
+
+    docs = store.range(after, include_start=after is None)
+    if first is not None:
+        docs = islice(docs, first + 1)
+    return split_page(list(docs), first, store.key)
@@ -0,0 +1,26 @@
+#!/bin/sh
+# Lance un service Flask: start.sh <module> <port>
+# SERVER_MODE=production -> gunicorn (multi-workers)
+# SERVER_MODE=asgi       -> uvicorn sur asgi.py (services qui en ont un: booking)
+# sinon serveur de développement Flask
+set -e
+
+if [ "$SERVER_MODE" = "production" ]; then
+    exec gunicorn -c gunicorn.conf.py --bind "0.0.0.0:$2" "$1:app"
+fi
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    if [ ! -f asgi.py ]; then
+        echo "SERVER_MODE=asgi non disponible pour le service $1" >&2
+        exit 1
+    fi
+    WORKERS="${UVICORN_WORKERS:-1}"
+    if [ "$PERSISTENCE_TYPE" = "JSON" ]; then
+        # Même contrainte que gunicorn: un seul processus pour les fichiers JSON
+        WORKERS=1
+    fi
+    exec uvicorn asgi:app --host 0.0.0.0 --port "$2" --workers "$WORKERS" \
+        --timeout-graceful-shutdown "${UVICORN_GRACEFUL_TIMEOUT:-30}"
+fi
+
+exec python "$1.py"
@@ -0,0 +1,78 @@
+import pytest
+
+from admin_check import admin_cache, is_admin
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+
+class FetchUser:
+    """Service User simulé: réponses successives, appels comptés"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self, userid):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    admin_cache.clear()
+    yield
+    admin_cache.clear()
+
+
+def test_admin_role_is_cached():
+    fetch = FetchUser(Response(200, {"role": "admin"}))
+
+    assert is_admin("chris", fetch) is True
+    assert is_admin("chris", fetch) is True
+    assert fetch.calls == 1
+
+
+def test_other_roles_are_cached_as_not_admin():
+    fetch = FetchUser(Response(200, {"role": "user"}))
+
+    assert is_admin("peter", fetch) is False
+    assert is_admin("peter", fetch) is False
+    assert fetch.calls == 1
+
+
+def test_unknown_user_is_cached_as_not_admin():
+    fetch = FetchUser(Response(404))
+
+    assert is_admin("ghost", fetch) is False
+    assert is_admin("ghost", fetch) is False
+    assert fetch.calls == 1
+
+
+@pytest.mark.parametrize(
+    "failure", [ConnectionError("service User injoignable"), Response(503)]
+)
+def test_failures_are_not_cached(failure):
+    fetch = FetchUser(failure, Response(200, {"role": "admin"}))
+
+    assert is_admin("chris", fetch) is False
+    # L'appel suivant interroge de nouveau le service User
+    assert is_admin("chris", fetch) is True
+    assert fetch.calls == 2
+
+
+def test_missing_userid_is_not_admin():
+    fetch = FetchUser()
+
+    assert is_admin("", fetch) is False
+    assert is_admin(None, fetch) is False
+    assert fetch.calls == 0
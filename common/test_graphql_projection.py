@@ -0,0 +1,101 @@
+import pytest
+from ariadne import QueryType, graphql_sync, make_executable_schema
+
+from graphql_projection import mongo_projection, selected_fields
+
+TYPE_DEFS = """
+type Movie {
+    id: String!
+    title: String!
+    rating: Float!
+    actors: [Actor!]!
+}
+
+type Actor {
+    id: String!
+    lastname: String!
+}
+
+type MoviePage {
+    movies: [Movie!]!
+    next_cursor: String
+}
+
+type Query {
+    movie: Movie
+    page: MoviePage
+}
+"""
+
+
+@pytest.fixture
+def resolve():
+    """Exécute une requête; retourne l'`info` vue par le résolveur du champ"""
+    seen = {}
+    query = QueryType()
+
+    @query.field("movie")
+    @query.field("page")
+    def capture(obj, info):
+        seen["info"] = info
+        return None
+
+    schema = make_executable_schema(TYPE_DEFS, query)
+
+    def run(document):
+        success, result = graphql_sync(schema, {"query": document})
+        assert success and "errors" not in result, result
+        return seen["info"]
+
+    return run
+
+
+def test_only_direct_fields_are_selected(resolve):
+    info = resolve("{ movie { id title actors { id lastname } } }")
+
+    # Les champs des acteurs ne sont pas des champs du film
+    assert selected_fields(info) == ["id", "title", "actors"]
+
+
+def test_aliases_use_the_field_name(resolve):
+    info = resolve("{ movie { name: title note: rating other: title } }")
+
+    assert selected_fields(info) == ["title", "rating"]
+
+
+def test_fragments_are_expanded(resolve):
+    info = resolve("""
+        query {
+            movie { id ...Details ... on Movie { rating } __typename }
+        }
+        fragment Details on Movie { title }
+        """)
+
+    assert selected_fields(info) == ["id", "title", "rating"]
+
+
+def test_path_selects_the_fields_of_a_nested_list(resolve):
+    info = resolve("""
+        query {
+            page {
+                next_cursor
+                movies { id }
+                more: movies { title ...Rating }
+            }
+        }
+        fragment Rating on Movie { rating }
+        """)
+
+    assert selected_fields(info) == ["next_cursor", "movies"]
+    assert selected_fields(info, ("movies",)) == ["id", "title", "rating"]
+    assert selected_fields(info, ("unknown",)) == []
+
+
+def test_mongo_projection_adds_always_and_hides_id(resolve):
+    info = resolve("{ page { movies { title } } }")
+
+    assert mongo_projection(info, always=("id",), path=("movies",)) == {
+        "_id": 0,
+        "id": 1,
+        "title": 1,
+    }
@@ -0,0 +1,162 @@
+import json
+import os
+
+import pytest
+
+import json_store
+from json_store import JsonStore
+
+
+@pytest.fixture(autouse=True)
+def check_every_time(monkeypatch):
+    # Date de modification vérifiée à chaque lecture
+    monkeypatch.setattr(json_store, "CHECK_INTERVAL", 0)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "movies.json"
+    path.write_text(json.dumps({"movies": [{"id": "a", "title": "A"}]}))
+    return str(path)
+
+
+def open_store(path, **kwargs):
+    return JsonStore(path, "movies", "id", **kwargs)
+
+
+def read_file(path):
+    with open(path) as f:
+        return sorted(doc["id"] for doc in json.load(f)["movies"])
+
+
+def test_journal_is_replayed_on_reopen(path):
+    store = open_store(path, journal=True)
+    store.put({"id": "b", "title": "B"})
+    store.put({"id": "a", "title": "A2"})
+    store.delete("b")
+
+    # Le fichier principal n'est pas réécrit à chaque modification
+    assert read_file(path) == ["a"]
+    assert os.path.exists(f"{path}.journal")
+
+    reopened = open_store(path, journal=True)
+    assert reopened.all() == [{"id": "a", "title": "A2"}]
+
+
+def test_truncated_last_line_is_ignored_and_cut(path):
+    store = open_store(path, journal=True)
+    store.put({"id": "b", "title": "B"})
+    store.put({"id": "c", "title": "C"})
+    journal = f"{path}.journal"
+    with open(journal, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+
+    # Arrêt brutal au milieu de l'écriture de la dernière ligne
+    with open(journal, "wb") as f:
+        f.write(lines[0] + lines[1][: len(lines[1]) // 2])
+
+    reopened = open_store(path, journal=True)
+    assert sorted(doc["id"] for doc in reopened.all()) == ["a", "b"]
+    with open(journal, "rb") as f:
+        assert f.read() == lines[0]
+
+    # Les écritures suivantes repartent d'une ligne complète
+    reopened.put({"id": "d", "title": "D"})
+    again = open_store(path, journal=True)
+    assert sorted(doc["id"] for doc in again.all()) == ["a", "b", "d"]
+
+
+def test_journal_is_compacted_after_compact_every_writes(path):
+    store = open_store(path, journal=True, compact_every=3)
+    store.put({"id": "b", "title": "B"})
+    store.put({"id": "c", "title": "C"})
+    assert read_file(path) == ["a"]
+
+    store.put({"id": "d", "title": "D"})
+
+    assert read_file(path) == ["a", "b", "c", "d"]
+    assert not os.path.exists(f"{path}.journal")
+
+
+def test_compact_merges_the_journal(path):
+    store = open_store(path, journal=True)
+    store.delete("a")
+
+    store.compact()
+
+    assert read_file(path) == []
+    assert not os.path.exists(f"{path}.journal")
+
+
+def test_without_journal_every_write_rewrites_the_file(path):
+    store = open_store(path, journal=False)
+    store.put_many([{"id": "b", "title": "B"}, {"id": "c", "title": "C"}])
+
+    assert read_file(path) == ["a", "b", "c"]
+    assert not os.path.exists(f"{path}.journal")
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_writes_of_another_instance_are_reloaded(path, journal):
+    reader = open_store(path, journal=journal)
+    writer = open_store(path, journal=journal)
+    assert reader.get("b") is None
+
+    writer.put({"id": "b", "title": "B"})
+
+    assert reader.get("b") == {"id": "b", "title": "B"}
+    assert [doc["id"] for doc in reader.range()] == ["a", "b"]
+
+
+def test_manual_edit_is_reloaded(path):
+    store = open_store(path)
+    assert store.get("a")["title"] == "A"
+
+    with open(path, "w") as f:
+        json.dump({"movies": [{"id": "a", "title": "Édité"}]}, f)
+    # Même taille possible: la date de modification doit changer
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert store.get("a")["title"] == "Édité"
+
+
+def test_other_collections_of_the_file_are_kept(path):
+    with open(path, "w") as f:
+        json.dump({"movies": [], "version": 2}, f)
+
+    open_store(path, journal=False).put({"id": "b", "title": "B"})
+
+    with open(path) as f:
+        assert json.load(f)["version"] == 2
+
+
+@pytest.fixture
+def indexed(path):
+    store = open_store(path, journal=True)
+    store.add_index("title", lambda movie: movie["title"].casefold())
+    return store
+
+
+def test_index_follows_put_and_delete(indexed):
+    assert indexed.get_by("title", "a") == {"id": "a", "title": "A"}
+
+    indexed.put({"id": "a", "title": "Renamed"})
+    assert indexed.get_by("title", "a") is None
+    assert indexed.get_by("title", "renamed")["id"] == "a"
+
+    indexed.put_many([{"id": "b", "title": "B"}, {"id": "c", "title": "b"}])
+    assert indexed.get_by("title", "b")["id"] in ("b", "c")
+
+    indexed.delete("b")
+    assert indexed.get_by("title", "b")["id"] == "c"
+    indexed.delete("c")
+    assert indexed.get_by("title", "b") is None
+
+
+def test_index_is_rebuilt_after_reload(indexed, path):
+    assert indexed.get_by("title", "a") is not None
+
+    open_store(path, journal=True).put({"id": "b", "title": "B"})
+
+    assert indexed.get_by("title", "b")["id"] == "b"
@@ -0,0 +1,144 @@
+import math
+import re
+import sys
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import Registry
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$")
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(,|$)')
+UNESCAPE = {"\\\\": "\\", '\\"': '"', "\\n": "\n"}
+
+
+def parse(text):
+    """Texte Prometheus -> ({nom: type}, [(nom, {label: valeur}, valeur)])"""
+    types = {}
+    samples = []
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"ligne invalide: {line!r}"
+        name, raw_labels, value = match.groups()
+        labels = {}
+        position = 0
+        while raw_labels and position < len(raw_labels):
+            label = LABEL.match(raw_labels, position)
+            assert label, f"labels invalides: {raw_labels!r}"
+            labels[label[1]] = re.sub(r"\\.", lambda m: UNESCAPE[m[0]], label[2])
+            position = label.end()
+        samples.append((name, labels, float(value)))
+    return types, samples
+
+
+def values(samples, name, **labels):
+    return [
+        value
+        for sample, sample_labels, value in samples
+        if sample == name and all(sample_labels.get(k) == v for k, v in labels.items())
+    ]
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_label_values_are_escaped(registry):
+    requests = registry.counter("requests_total", "Requêtes", ["path"])
+    tricky = 'a\\b "quoted"\nnext'
+    requests.inc(path=tricky)
+    requests.inc(2, path="/plain")
+
+    types, samples = parse(registry.render())
+
+    assert types == {"requests_total": "counter"}
+    assert values(samples, "requests_total", path=tricky) == [1]
+    assert values(samples, "requests_total", path="/plain") == [2]
+    # Une seule ligne par série, malgré le retour à la ligne du label
+    assert len(samples) == 2
+
+
+def test_histogram_buckets_end_with_inf_and_give_sum_and_count(registry):
+    latency = registry.histogram(
+        "latency_seconds", "Durée", ["route"], buckets=(0.1, 0.5, 1.0)
+    )
+    for value in (0.05, 0.2, 0.3, 0.7, 3.0):
+        latency.observe(value, route="/x")
+
+    types, samples = parse(registry.render())
+
+    assert types == {"latency_seconds": "histogram"}
+    buckets = [
+        (labels["le"], value)
+        for name, labels, value in samples
+        if name == "latency_seconds_bucket"
+    ]
+    assert buckets == [("0.1", 1), ("0.5", 3), ("1", 4), ("+Inf", 5)]
+    assert float(buckets[-1][0]) == math.inf
+    assert values(samples, "latency_seconds_count", route="/x") == [5]
+    assert values(samples, "latency_seconds_sum", route="/x") == [pytest.approx(4.25)]
+    sum_labels = [
+        labels for name, labels, _ in samples if name == "latency_seconds_sum"
+    ]
+    assert sum_labels == [{"route": "/x"}]
+
+
+class FakeSession:
+    """Session HTTP qui répond `status` sans passer par le réseau"""
+
+    def __init__(self, status):
+        self.status = status
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        return type("Response", (), {"status_code": self.status})()
+
+
+def test_http_server_serves_the_process_registry(service, monkeypatch):
+    metrics.counter("test_scrape_total", "Scrape de test", ["code"]).inc(code="OK")
+    metrics.histogram("test_scrape_seconds", "Durée du scrape de test").observe(0.02)
+    # Appels sortants de Movie: User (fetch_user) et un abonné aux événements
+    resolvers = service("movie", "resolvers", PERSISTENCE_TYPE="JSON")
+    user_service = FakeSession(200)
+    monkeypatch.setattr(resolvers, "requests", user_service)
+    events = sys.modules["events"]
+    subscriber = FakeSession(503)
+    monkeypatch.setattr(events, "_session", subscriber)
+    resolvers.fetch_user("chris_rivers")
+    events._send("http://subscriber.test/events", {"event": "x", "id": "1"})
+    assert user_service.calls == [
+        ("GET", f"{resolvers.USER_SERVICE_URL}/users/chris_rivers")
+    ]
+    assert subscriber.calls == [("POST", "http://subscriber.test/events")]
+
+    server = metrics.start_http_server(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            types, samples = parse(response.read().decode())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert types["test_scrape_total"] == "counter"
+    assert types["test_scrape_seconds"] == "histogram"
+    assert values(samples, "test_scrape_total", code="OK") == [1]
+    assert values(samples, "test_scrape_seconds_bucket", le="+Inf") == [1]
+    assert values(samples, "test_scrape_seconds_count") == [1]
+    user = {"target": resolvers.USER_SERVICE_URL, "operation": "GET"}
+    assert values(samples, "outbound_requests_total", status="200", **user) == [1]
+    assert values(samples, "outbound_request_duration_seconds_count", **user) == [1]
+    event = {"target": "http://subscriber.test/events", "operation": "POST"}
+    assert values(samples, "outbound_requests_total", status="503", **event) == [1]
+    assert values(samples, "outbound_request_duration_seconds_count", **event) == [1]
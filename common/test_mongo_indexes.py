@@ -0,0 +1,54 @@
+import pytest
+
+from mongo_indexes import ensure_indexes, find_duplicates
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.users
+    collection.insert_many(
+        [
+            {"id": "a", "name": "Ann"},
+            {"id": "a", "name": "Ann"},
+            {"id": "b", "name": "Bob"},
+            {"id": "c", "name": "Bob"},
+            {"id": "c", "name": "Cid"},
+            {"id": "c", "name": "Cid"},
+        ]
+    )
+    return collection
+
+
+def test_find_duplicates_most_frequent_first(collection):
+    assert find_duplicates(collection, ["id"]) == [({"id": "c"}, 3), ({"id": "a"}, 2)]
+    assert find_duplicates(collection, ["id"], limit=1) == [({"id": "c"}, 3)]
+    # Égalité de nombre: ordre non garanti
+    assert sorted(
+        find_duplicates(collection, ["id", "name"]), key=lambda d: d[0]["id"]
+    ) == [({"id": "a", "name": "Ann"}, 2), ({"id": "c", "name": "Cid"}, 2)]
+
+
+def test_unique_index_with_duplicates_falls_back_and_reports_them(collection, capsys):
+    ensure_indexes(collection, [("id", {"unique": True})])
+
+    out = capsys.readouterr().out
+    assert "Index unique users.id impossible" in out
+    assert "Doublon users.id: id='c' (3 documents)" in out
+    assert "Doublon users.id: id='a' (2 documents)" in out
+    index = next(
+        index
+        for index in collection.index_information().values()
+        if index["key"] == [("id", 1)]
+    )
+    assert not index.get("unique")
+
+
+def test_unique_index_without_duplicates(collection, capsys):
+    collection.delete_many({"id": {"$in": ["a", "c"]}})
+
+    ensure_indexes(collection, [("id", {"unique": True})])
+
+    assert "Doublon" not in capsys.readouterr().out
+    assert any(index.get("unique") for index in collection.index_information().values())
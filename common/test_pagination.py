@@ -0,0 +1,77 @@
+import pytest
+
+from json_store import JsonStore
+from pagination import check_first, mongo_page, split_page, store_page
+
+# Insérés dans le désordre; "10" < "9" en ordre de chaînes
+IDS = ["b", "10", "a", "9", "c", "1"]
+
+
+@pytest.fixture(params=["mongo", "json"])
+def page(request, tmp_path):
+    """page(first, after) sur MongoDB (mongomock) ou sur un JsonStore"""
+    if request.param == "mongo":
+        mongomock = pytest.importorskip("mongomock")
+        collection = mongomock.MongoClient().db.items
+        collection.insert_many([{"id": i, "n": 0} for i in IDS])
+        return lambda first=None, after=None: mongo_page(
+            collection, "id", first, after, projection={"_id": 0}
+        )
+
+    store = JsonStore(str(tmp_path / "items.json"), "items", "id", journal=False)
+    store.put_many([{"id": i, "n": 0} for i in IDS])
+    return lambda first=None, after=None: store_page(store, first, after)
+
+
+def walk(page, first):
+    """Parcourt toutes les pages en suivant les curseurs"""
+    ids = []
+    docs, cursor = page(first)
+    ids.extend(doc["id"] for doc in docs)
+    while cursor is not None:
+        assert len(docs) == first
+        docs, cursor = page(first, cursor)
+        ids.extend(doc["id"] for doc in docs)
+    return ids
+
+
+@pytest.mark.parametrize("first", [1, 2, 4, 6, 10])
+def test_cursors_visit_every_document_once_in_key_order(page, first):
+    assert walk(page, first) == sorted(IDS)
+
+
+def test_next_cursor_is_the_last_key_of_the_page(page):
+    docs, cursor = page(2)
+    assert [doc["id"] for doc in docs] == ["1", "10"]
+    assert cursor == "10"
+
+    docs, cursor = page(2, "a")
+    assert [doc["id"] for doc in docs] == ["b", "c"]
+    assert cursor is None
+
+
+def test_same_request_gives_the_same_page(page):
+    # Documents identiques hors clé: l'ordre ne dépend que de la clé
+    assert page(3, "10") == page(3, "10")
+
+
+def test_without_arguments_everything_is_returned(page):
+    docs, cursor = page()
+    assert sorted(doc["id"] for doc in docs) == sorted(IDS)
+    assert cursor is None
+
+
+def test_after_the_last_key_gives_an_empty_page(page):
+    assert page(2, "c") == ([], None)
+
+
+@pytest.mark.parametrize("first", [0, -1])
+def test_first_must_be_positive(first):
+    with pytest.raises(ValueError):
+        check_first(first)
+
+
+def test_split_page_without_more_documents():
+    docs = [{"id": "a"}, {"id": "b"}]
+    assert split_page(docs, 2, "id") == (docs, None)
+    assert split_page(docs, 1, "id") == ([{"id": "a"}], "a")
@@ -0,0 +1,317 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+
+import metrics
+import tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+
+@pytest.fixture
+def collected():
+    """Spans terminés pendant le test (collecteur en mémoire vidé avant)"""
+    tracing.COLLECTOR.clear()
+    yield tracing.COLLECTOR.spans
+    tracing.COLLECTOR.clear()
+
+
+def by_name(spans, name):
+    (span,) = [s for s in spans if s["name"] == name]
+    return span
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (TRACEPARENT, (TRACE_ID, PARENT_ID, True)),
+        (f"00-{TRACE_ID}-{PARENT_ID}-00", (TRACE_ID, PARENT_ID, False)),
+        (f" 00-{TRACE_ID.upper()}-{PARENT_ID}-03 ", (TRACE_ID, PARENT_ID, True)),
+        (None, None),
+        ("", None),
+        ("n'importe quoi", None),
+        (f"00-{TRACE_ID}-{PARENT_ID}", None),
+        (f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01", None),
+        (f"00-{TRACE_ID}-{PARENT_ID}-1", None),
+        (f"00-{'z' * 32}-{PARENT_ID}-01", None),
+        (f"00-{TRACE_ID}-{PARENT_ID}-zz", None),
+        (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+        (f"00-{TRACE_ID}-{'0' * 16}-01", None),
+        (f"ff-{TRACE_ID}-{PARENT_ID}-01", None),
+    ],
+)
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+
+def test_invalid_traceparent_starts_a_new_trace():
+    span = tracing.start_span("x", traceparent=f"ff-{TRACE_ID}-{PARENT_ID}-01")
+    assert span.trace_id != TRACE_ID
+    assert span.parent_id is None
+
+
+def test_inject_and_bind_link_children_across_threads(collected):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with tracing.span("parent") as parent:
+            headers = tracing.inject({"accept": "application/json"})
+            remote = tracing.start_span("remote", "server", headers["traceparent"])
+            remote.end()
+
+            def child():
+                with tracing.span("child"):
+                    return tracing.current_span().parent_id
+
+            assert executor.submit(tracing.bind(child)).result() == parent.span_id
+            # Sans bind(), le thread du pool ne voit pas le span de l'appelant
+            assert executor.submit(tracing.current_span).result() is None
+
+    assert headers == {
+        "accept": "application/json",
+        "traceparent": parent.traceparent(),
+    }
+    spans = collected()
+    assert {s["trace_id"] for s in spans} == {parent.trace_id}
+    assert by_name(spans, "remote")["parent_id"] == parent.span_id
+    assert by_name(spans, "child")["parent_id"] == parent.span_id
+    assert tracing.inject() == {}
+
+
+def test_flask_server_span_inherits_the_traceparent(collected):
+    app = Flask(__name__)
+    tracing.instrument_flask(app)
+    seen = []
+
+    @app.route("/items/<item_id>")
+    def item(item_id):
+        seen.append(tracing.current_span())
+        return {"id": item_id}
+
+    @app.route("/metrics")
+    def metrics_route():
+        return "ok"
+
+    client = app.test_client()
+    assert (
+        client.get("/items/1", headers={"traceparent": TRACEPARENT}).status_code == 200
+    )
+    client.get("/metrics")
+    client.get("/absent")
+
+    spans = collected()
+    server = by_name(spans, "GET /items/<item_id>")
+    assert (server["trace_id"], server["parent_id"]) == (TRACE_ID, PARENT_ID)
+    assert server["kind"] == "server"
+    assert server["attributes"]["http.status"] == 200
+    assert seen[0].span_id == server["span_id"]
+    assert by_name(spans, "GET /absent")["attributes"]["http.status"] == 404
+    assert len(spans) == 2
+    assert tracing.current_span() is None
+
+
+def test_asgi_server_span_inherits_the_traceparent(collected):
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(tracing.current_span())
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def failing(scope, receive, send):
+        raise RuntimeError("panne")
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    def scope(path, headers=()):
+        return {"type": "http", "method": "POST", "path": path, "headers": headers}
+
+    async def requests():
+        middleware = tracing.TracingMiddleware(app)
+        await middleware(
+            scope("/graphql", [(b"traceparent", TRACEPARENT.encode())]), receive, send
+        )
+        await middleware(scope("/metrics"), receive, send)
+        with pytest.raises(RuntimeError):
+            await tracing.TracingMiddleware(failing)(scope("/boom"), receive, send)
+
+    asyncio.run(requests())
+
+    spans = collected()
+    server = by_name(spans, "POST /graphql")
+    assert (server["trace_id"], server["parent_id"]) == (TRACE_ID, PARENT_ID)
+    assert server["attributes"]["http.status"] == 201
+    assert seen[0].span_id == server["span_id"]
+    assert by_name(spans, "POST /boom")["error"] == "RuntimeError: panne"
+    assert len(spans) == 2
+
+
+@pytest.mark.parametrize("mode", ["sync", "aio"])
+def test_traceparent_reaches_the_schedule_servicer(
+    mode, schedule_server, service, collected, monkeypatch
+):
+    _, servicer, target = schedule_server(mode, PERSISTENCE_TYPE="JSON")
+    seen = []
+    get = servicer.store.get
+
+    def traced_get(date):
+        seen.append(tracing.current_span())
+        return get(date)
+
+    monkeypatch.setattr(servicer.store, "get", traced_get)
+    r = service(
+        "booking", "resolvers", PERSISTENCE_TYPE="JSON", SCHEDULE_SERVICE_URL=target
+    )
+    try:
+        with tracing.span("request") as request:
+            assert r.get_schedule_by_date("20151130")["date"] == "20151130"
+    finally:
+        r.clients.close_all()
+
+    spans = collected()
+    (client,) = [s for s in spans if s["kind"] == "client"]
+    (server,) = [s for s in spans if s["kind"] == "server"]
+    assert client["name"] == server["name"] == "grpc /schedule.Schedule/GetByDate"
+    assert client["parent_id"] == request.span_id
+    assert server["parent_id"] == client["span_id"]
+    assert server["trace_id"] == request.trace_id
+    assert server["attributes"]["grpc.code"] == "OK"
+    assert seen[0].span_id == server["span_id"]
+
+
+def span(span_id, parent_id, start, duration_ms, **fields):
+    record = {
+        "trace_id": "t1",
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "name": span_id,
+        "kind": "internal",
+        "service": "booking",
+        "start": start,
+        "duration_ms": duration_ms,
+        "error": None,
+        "attributes": {},
+    }
+    record.update(fields)
+    return record
+
+
+# root (0 -> 100 ms)
+# ├── movies (10 -> 40 ms)
+# ├── schedule (10 -> 90 ms)
+# │   └── mongo (20 -> 85 ms)
+# └── event (150 -> 160 ms), envoyé après la réponse
+TREE = [
+    span("root", None, 0.0, 100),
+    span("movies", "root", 0.010, 30, service="movie"),
+    span("schedule", "root", 0.010, 80, service="schedule"),
+    span("mongo", "schedule", 0.020, 65, service="schedule", error="timeout"),
+    span("event", "root", 0.150, 10),
+]
+
+
+def test_critical_path_follows_the_last_awaited_child():
+    assert [s["span_id"] for s in tracing.critical_path(TREE)] == [
+        "root",
+        "schedule",
+        "mongo",
+    ]
+    assert tracing.critical_path([]) == []
+
+
+def test_summarize_orders_traces_by_root_duration():
+    other = [span("fast", "remote-parent", 0.0, 5, trace_id="t2", service="user")]
+
+    assert tracing.summarize(other + TREE) == [
+        {
+            "trace_id": "t1",
+            "root": "booking root",
+            "duration_ms": 100,
+            "spans": 5,
+            "services": ["booking", "movie", "schedule"],
+            "errors": 1,
+        },
+        {
+            "trace_id": "t2",
+            "root": "user fast",
+            "duration_ms": 5,
+            "spans": 1,
+            "services": ["user"],
+            "errors": 0,
+        },
+    ]
+    assert [t["trace_id"] for t in tracing.summarize(other + TREE, limit=1)] == ["t1"]
+
+
+def dropped():
+    for line in metrics.render().splitlines():
+        if line.startswith("trace_spans_dropped_total "):
+            return float(line.split()[1])
+    return 0
+
+
+def test_file_sampling_is_decided_by_the_trace_id(tmp_path, monkeypatch):
+    exporter = tracing.FileExporter(str(tmp_path / "traces" / "booking.jsonl"))
+    monkeypatch.setattr(tracing, "FILE_EXPORTER", exporter)
+    monkeypatch.setattr(tracing, "TRACE_FILE_SAMPLE_RATE", 0.5)
+    kept = "1" * 24 + "00000000"
+    skipped = "1" * 24 + "ffffffff"
+
+    for trace_id in (kept, skipped, kept):
+        tracing.start_span("x", traceparent=f"00-{trace_id}-{PARENT_ID}-01").end()
+    # Trace non échantillonnée par l'appelant: jamais exportée
+    tracing.start_span("x", traceparent=f"00-{kept}-{PARENT_ID}-00").end()
+    exporter.flush()
+
+    with open(tmp_path / "traces" / "booking.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["trace_id"] for r in records] == [kept, kept]
+
+
+def test_full_queue_drops_and_counts_spans(tmp_path, monkeypatch):
+    exporter = tracing.FileExporter(str(tmp_path / "spans.jsonl"), queue_size=1)
+    release = threading.Event()
+    write = exporter._write
+
+    def slow_write(batch):
+        release.wait(5)
+        write(batch)
+
+    monkeypatch.setattr(exporter, "_write", slow_write)
+    before = dropped()
+
+    exporter.submit({"n": 1})
+    # Le thread a pris le premier span et attend le disque
+    while not exporter._queue.empty():
+        time.sleep(0.001)
+    exporter.submit({"n": 2})
+    exporter.submit({"n": 3})
+    exporter.submit({"n": 4})
+    assert dropped() == before + 2
+
+    release.set()
+    exporter.flush()
+    with open(tmp_path / "spans.jsonl") as f:
+        assert [json.loads(line)["n"] for line in f] == [1, 2]
+
+
+def test_write_errors_are_counted_as_dropped(tmp_path):
+    (tmp_path / "file").write_text("")
+    # Dossier impossible à créer: un fichier porte déjà ce nom
+    exporter = tracing.FileExporter(str(tmp_path / "file" / "spans.jsonl"))
+    before = dropped()
+
+    exporter.submit({"n": 1})
+    exporter.submit({"n": 2})
+    exporter.flush()
+
+    assert dropped() == before + 2
@@ -0,0 +1,103 @@
+import pytest
+
+import ttl_cache
+from ttl_cache import MISSING, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge de ttl_cache avancée à la main: clock["now"] += secondes"""
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: clock["now"])
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+
+    clock["now"] += 9.9
+    assert cache.get("a") == 1
+    clock["now"] += 0.1
+    assert cache.get("a") is MISSING
+    assert cache.stats()["size"] == 0
+
+
+def test_negative_results_have_their_own_ttl(clock):
+    cache = TTLCache(ttl=10, negative_ttl=2)
+    cache.set("found", {"id": "found"})
+    cache.set("absent", None)
+    cache.set("refused", False)
+
+    clock["now"] += 2
+    assert cache.get("absent") is MISSING
+    assert cache.get("refused") is MISSING
+    assert cache.get("found") == {"id": "found"}
+
+
+def test_none_is_a_cached_value_distinct_from_missing(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("absent", None)
+
+    assert cache.get("absent") is None
+    assert cache.get("other") is MISSING
+    assert cache.get("other", "défaut") == "défaut"
+
+
+def test_zero_ttl_removes_the_previous_value(clock):
+    cache = TTLCache(ttl=10, negative_ttl=0)
+    cache.set("user", True)
+
+    # Résultat négatif non mis en cache: l'ancien résultat positif disparaît
+    cache.set("user", False)
+
+    assert cache.get("user") is MISSING
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_set_refreshes_an_existing_entry(clock):
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    clock["now"] += 5
+    cache.set("a", 10)
+    cache.set("c", 3)
+
+    clock["now"] += 6
+    assert cache.get("a") == 10
+    assert cache.get("b") is MISSING
+
+
+def test_stats_count_hits_misses_and_invalidations(clock):
+    cache = TTLCache(ttl=10, maxsize=5)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    cache.invalidate("a")
+    cache.invalidate("a")
+    cache.get("a")
+
+    assert cache.stats() == {
+        "size": 0,
+        "maxsize": 5,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+        "invalidations": 1,
+    }
@@ -0,0 +1,565 @@
+"""Traces distribuées des appels entre services (contexte W3C `traceparent`).
+
+Une requête reçue par un service ouvre un span serveur; les résolveurs, les
+commandes MongoDB et les appels sortants (HTTP, gRPC) ouvrent des spans
+enfants. L'en-tête `traceparent` (HTTP) ou la métadonnée du même nom (gRPC)
+transmet l'identifiant de la trace au service appelé, qui rattache ses spans
+à ceux de l'appelant.
+
+Le span courant est gardé dans une ContextVar: il suit la requête dans son
+thread et dans ses coroutines. Pour une fonction exécutée dans un pool de
+threads, `bind()` recopie le contexte de l'appelant.
+
+Les spans terminés sont exportés:
+- dans un collecteur en mémoire (TRACE_BUFFER_SIZE derniers spans), lu par la
+  route /traces de chaque service HTTP;
+- en JSON Lines dans TRACE_FILE si la variable est définie (un fichier par
+  service), par un thread d'arrière-plan, pour reconstituer les traces
+  complètes:
+
+    python common/tracing.py traces/*.jsonl [--trace <trace_id>]
+"""
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+HEADER = "traceparent"
+
+# Export en JSON Lines, désactivé par défaut
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+# Fraction des traces enregistrées écrites dans TRACE_FILE
+TRACE_FILE_SAMPLE_RATE = float(os.getenv("TRACE_FILE_SAMPLE_RATE", "1.0"))
+# Spans en attente d'écriture au-delà desquels les suivants sont abandonnés
+TRACE_FILE_QUEUE_SIZE = int(os.getenv("TRACE_FILE_QUEUE_SIZE", "10000"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "2000"))
+# Fraction des nouvelles traces enregistrées (une trace reçue garde la
+# décision de l'appelant)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+spans_dropped = metrics.counter(
+    "trace_spans_dropped_total",
+    "Spans non écrits dans TRACE_FILE (file d'export pleine ou erreur d'écriture)",
+)
+
+_service = os.getenv("SERVICE_NAME", "")
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+def set_service(name):
+    """Nom du service inscrit dans ses spans (movie, booking...)"""
+    global _service
+    _service = name
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "service",
+        "sampled",
+        "attributes",
+        "start_time",
+        "duration",
+        "error",
+        "_start",
+    )
+
+    def __init__(self, name, kind, trace_id, parent_id, sampled, attributes):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.service = _service
+        self.sampled = sampled
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.duration = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self, error=None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if isinstance(error, str):
+            self.error = error
+        elif error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            _export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": self.service,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def parse_traceparent(value):
+    """Retourne (trace_id, parent_id, sampled), ou None si l'en-tête est invalide"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4:
+        return None
+    version, trace_id, parent_id, flags = parts
+    if len(version) != 2 or version == "ff":
+        return None
+    if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16)
+        int(parent_id, 16)
+        sampled = int(flags, 16) & 1 == 1
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id.lower(), parent_id.lower(), sampled
+
+
+def current_span():
+    return _current.get()
+
+
+def start_span(name, kind="internal", traceparent=None, attributes=None):
+    """Crée un span (sans le rendre courant).
+
+    Parent: l'en-tête `traceparent` reçu s'il est valide, sinon le span
+    courant; sans parent, le span commence une nouvelle trace.
+    """
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    else:
+        parent = _current.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = (
+                parent.trace_id,
+                parent.span_id,
+                parent.sampled,
+            )
+        else:
+            trace_id = secrets.token_hex(16)
+            parent_id = None
+            sampled = TRACE_SAMPLE_RATE >= 1.0 or random.random() < TRACE_SAMPLE_RATE
+    return Span(name, kind, trace_id, parent_id, sampled, dict(attributes or {}))
+
+
+def activate(span):
+    """Rend `span` courant; retourne le jeton à passer à deactivate()"""
+    return _current.set(span)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name, kind="internal", traceparent=None, **attributes):
+    """Span courant pendant le bloc `with`, terminé avec l'erreur éventuelle"""
+    current = start_span(name, kind, traceparent, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def inject(headers=None):
+    """Ajoute l'en-tête `traceparent` du span courant à `headers` (dict)"""
+    headers = dict(headers or {})
+    current = _current.get()
+    if current is not None:
+        headers[HEADER] = current.traceparent()
+    return headers
+
+
+def bind(func, *args, **kwargs):
+    """`func(*args, **kwargs)` à exécuter dans un autre thread avec le contexte
+    de trace de l'appelant (run_in_executor, ThreadPoolExecutor.submit)"""
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+# ============================================================================
+# SERVEURS HTTP
+# ============================================================================
+
+# Routes d'observation, non tracées
+IGNORED_PATHS = {"/metrics", "/traces"}
+
+
+def instrument_flask(app):
+    """Un span serveur par requête Flask, rattaché au `traceparent` reçu"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        if request.path in IGNORED_PATHS:
+            return
+        rule = request.url_rule.rule if request.url_rule else request.path
+        current = start_span(
+            f"{request.method} {rule}",
+            "server",
+            request.headers.get(HEADER),
+            {"http.method": request.method, "http.path": request.path},
+        )
+        g.trace_span = (current, _current.set(current))
+
+    @app.after_request
+    def _record_status(response):
+        item = g.get("trace_span")
+        if item is not None:
+            item[0].set_attribute("http.status", response.status_code)
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error):
+        item = g.pop("trace_span", None)
+        if item is not None:
+            current, token = item
+            _current.reset(token)
+            current.end(error)
+
+
+class TracingMiddleware:
+    """Middleware ASGI (Starlette): un span serveur par requête HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in IGNORED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = dict(scope["headers"]).get(HEADER.encode(), b"")
+        current = start_span(
+            f"{scope['method']} {scope['path']}",
+            "server",
+            traceparent.decode("latin-1"),
+            {"http.method": scope["method"], "http.path": scope["path"]},
+        )
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                current.set_attribute("http.status", message["status"])
+            await send(message)
+
+        token = _current.set(current)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            current.end(e)
+            raise
+        finally:
+            _current.reset(token)
+            current.end()
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+
+class Collector:
+    """Derniers spans terminés du processus"""
+
+    def __init__(self, size=TRACE_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=size)
+
+    def add(self, record):
+        with self._lock:
+            self._spans.append(record)
+
+    def spans(self, trace_id=None):
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s["trace_id"] == trace_id]
+        return spans
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+COLLECTOR = Collector()
+
+
+class FileExporter:
+    """Écrit les spans en JSON Lines depuis un thread d'arrière-plan.
+
+    `submit` ne fait que déposer le span dans une file bornée: la requête
+    n'attend jamais le disque. Si la file est pleine (disque lent), le span
+    est abandonné et compté dans trace_spans_dropped_total. Le thread
+    regroupe les spans en attente en une écriture par lot.
+    """
+
+    def __init__(self, path, queue_size=10000, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._fd = None
+
+    def submit(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            spans_dropped.inc()
+
+    def flush(self, timeout=5.0):
+        """Attend que les spans déjà soumis soient écrits (tests, arrêt)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_started(self):
+        # Un thread par processus: après un fork, le thread du parent
+        # n'existe pas dans l'enfant
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="trace-exporter", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError as e:
+                spans_dropped.inc(len(batch))
+                print(f"Export de trace impossible ({self.path}): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            for record in batch
+        ).encode()
+        # Écritures en O_APPEND: les workers d'un même service peuvent
+        # partager le fichier
+        while data:
+            data = data[os.write(self._fd, data) :]
+
+
+FILE_EXPORTER = FileExporter(TRACE_FILE, TRACE_FILE_QUEUE_SIZE) if TRACE_FILE else None
+
+
+def _file_sampled(trace_id):
+    # Décision tirée du trace_id: tous les services gardent ou écartent
+    # les mêmes traces
+    if TRACE_FILE_SAMPLE_RATE >= 1.0:
+        return True
+    return int(trace_id[-8:], 16) / 0x100000000 < TRACE_FILE_SAMPLE_RATE
+
+
+def _export(span):
+    record = span.to_dict()
+    COLLECTOR.add(record)
+    if FILE_EXPORTER is not None and _file_sampled(span.trace_id):
+        FILE_EXPORTER.submit(record)
+
+
+# ============================================================================
+# ANALYSE
+# ============================================================================
+
+
+def _end(record):
+    return record["start"] + record["duration_ms"] / 1000
+
+
+def critical_path(spans):
+    """Spans qui déterminent la durée de la trace, de la racine à la feuille.
+
+    À chaque niveau, on suit l'enfant qui se termine le plus tard: c'est lui
+    que le parent a attendu en dernier. Les enfants lancés après la fin du
+    parent (envoi d'événement en arrière-plan) ne sont pas attendus.
+    """
+    by_id = {s["span_id"]: s for s in spans}
+    children = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+    roots = [s for s in spans if s["parent_id"] not in by_id]
+    if not roots:
+        return []
+
+    path = [max(roots, key=lambda s: s["duration_ms"])]
+    while True:
+        parent = path[-1]
+        awaited = [
+            s for s in children.get(parent["span_id"], []) if s["start"] <= _end(parent)
+        ]
+        if not awaited:
+            return path
+        path.append(max(awaited, key=_end))
+
+
+def summarize(spans, limit=20):
+    """Traces les plus lentes: durée de la racine, nombre de spans, services"""
+    traces = {}
+    for s in spans:
+        traces.setdefault(s["trace_id"], []).append(s)
+
+    summaries = []
+    for trace_id, trace_spans in traces.items():
+        ids = {s["span_id"] for s in trace_spans}
+        root = max(
+            (s for s in trace_spans if s["parent_id"] not in ids),
+            key=lambda s: s["duration_ms"],
+        )
+        summaries.append(
+            {
+                "trace_id": trace_id,
+                "root": f"{root['service']} {root['name']}",
+                "duration_ms": root["duration_ms"],
+                "spans": len(trace_spans),
+                "services": sorted({s["service"] for s in trace_spans}),
+                "errors": sum(1 for s in trace_spans if s["error"]),
+            }
+        )
+    summaries.sort(key=lambda t: t["duration_ms"], reverse=True)
+    return summaries[:limit]
+
+
+def trace_report(spans, trace_id=None, limit=20):
+    """Contenu de la route /traces: résumé des traces, ou détail d'une trace"""
+    if trace_id is None:
+        return {"traces": summarize(spans, limit)}
+    spans = sorted(
+        (s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start"]
+    )
+    return {
+        "trace_id": trace_id,
+        "spans": spans,
+        "critical_path": [
+            {
+                "service": s["service"],
+                "name": s["name"],
+                "duration_ms": s["duration_ms"],
+            }
+            for s in critical_path(spans)
+        ],
+    }
+
+
+def _print_tree(spans):
+    children = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+    on_path = {s["span_id"] for s in critical_path(spans)}
+    start = min(s["start"] for s in spans)
+
+    def walk(parent, depth):
+        for s in children.get(parent, []):
+            marker = "*" if s["span_id"] in on_path else " "
+            offset = (s["start"] - start) * 1000
+            error = f"  !! {s['error']}" if s["error"] else ""
+            print(
+                f"{marker} {offset:8.1f} ms {s['duration_ms']:8.1f} ms  "
+                f"{'  ' * depth}[{s['service']}] {s['name']}{error}"
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+
+
+def _load(paths):
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def main(argv):
+    trace_id = None
+    if "--trace" in argv:
+        index = argv.index("--trace")
+        trace_id = argv[index + 1]
+        argv = argv[:index] + argv[index + 2 :]
+    if not argv:
+        print("Usage: python tracing.py <fichiers .jsonl> [--trace <trace_id>]")
+        return 1
+
+    spans = _load(argv)
+    if trace_id is None:
+        print("Traces les plus lentes (durée de la racine):")
+        for t in summarize(spans):
+            print(
+                f"  {t['trace_id']}  {t['duration_ms']:8.1f} ms  {t['spans']:3} spans  "
+                f"{','.join(t['services'])}  {t['root']}"
+            )
+        return 0
+
+    trace_spans = [s for s in spans if s["trace_id"] == trace_id]
+    if not trace_spans:
+        print(f"Trace {trace_id} introuvable")
+        return 1
+    print(f"Trace {trace_id} (* = chemin critique)")
+    _print_tree(trace_spans)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,75 @@
+"""Cache clé/valeur en mémoire dont les entrées expirent après `ttl` secondes.
+
+Le cache est borné à `maxsize` entrées (les moins récemment utilisées sont
+évincées en premier). Les résultats négatifs (None, False) peuvent avoir
+leur propre durée de vie `negative_ttl`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Valeur retournée par `get` quand la clé est absente ou expirée
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl, maxsize=None, negative_ttl=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        ttl = self.ttl if value else self.negative_ttl
+        with self._lock:
+            if ttl <= 0:
+                # Valeur non mise en cache: l'ancienne ne doit pas rester
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
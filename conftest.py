@@ -0,0 +1,139 @@
+"""Fixtures communes des tests unitaires (python -m pytest depuis la racine).
+
+Les services importent leurs modules à plat (`import resolvers`,
+`import json_store`): common/ est ajouté au chemin, et `service` charge les
+modules d'un service dans une copie de son dossier data/. `schedule_server`
+lance le serveur gRPC Schedule dans le processus des tests.
+"""
+
+import asyncio
+import importlib
+import inspect
+import os
+import shutil
+import socket
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "common"))
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Remplace pymongo.MongoClient par une base mongomock en mémoire"""
+    mongomock = pytest.importorskip("mongomock")
+    import pymongo
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo passe aux opérations groupées des arguments (sort...) que
+    # mongomock ne connaît pas encore: ils sont ignorés
+    for name in ("add_insert", "add_update", "add_replace", "add_delete"):
+        method = getattr(BulkOperationBuilder, name, None)
+        if method is None:
+            continue
+        accepted = set(inspect.signature(method).parameters)
+
+        def compatible(self, *args, _method=method, _accepted=accepted, **kwargs):
+            kwargs = {key: value for key, value in kwargs.items() if key in _accepted}
+            return _method(self, *args, **kwargs)
+
+        monkeypatch.setattr(BulkOperationBuilder, name, compatible)
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(pymongo, "MongoClient", lambda *args, **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """Importe un module d'un service, avec une copie de ses données et schémas.
+
+    service("booking", "resolvers", PERSISTENCE_TYPE="JSON") lance le module
+    dans tmp_path (copie de booking/data) avec ces variables d'environnement.
+    Les modules du service déjà importés sont rechargés: booking et movie
+    ont tous deux un module `resolvers`. Plusieurs services d'un même test
+    partagent tmp_path; les données de chacun ne sont copiées qu'une fois.
+    """
+    copied = set()
+
+    def load(name, module, **env):
+        directory = os.path.join(ROOT, name)
+        if name not in copied:
+            copied.add(name)
+            shutil.copytree(
+                os.path.join(directory, "data"),
+                os.path.join(tmp_path, "data"),
+                dirs_exist_ok=True,
+            )
+            # Schémas GraphQL, lus comme les données depuis le dossier courant
+            for filename in os.listdir(directory):
+                if filename.endswith(".graphql"):
+                    shutil.copy(os.path.join(directory, filename), tmp_path)
+        monkeypatch.chdir(tmp_path)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        for filename in os.listdir(directory):
+            if filename.endswith(".py"):
+                monkeypatch.delitem(sys.modules, filename[:-3], raising=False)
+        monkeypatch.syspath_prepend(directory)
+        return importlib.import_module(module)
+
+    return load
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def schedule_server(service):
+    """Lance le serveur gRPC Schedule dans ce processus, arrêté en fin de test.
+
+    schedule_server("aio", PERSISTENCE_TYPE="JSON") retourne
+    (module schedule, servicer, "127.0.0.1:port"). Le serveur aio tourne
+    dans sa propre boucle, dans un thread: un client synchrone interroge
+    les deux modes.
+    """
+    stops = []
+
+    def start(mode="sync", **env):
+        schedule = service("schedule", "schedule", **env)
+        servicer = schedule.ScheduleServicer()
+        port = free_port()
+        if mode == "sync":
+            server = schedule.create_server(servicer, port)
+            server.start()
+            stops.append(lambda: server.stop(None))
+            return schedule, servicer, f"127.0.0.1:{port}"
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def run(coroutine):
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result(10)
+
+        async def create():
+            server = schedule.create_aio_server(servicer, port)
+            await server.start()
+            return server
+
+        server = run(create())
+
+        def stop():
+            run(server.stop(None))
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        stops.append(stop)
+        return schedule, servicer, f"127.0.0.1:{port}"
+
+    yield start
+    for stop in reversed(stops):
+        stop()
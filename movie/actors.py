@@ -0,0 +1,89 @@
+"""Catalogue des acteurs et index inverse film -> acteurs.
+
+Chaque acteur liste ses films (`films`). Pour résoudre Movie.actors sans
+parcourir tous les acteurs, l'index associe à chaque ID de film les IDs de
+ses acteurs. Il est mis à jour par les mutations du service et reconstruit
+toutes les ACTOR_INDEX_REBUILD_INTERVAL secondes (voir rebuilt_index.py).
+"""
+
+import os
+
+from rebuilt_index import RebuiltIndex
+
+ACTOR_INDEX_REBUILD_INTERVAL = float(os.getenv("ACTOR_INDEX_REBUILD_INTERVAL", "60"))
+
+FIELDS = ("id", "firstname", "lastname", "birthyear", "films")
+
+
+class ActorIndex(RebuiltIndex):
+    """Acteurs par ID et acteurs de chaque film.
+
+    `load_actors()` retourne tous les acteurs; il sert à la construction
+    initiale et aux reconstructions périodiques.
+    """
+
+    def __init__(self, load_actors, rebuild_interval=ACTOR_INDEX_REBUILD_INTERVAL):
+        super().__init__(load_actors, rebuild_interval)
+        self._actors = {}
+        self._by_film = {}
+
+    def _fill(self, actors):
+        self._actors = {}
+        self._by_film = {}
+        for actor in actors:
+            self._put(actor)
+
+    def _put(self, actor):
+        actor = {field: actor[field] for field in FIELDS if field in actor}
+        actor["id"] = str(actor["id"])
+        actor["films"] = [str(movie_id) for movie_id in actor.get("films", [])]
+        self._remove(actor["id"])
+        self._actors[actor["id"]] = actor
+        for movie_id in actor["films"]:
+            self._by_film.setdefault(movie_id, {})[actor["id"]] = None
+
+    def _remove(self, actor_id):
+        actor = self._actors.pop(actor_id, None)
+        if actor is None:
+            return
+        for movie_id in actor["films"]:
+            cast = self._by_film.get(movie_id)
+            if cast is not None:
+                cast.pop(actor_id, None)
+                if not cast:
+                    del self._by_film[movie_id]
+
+    def put(self, actor):
+        """Ajoute ou remplace un acteur (changement de sa liste de films)"""
+        if not self.built:
+            return
+        with self.lock:
+            self._put(actor)
+
+    def remove_film(self, movie_id):
+        """Retire un film supprimé de la filmographie de ses acteurs"""
+        if not self.built:
+            return
+        movie_id = str(movie_id)
+        with self.lock:
+            for actor_id in self._by_film.pop(movie_id, {}):
+                actor = self._actors[actor_id]
+                self._actors[actor_id] = dict(
+                    actor, films=[m for m in actor["films"] if m != movie_id]
+                )
+
+    def get(self, actor_id):
+        self._refresh()
+        return self._actors.get(str(actor_id))
+
+    def all(self):
+        self._refresh()
+        with self.lock:
+            return sorted(self._actors.values(), key=lambda actor: actor["id"])
+
+    def actors_of(self, movie_id):
+        """Acteurs d'un film (recherche directe dans l'index)"""
+        self._refresh()
+        with self.lock:
+            cast = self._by_film.get(str(movie_id), {})
+            return [self._actors[actor_id] for actor_id in cast]
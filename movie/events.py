@@ -0,0 +1,55 @@
+"""Publication des modifications de films aux services qui les gardent en cache.
+
+Après add_movie, update_movie_rating et delete_movie, un événement
+{"event": ..., "id": ...} est envoyé en POST à chaque URL de
+MOVIE_EVENT_SUBSCRIBERS (séparées par des virgules, vide pour désactiver).
+L'envoi se fait en arrière-plan: une mutation n'attend pas les abonnés, et un
+abonné injoignable est seulement signalé dans les logs (son cache expirera
+avec son TTL).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import outbound
+import tracing
+
+MOVIE_EVENT_SUBSCRIBERS = [
+    url.strip()
+    for url in os.getenv(
+        "MOVIE_EVENT_SUBSCRIBERS", "http://booking:3201/events/movies"
+    ).split(",")
+    if url.strip()
+]
+MOVIE_EVENT_TIMEOUT = float(os.getenv("MOVIE_EVENT_TIMEOUT", "2"))
+
+MOVIE_ADDED = "movie_added"
+MOVIE_UPDATED = "movie_updated"
+MOVIE_DELETED = "movie_deleted"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="movie-events")
+_session = requests.Session()
+
+
+def _send(url, payload):
+    try:
+        response = outbound.http_request(
+            _session, "POST", url, json=payload, timeout=MOVIE_EVENT_TIMEOUT
+        )
+        if response.status_code != 200:
+            print(
+                f"Événement {payload['event']} refusé par {url}: "
+                f"HTTP {response.status_code}"
+            )
+    except requests.RequestException as e:
+        print(f"Événement {payload['event']} non transmis à {url}: {e}")
+
+
+def publish_movie_event(event, movie_id):
+    """Envoie l'événement à tous les abonnés sans attendre leur réponse"""
+    payload = {"event": event, "id": str(movie_id)}
+    for url in MOVIE_EVENT_SUBSCRIBERS:
+        # L'envoi reste rattaché à la trace de la mutation
+        _executor.submit(tracing.bind(_send, url, payload))
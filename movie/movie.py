@@ -4,27 +4,44 @@ from ariadne import (
     load_schema_from_path,
     QueryType,
     MutationType,
+    ObjectType,
 )
 from flask import Flask, request, jsonify, make_response
 
 import resolvers as r
+import metrics
+import tracing
+from admin_check import admin_cache
+from graphql_metrics import ResolverMetrics
+from graphql_tracing import ResolverTracing
 
 PORT = 3001
 HOST = "0.0.0.0"
 app = Flask(__name__)
 
+# Span serveur par requête, rattaché au traceparent de l'appelant
+tracing.set_service("movie")
+tracing.instrument_flask(app)
+
 # Chargement du schéma GraphQL
 type_defs = load_schema_from_path("movie.graphql")
 
 # Création des instances de types
 query = QueryType()
 mutation = MutationType()
+movie = ObjectType("Movie")
+actor = ObjectType("Actor")
 
 
 # Liaison des résolveurs de requêtes
 @query.field("all_movies")
-def resolve_all_movies(obj, info):
-    return r.all_movies_resolver(obj, info)
+def resolve_all_movies(obj, info, first=None, after=None):
+    return r.all_movies_resolver(obj, info, first, after)
+
+
+@query.field("movies_page")
+def resolve_movies_page(obj, info, first, after=None):
+    return r.movies_page_resolver(obj, info, first, after)
 
 
 @query.field("movie_by_id")
@@ -37,6 +54,37 @@ def resolve_movie_by_title(obj, info, title):
     return r.movie_by_title_resolver(obj, info, title)
 
 
+@query.field("movies_by_ids")
+def resolve_movies_by_ids(obj, info, ids):
+    return r.movies_by_ids_resolver(obj, info, ids)
+
+
+@query.field("search_movies")
+def resolve_search_movies(obj, info, text, limit=10):
+    return r.search_movies_resolver(obj, info, text, limit)
+
+
+@query.field("all_actors")
+def resolve_all_actors(obj, info):
+    return r.all_actors_resolver(obj, info)
+
+
+@query.field("actor_by_id")
+def resolve_actor_by_id(obj, info, id):
+    return r.actor_by_id_resolver(obj, info, id)
+
+
+# Liaison des champs imbriqués
+@movie.field("actors")
+def resolve_movie_actors(obj, info):
+    return r.movie_actors_resolver(obj, info)
+
+
+@actor.field("films")
+def resolve_actor_films(obj, info):
+    return r.actor_films_resolver(obj, info)
+
+
 # Liaison des résolveurs de mutations
 @mutation.field("add_movie")
 def resolve_add_movie(obj, info, movie):
@@ -53,8 +101,18 @@ def resolve_delete_movie(obj, info, id, author):
     return r.delete_movie_resolver(obj, info, id, author)
 
 
+@mutation.field("add_actor_to_movie")
+def resolve_add_actor_to_movie(obj, info, actorid, movieid, author):
+    return r.add_actor_to_movie_resolver(obj, info, actorid, movieid, author)
+
+
+@mutation.field("remove_actor_from_movie")
+def resolve_remove_actor_from_movie(obj, info, actorid, movieid, author):
+    return r.remove_actor_from_movie_resolver(obj, info, actorid, movieid, author)
+
+
 # Création du schéma exécutable
-schema = make_executable_schema(type_defs, query, mutation)
+schema = make_executable_schema(type_defs, query, mutation, movie, actor)
 
 
 # Message d'accueil
@@ -65,11 +123,41 @@ def home():
     )
 
 
+# Compteurs du cache des droits administrateur
+@app.route("/stats/cache", methods=["GET"])
+def cache_stats():
+    return jsonify({"admin": admin_cache.stats()})
+
+
+# Métriques au format Prometheus (résolveurs, MongoDB, appels sortants)
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return make_response(metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE})
+
+
+# Traces récentes du processus: les plus lentes, ou le détail de ?trace_id=
+@app.route("/traces", methods=["GET"])
+def traces_endpoint():
+    return jsonify(
+        tracing.trace_report(
+            tracing.COLLECTOR.spans(),
+            request.args.get("trace_id"),
+            request.args.get("limit", 20, type=int),
+        )
+    )
+
+
 # Point d'entrée GraphQL
 @app.route("/graphql", methods=["POST"])
 def graphql_server():
     data = request.get_json()
-    success, result = graphql_sync(schema, data, context_value=request, debug=app.debug)
+    success, result = graphql_sync(
+        schema,
+        data,
+        context_value=request,
+        debug=app.debug,
+        extensions=[ResolverMetrics, ResolverTracing],
+    )
     status_code = 200 if success else 400
     return jsonify(result), status_code
 
@@ -0,0 +1,57 @@
+"""Index en mémoire reconstruit périodiquement depuis le stockage.
+
+Base de SearchIndex (search.py) et ActorIndex (actors.py). L'index est
+construit au premier accès, tenu à jour par les mutations du service, et
+reconstruit toutes les `rebuild_interval` secondes pour prendre en compte les
+écritures des autres processus (autres workers, autre instance).
+
+Une seule reconstruction à la fois: au premier accès, les lectures attendent
+la construction; ensuite, un seul thread reconstruit l'index périmé pendant
+que les autres lisent l'index actuel.
+"""
+
+import threading
+import time
+
+
+class RebuiltIndex:
+    """`load()` retourne tous les documents; `_fill(documents)` remplit
+    l'index (appelé sous `lock`, à définir dans la sous-classe)."""
+
+    def __init__(self, load, rebuild_interval):
+        self.load = load
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._built_at = None
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def rebuild(self):
+        documents = self.load()
+        with self.lock:
+            self._fill(documents)
+            self._built_at = time.monotonic()
+
+    def _fill(self, documents):
+        raise NotImplementedError
+
+    def _stale(self):
+        return (
+            self.rebuild_interval > 0
+            and time.monotonic() - self._built_at >= self.rebuild_interval
+        )
+
+    def _refresh(self):
+        if self._built_at is None:
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self.rebuild()
+        elif self._stale() and self._rebuild_lock.acquire(blocking=False):
+            try:
+                if self._stale():
+                    self.rebuild()
+            finally:
+                self._rebuild_lock.release()
@@ -1,13 +1,26 @@
 import json
 import os
 import requests
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
 from bson.json_util import dumps
 from urllib.parse import quote_plus
 
-is_admin_cache = {}
+from actors import ActorIndex
+from admin_check import is_admin
+from events import MOVIE_ADDED, MOVIE_DELETED, MOVIE_UPDATED, publish_movie_event
+from graphql_projection import mongo_projection
+from json_store import JsonStore
+from mongo_indexes import INDEX_REPORT, ensure_indexes, report_duplicates
+from mongo_metrics import MongoCommandMetrics
+from mongo_tracing import MongoCommandTracing
+import outbound
+from pagination import mongo_page, store_page
+from search import SearchIndex, normalize
+
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user:3203")
 PERSISTENCE_TYPE = os.getenv("PERSISTENCE_TYPE", "MONGODB")
 JSON_FILE_PATH = "{}/data/movies.json".format(".")
+ACTORS_FILE_PATH = "{}/data/actors.json".format(".")
 
 # Connexion MongoDB
 # Le mot de passe est encodé dans docker-compose.yml, sinon on utilise l'encodage par défaut
@@ -19,10 +32,50 @@ MONGO_URL = os.getenv(
 client = None
 db = None
 collection = None
+store = None
+actors_collection = None
+actors_store = None
+
+
+def normalize_title(title):
+    """Forme du titre utilisée pour les recherches (sans casse ni accents)"""
+    return normalize(title)
+
+
+def migrate_title_normalized():
+    """Calcule title_normalized des films qui n'en ont pas ou plus à jour.
+
+    Si INDEX_REPORT, les titres normalisés partagés par plusieurs films sont
+    signalés: movie_by_title ne retourne que l'un d'eux.
+    """
+    updates = [
+        UpdateOne(
+            {"_id": movie["_id"]},
+            {"$set": {"title_normalized": normalize_title(movie["title"])}},
+        )
+        for movie in collection.find({}, {"title": 1, "title_normalized": 1})
+        if movie.get("title_normalized") != normalize_title(movie["title"])
+    ]
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+        print(f"title_normalized mis à jour pour {len(updates)} films")
+    if INDEX_REPORT:
+        duplicates = report_duplicates(collection, ["title_normalized"])
+        if duplicates:
+            print(
+                f"{len(duplicates)} titre(s) partagé(s) par plusieurs films: "
+                "movie_by_title retourne le premier trouvé"
+            )
+    return len(updates)
+
 
 if PERSISTENCE_TYPE == "MONGODB":
     # Connexion avec retry automatique (pymongo gère les reconnexions)
-    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    client = MongoClient(
+        MONGO_URL,
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[MongoCommandMetrics(), MongoCommandTracing()],
+    )
     db = client["movies"]
     collection = db["movies"]
 
@@ -38,63 +91,163 @@ if PERSISTENCE_TYPE == "MONGODB":
         print(
             f"Base de données MongoDB déjà initialisée: {collection.count_documents({})} films"
         )
+
+    migrate_title_normalized()
+
+    # Index des recherches par id (movie_by_id, movies_by_ids) et par titre
+    ensure_indexes(collection, [("id", {"unique": True}), ("title_normalized", {})])
+
+    actors_collection = db["actors"]
+    if actors_collection.count_documents({}) == 0:
+        with open(ACTORS_FILE_PATH, "r") as jsf:
+            actors_data = json.load(jsf)["actors"]
+            if actors_data:
+                actors_collection.insert_many(actors_data)
+                print(f"Acteurs chargés: {len(actors_data)} acteurs")
+    # Index des recherches par acteur et des acteurs d'un film (suppression)
+    ensure_indexes(actors_collection, [("id", {"unique": True}), ("films", {})])
 else:
     print(f"Utilisation de la persistance JSON (Fichier: {JSON_FILE_PATH})")
+    store = JsonStore(JSON_FILE_PATH, "movies", "id")
+    # Titre normalisé -> film, calculé en mémoire (non écrit dans le fichier)
+    store.add_index("title", lambda movie: normalize_title(movie["title"]))
+    actors_store = JsonStore(ACTORS_FILE_PATH, "actors", "id")
 
 
-def get_json_data():
-    try:
-        with open(JSON_FILE_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"movies": []}
+def load_all_movies():
+    """Tous les films, pour construire l'index de recherche"""
+    if PERSISTENCE_TYPE == "MONGODB":
+        return list(
+            collection.find(
+                {}, {"_id": 0, "id": 1, "title": 1, "rating": 1, "director": 1}
+            )
+        )
+    return store.all()
 
 
-def save_json_data(data):
-    with open(JSON_FILE_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+# Index de recherche (titre, réalisateur), construit à la première recherche
+search_index = SearchIndex(load_all_movies)
 
 
-def check_admin(author) -> bool:
-    """Vérifie si l'utilisateur est un administrateur"""
-    if not author:
-        return False
-
-    if author in is_admin_cache:
-        return is_admin_cache[author]
-
-    try:
-        # Utiliser le nom du service Docker
-        resp = requests.get(f"http://user:3203/users/{author}")
-        if resp.status_code == 200:
-            data = resp.json()
-            is_admin = data.get("role", "") == "admin"
-            is_admin_cache[author] = is_admin
-            return is_admin
-        else:
-            return False
-    except Exception as e:
-        print(f"Error checking admin status: {e}")
-        return False
+def load_all_actors():
+    """Tous les acteurs, pour construire l'index film -> acteurs"""
+    if PERSISTENCE_TYPE == "MONGODB":
+        return list(actors_collection.find({}, {"_id": 0}))
+    return actors_store.all()
 
 
-# ============================================================================
-# QUERY RESOLVERS
-# ============================================================================
+# Acteurs par ID et par film, construit au premier accès
+actor_index = ActorIndex(load_all_actors)
 
 
-def all_movies_resolver(obj, info):
-    """Récupère tous les films"""
+def find_movies(ids):
+    """Films des IDs donnés, en une seule lecture (les IDs inconnus sont ignorés)"""
+    ids = list(dict.fromkeys(str(movie_id) for movie_id in ids))
     if PERSISTENCE_TYPE == "MONGODB":
-        movies_list = list(collection.find({}))
-        # Convertir ObjectId en string pour JSON
+        movies_list = list(collection.find({"id": {"$in": ids}}))
         for movie in movies_list:
             if "_id" in movie:
                 movie["_id"] = str(movie["_id"])
         return movies_list
     else:
-        data = get_json_data()
-        return data.get("movies", [])
+        movies_list = [store.get(movie_id) for movie_id in ids]
+        return [movie for movie in movies_list if movie is not None]
+
+
+class MovieLoader:
+    """Regroupe les films demandés pendant une requête GraphQL.
+
+    Les résolveurs déclarent les IDs dont ils auront besoin avec `load_many`
+    (ex: les films de tous les acteurs d'un film), puis le premier `get_many`
+    les lit tous en une seule requête.
+    """
+
+    def __init__(self):
+        self._movies = {}
+        self._pending = set()
+
+    def load_many(self, movie_ids):
+        for movie_id in movie_ids:
+            if movie_id not in self._movies:
+                self._pending.add(movie_id)
+
+    def dispatch(self):
+        if not self._pending:
+            return
+        pending = sorted(self._pending)
+        self._pending.clear()
+        found = {movie["id"]: movie for movie in find_movies(pending)}
+        for movie_id in pending:
+            self._movies[movie_id] = found.get(movie_id)
+
+    def get_many(self, movie_ids):
+        self.load_many(movie_ids)
+        self.dispatch()
+        movies = [self._movies.get(movie_id) for movie_id in movie_ids]
+        return [movie for movie in movies if movie is not None]
+
+
+def get_movie_loader(info):
+    """Retourne le MovieLoader de la requête en cours (un par requête GraphQL)"""
+    context = getattr(info, "context", None)
+    if context is None:
+        return MovieLoader()
+    loader = getattr(context, "movie_loader", None)
+    if loader is None:
+        loader = MovieLoader()
+        setattr(context, "movie_loader", loader)
+    return loader
+
+
+def preload_films(info, actors):
+    """Déclare les films de tous les acteurs pour les lire en une fois"""
+    get_movie_loader(info).load_many(
+        movie_id for actor in actors for movie_id in actor["films"]
+    )
+    return actors
+
+
+def fetch_user(userid):
+    return outbound.http_request(
+        requests, "GET", USER_SERVICE_URL, f"/users/{userid}", timeout=10
+    )
+
+
+def check_admin(author) -> bool:
+    """Vérifie si l'utilisateur est un administrateur (résultat mis en cache)"""
+    return is_admin(author, fetch_user)
+
+
+# ============================================================================
+# QUERY RESOLVERS
+# ============================================================================
+
+
+def movies_page(info, first=None, after=None, path=()):
+    """(films, curseur suivant ou None): `first` films après l'ID `after`"""
+    if PERSISTENCE_TYPE == "MONGODB":
+        # Seuls les champs demandés sont lus (l'id sert de curseur)
+        return mongo_page(
+            collection,
+            "id",
+            first,
+            after,
+            projection=mongo_projection(info, always=("id",), path=path),
+        )
+    else:
+        return store_page(store, first, after)
+
+
+def all_movies_resolver(obj, info, first=None, after=None):
+    """Récupère tous les films, ou une page de `first` films après l'ID `after`"""
+    movies_list, _ = movies_page(info, first, after)
+    return movies_list
+
+
+def movies_page_resolver(obj, info, first, after=None):
+    """Page de `first` films après l'ID `after`, avec le curseur de la suivante"""
+    movies_list, next_cursor = movies_page(info, first, after, path=("movies",))
+    return {"movies": movies_list, "next_cursor": next_cursor}
 
 
 def movie_by_id_resolver(obj, info, id):
@@ -105,31 +258,49 @@ def movie_by_id_resolver(obj, info, id):
             movie["_id"] = str(movie["_id"])
         return movie
     else:
-        data = get_json_data()
-        for movie in data.get("movies", []):
-            if movie["id"] == str(id):
-                return movie
-        return None
+        return store.get(id)
 
 
 def movie_by_title_resolver(obj, info, title):
     """Récupère un film par son titre"""
     if PERSISTENCE_TYPE == "MONGODB":
-        movie = collection.find_one(
-            {"title": {"$regex": f"^{title}$", "$options": "i"}}
-        )
+        movie = collection.find_one({"title_normalized": normalize_title(title)})
         if movie and "_id" in movie:
             movie["_id"] = str(movie["_id"])
         return movie
     else:
-        data = get_json_data()
-        import re
+        return store.get_by("title", normalize_title(title))
+
+
+def movies_by_ids_resolver(obj, info, ids):
+    """Récupère plusieurs films en une seule requête (les IDs inconnus sont ignorés)"""
+    return find_movies(ids)
+
+
+def search_movies_resolver(obj, info, text, limit=10):
+    """Recherche de films par début de mots du titre ou du réalisateur"""
+    return search_index.search(text, limit)
+
 
-        pattern = re.compile(f"^{title}$", re.IGNORECASE)
-        for movie in data.get("movies", []):
-            if pattern.match(movie["title"]):
-                return movie
-        return None
+def all_actors_resolver(obj, info):
+    """Récupère tous les acteurs"""
+    return preload_films(info, actor_index.all())
+
+
+def actor_by_id_resolver(obj, info, id):
+    """Récupère un acteur par son ID"""
+    actor = actor_index.get(id)
+    return preload_films(info, [actor])[0] if actor else None
+
+
+def movie_actors_resolver(movie, info):
+    """Movie.actors: lecture directe de l'index film -> acteurs"""
+    return preload_films(info, actor_index.actors_of(movie["id"]))
+
+
+def actor_films_resolver(actor, info):
+    """Actor.films: films de tous les acteurs déjà déclarés lus en une requête"""
+    return get_movie_loader(info).get_many(actor["films"])
 
 
 # ============================================================================
@@ -157,20 +328,17 @@ def add_movie_resolver(obj, info, movie):
         if existing_movie:
             raise Exception("Film ID déjà existant")
 
-        collection.insert_one(new_movie)
-        if "_id" in new_movie:
-            new_movie["_id"] = str(new_movie["_id"])
+        collection.insert_one(
+            dict(new_movie, title_normalized=normalize_title(new_movie["title"]))
+        )
     else:
-        data = get_json_data()
-        movies = data.get("movies", [])
-        for m in movies:
-            if m["id"] == str(movie["id"]):
+        with store.lock:
+            if str(movie["id"]) in store:
                 raise Exception("Film ID déjà existant")
+            store.put(new_movie)
 
-        movies.append(new_movie)
-        data["movies"] = movies
-        save_json_data(data)
-
+    search_index.add(new_movie)
+    publish_movie_event(MOVIE_ADDED, new_movie["id"])
     return {"message": "Film ajouté avec succès", "movie": new_movie}
 
 
@@ -190,25 +358,21 @@ def update_movie_rating_resolver(obj, info, id, rating, author):
         movie = collection.find_one({"id": str(id)})
         if movie and "_id" in movie:
             movie["_id"] = str(movie["_id"])
+        if movie:
+            search_index.add(movie)
+        publish_movie_event(MOVIE_UPDATED, id)
         return {"message": "Note mise à jour avec succès", "movie": movie}
     else:
-        data = get_json_data()
-        movies = data.get("movies", [])
-        found = False
-        updated_movie = None
-        for m in movies:
-            if m["id"] == str(id):
-                m["rating"] = float(rating)
-                updated_movie = m
-                found = True
-                break
-
-        if not found:
-            raise Exception("Film ID non trouvé")
+        with store.lock:
+            movie = store.get(id)
+            if movie is None:
+                raise Exception("Film ID non trouvé")
 
-        data["movies"] = movies
-        save_json_data(data)
+            updated_movie = dict(movie, rating=float(rating))
+            store.put(updated_movie)
 
+        search_index.add(updated_movie)
+        publish_movie_event(MOVIE_UPDATED, id)
         return {"message": "Note mise à jour avec succès", "movie": updated_movie}
 
 
@@ -223,33 +387,94 @@ def delete_movie_resolver(obj, info, id, author):
             raise Exception("Film ID non trouvé")
 
         collection.delete_one({"id": str(id)})
+        search_index.remove(id)
+        actors_collection.update_many({"films": str(id)}, {"$pull": {"films": str(id)}})
+        actor_index.remove_film(id)
+        publish_movie_event(MOVIE_DELETED, id)
         if "_id" in movie:
             movie["_id"] = str(movie["_id"])
 
         return {"message": "Film supprimé avec succès", "movie": movie}
     else:
-        data = get_json_data()
-        movies = data.get("movies", [])
-        found = False
-        deleted_movie = None
-        new_movies = []
-
-        for m in movies:
-            if m["id"] == str(id):
-                deleted_movie = m
-                found = True
-            else:
-                new_movies.append(m)
-
-        if not found:
+        deleted_movie = store.delete(id)
+        if deleted_movie is None:
             raise Exception("Film ID non trouvé")
-
-        data["movies"] = new_movies
-        save_json_data(data)
+        search_index.remove(id)
+        remove_film_from_actors(id)
+        publish_movie_event(MOVIE_DELETED, id)
 
         return {"message": "Film supprimé avec succès", "movie": deleted_movie}
 
 
+def remove_film_from_actors(movie_id):
+    """JSON: retire un film supprimé de la filmographie des acteurs"""
+    movie_id = str(movie_id)
+    with actors_store.lock:
+        updated = [
+            dict(actor, films=[m for m in actor["films"] if m != movie_id])
+            for actor in actors_store.all()
+            if movie_id in actor["films"]
+        ]
+        if updated:
+            actors_store.put_many(updated)
+    actor_index.remove_film(movie_id)
+
+
+def add_actor_to_movie_resolver(obj, info, actorid, movieid, author):
+    """Ajoute un film à la filmographie d'un acteur"""
+    if not check_admin(author):
+        raise Exception("Accès refusé, administrateur requis")
+    if not find_movies([movieid]):
+        raise Exception("Film ID non trouvé")
+
+    if PERSISTENCE_TYPE == "MONGODB":
+        actor = actors_collection.find_one_and_update(
+            {"id": str(actorid)},
+            {"$addToSet": {"films": str(movieid)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if actor is None:
+            raise Exception("Acteur ID non trouvé")
+    else:
+        with actors_store.lock:
+            actor = actors_store.get(actorid)
+            if actor is None:
+                raise Exception("Acteur ID non trouvé")
+            if str(movieid) not in actor["films"]:
+                actor = dict(actor, films=actor["films"] + [str(movieid)])
+                actors_store.put(actor)
+
+    actor_index.put(actor)
+    return {"message": "Film ajouté à l'acteur", "actor": actor}
+
+
+def remove_actor_from_movie_resolver(obj, info, actorid, movieid, author):
+    """Retire un film de la filmographie d'un acteur"""
+    if not check_admin(author):
+        raise Exception("Accès refusé, administrateur requis")
+
+    if PERSISTENCE_TYPE == "MONGODB":
+        actor = actors_collection.find_one_and_update(
+            {"id": str(actorid)},
+            {"$pull": {"films": str(movieid)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if actor is None:
+            raise Exception("Acteur ID non trouvé")
+    else:
+        with actors_store.lock:
+            actor = actors_store.get(actorid)
+            if actor is None:
+                raise Exception("Acteur ID non trouvé")
+            actor = dict(actor, films=[m for m in actor["films"] if m != str(movieid)])
+            actors_store.put(actor)
+
+    actor_index.put(actor)
+    return {"message": "Film retiré de l'acteur", "actor": actor}
+
+
 # ============================================================================
 # RESOLVER MAP
 # ============================================================================
@@ -261,6 +486,10 @@ def resolve_queries():
         "all_movies": all_movies_resolver,
         "movie_by_id": movie_by_id_resolver,
         "movie_by_title": movie_by_title_resolver,
+        "movies_by_ids": movies_by_ids_resolver,
+        "search_movies": search_movies_resolver,
+        "all_actors": all_actors_resolver,
+        "actor_by_id": actor_by_id_resolver,
     }
 
 
@@ -270,4 +499,6 @@ def resolve_mutations():
         "add_movie": add_movie_resolver,
         "update_movie_rating": update_movie_rating_resolver,
         "delete_movie": delete_movie_resolver,
+        "add_actor_to_movie": add_actor_to_movie_resolver,
+        "remove_actor_from_movie": remove_actor_from_movie_resolver,
     }
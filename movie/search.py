@@ -0,0 +1,176 @@
+"""Index de recherche des films (titre et réalisateur) pour search_movies.
+
+Index inversé en mémoire: chaque mot (sans casse ni accents) pointe vers les
+films qui le contiennent. Le vocabulaire est gardé trié pour trouver par
+dichotomie tous les mots commençant par un préfixe (recherche au fil de la
+frappe).
+
+L'index est mis à jour par les mutations du service et reconstruit toutes
+les SEARCH_REBUILD_INTERVAL secondes (voir rebuilt_index.py).
+"""
+
+import bisect
+import os
+import re
+import unicodedata
+
+from rebuilt_index import RebuiltIndex
+
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", "60"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+
+FIELDS = ("title", "director")
+
+# Qualité de correspondance, de la meilleure à la moins bonne
+EXACT_TITLE = 3
+TITLE_PREFIX = 2
+TITLE_WORDS = 1
+OTHER = 0
+
+
+def normalize(text):
+    """Minuscules sans accents: "Amélie" -> "amelie" """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c)).strip()
+
+
+def tokenize(text):
+    return re.findall(r"\w+", normalize(text))
+
+
+class _FieldIndex:
+    """Index inversé d'un champ: mot -> IDs, vocabulaire trié"""
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+
+    def add(self, movie_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+            ids.add(movie_id)
+
+    def remove(self, movie_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(movie_id)
+            if not ids:
+                del self.postings[token]
+                index = bisect.bisect_left(self.vocabulary, token)
+                del self.vocabulary[index]
+
+    def match_prefix(self, prefix):
+        """IDs des films ayant un mot qui commence par `prefix`"""
+        ids = set()
+        index = bisect.bisect_left(self.vocabulary, prefix)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(
+            prefix
+        ):
+            ids.update(self.postings[self.vocabulary[index]])
+            index += 1
+        return ids
+
+
+class SearchIndex(RebuiltIndex):
+    """Recherche de films par titre et réalisateur.
+
+    `load_movies()` retourne tous les films; il sert à la construction
+    initiale et aux reconstructions périodiques.
+    """
+
+    def __init__(self, load_movies, rebuild_interval=SEARCH_REBUILD_INTERVAL):
+        super().__init__(load_movies, rebuild_interval)
+        self._movies = {}
+        self._fields = {field: _FieldIndex() for field in FIELDS}
+
+    def _fill(self, movies):
+        self._movies = {}
+        self._fields = {field: _FieldIndex() for field in FIELDS}
+        for movie in movies:
+            self._add(movie)
+
+    def _add(self, movie):
+        movie_id = str(movie["id"])
+        if movie_id in self._movies:
+            self._remove(movie_id)
+        entry = {
+            "movie": {
+                "id": movie_id,
+                "title": movie["title"],
+                "rating": movie["rating"],
+                "director": movie["director"],
+            },
+            "title": normalize(movie["title"]),
+            "tokens": {field: set(tokenize(movie[field])) for field in FIELDS},
+        }
+        self._movies[movie_id] = entry
+        for field in FIELDS:
+            self._fields[field].add(movie_id, entry["tokens"][field])
+
+    def _remove(self, movie_id):
+        entry = self._movies.pop(movie_id, None)
+        if entry is None:
+            return
+        for field in FIELDS:
+            self._fields[field].remove(movie_id, entry["tokens"][field])
+
+    def add(self, movie):
+        """Ajoute ou remplace un film (ajout, changement de note)"""
+        if not self.built:
+            return
+        with self.lock:
+            self._add(movie)
+
+    def remove(self, movie_id):
+        if not self.built:
+            return
+        with self.lock:
+            self._remove(str(movie_id))
+
+    def search(self, text, limit=10):
+        """Films dont chaque mot de `text` préfixe un mot du titre ou du réalisateur.
+
+        Classement: titre identique, titre commençant par le texte, tous les
+        mots trouvés dans le titre, puis le reste; à qualité égale, meilleure
+        note d'abord.
+        """
+        query_tokens = tokenize(text)
+        limit = max(0, min(limit, SEARCH_MAX_LIMIT))
+        if not query_tokens or not limit:
+            return []
+
+        self._refresh()
+        query = normalize(text)
+        with self.lock:
+            candidates = None
+            in_title = None
+            for token in query_tokens:
+                title_ids = self._fields["title"].match_prefix(token)
+                token_ids = title_ids | self._fields["director"].match_prefix(token)
+                candidates = token_ids if candidates is None else candidates & token_ids
+                in_title = title_ids if in_title is None else in_title & title_ids
+                if not candidates:
+                    return []
+
+            results = []
+            for movie_id in candidates:
+                entry = self._movies[movie_id]
+                if entry["title"] == query:
+                    quality = EXACT_TITLE
+                elif entry["title"].startswith(query):
+                    quality = TITLE_PREFIX
+                elif movie_id in in_title:
+                    quality = TITLE_WORDS
+                else:
+                    quality = OTHER
+                results.append((quality, entry["movie"]))
+
+        results.sort(
+            key=lambda result: (-result[0], -result[1]["rating"], result[1]["title"])
+        )
+        return [movie for _, movie in results[:limit]]
@@ -0,0 +1,75 @@
+import pytest
+
+CREED = "267eedb8-0f5d-42d5-8f43-72426b9fb3e6"
+MARTIAN = "a8034f44-aee4-44cf-b32c-74cf452aaaae"
+NIGHT_BEFORE = "96798c08-d19b-4986-a05d-7da856efb697"
+
+
+@pytest.fixture(params=["JSON", "MONGODB"])
+def r(request, mongo, service, monkeypatch):
+    """Résolveurs de Movie, index des acteurs construit, sans événements"""
+    r = service(
+        "movie",
+        "resolvers",
+        PERSISTENCE_TYPE=request.param,
+        MOVIE_EVENT_SUBSCRIBERS="",
+    )
+    monkeypatch.setattr(r, "check_admin", lambda author: True)
+    r.actor_index.all()
+    return r
+
+
+def cast(r, movie_id):
+    return sorted(actor["id"] for actor in r.actor_index.actors_of(movie_id))
+
+
+def assert_in_sync(r):
+    """L'index tenu à jour est identique à un index reconstruit du stockage"""
+    fresh = r.ActorIndex(r.load_all_actors)
+    fresh.rebuild()
+    assert r.actor_index._actors == fresh._actors
+    assert {m: set(ids) for m, ids in r.actor_index._by_film.items()} == {
+        m: set(ids) for m, ids in fresh._by_film.items()
+    }
+
+
+def test_add_actor_to_movie(r):
+    assert "actor1" not in cast(r, CREED)
+
+    r.add_actor_to_movie_resolver(None, None, "actor1", CREED, "admin")
+
+    assert "actor1" in cast(r, CREED)
+    assert CREED in r.actor_index.get("actor1")["films"]
+    assert_in_sync(r)
+
+    # Deuxième ajout: pas de doublon
+    r.add_actor_to_movie_resolver(None, None, "actor1", CREED, "admin")
+    assert r.actor_index.get("actor1")["films"].count(CREED) == 1
+    assert_in_sync(r)
+
+
+def test_remove_actor_from_movie(r):
+    assert "actor1" in cast(r, MARTIAN)
+
+    r.remove_actor_from_movie_resolver(None, None, "actor1", MARTIAN, "admin")
+
+    assert "actor1" not in cast(r, MARTIAN)
+    assert_in_sync(r)
+
+
+def test_delete_movie_removes_it_from_every_actor(r):
+    assert cast(r, NIGHT_BEFORE)
+
+    r.delete_movie_resolver(None, None, NIGHT_BEFORE, "admin")
+
+    assert cast(r, NIGHT_BEFORE) == []
+    assert all(NIGHT_BEFORE not in actor["films"] for actor in r.actor_index.all())
+    assert_in_sync(r)
+
+
+def test_unknown_actor_or_movie_is_refused(r):
+    with pytest.raises(Exception, match="Acteur ID non trouvé"):
+        r.add_actor_to_movie_resolver(None, None, "nobody", CREED, "admin")
+    with pytest.raises(Exception, match="Film ID non trouvé"):
+        r.add_actor_to_movie_resolver(None, None, "actor1", "no-movie", "admin")
+    assert_in_sync(r)
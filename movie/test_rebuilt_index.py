@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def rebuilt_index(service):
+    return service("movie", "rebuilt_index")
+
+
+class SlowLoader:
+    """load() qui attend `release` et compte ses appels"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return [f"doc{self.calls}"]
+
+
+@pytest.fixture
+def make_index(rebuilt_index):
+    class ListIndex(rebuilt_index.RebuiltIndex):
+        """Index minimal: la liste des documents chargés"""
+
+        def _fill(self, documents):
+            self.documents = list(documents)
+
+        def read(self):
+            self._refresh()
+            with self.lock:
+                return self.documents
+
+    return ListIndex
+
+
+def in_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_first_build_is_done_once(make_index):
+    loader = SlowLoader()
+    index = make_index(loader, rebuild_interval=60)
+    results = []
+
+    assert not index.built
+    threads = in_threads(8, lambda: results.append(index.read()))
+    assert loader.started.wait(5)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert results == [["doc1"]] * 8
+    assert index.built
+
+
+def test_stale_index_is_rebuilt_by_one_thread_without_blocking_reads(make_index):
+    loader = SlowLoader()
+    loader.release.set()
+    index = make_index(loader, rebuild_interval=60)
+    index.read()
+    loader.started.clear()
+    loader.release.clear()
+    # Index construit il y a plus de rebuild_interval secondes
+    index._built_at -= 61
+
+    (rebuilding,) = in_threads(1, index.read)
+    assert loader.started.wait(5)
+
+    # Pendant la reconstruction, les lectures utilisent l'index actuel
+    assert index.read() == ["doc1"]
+    assert loader.calls == 2
+
+    loader.release.set()
+    rebuilding.join()
+    assert index.read() == ["doc2"]
+    assert loader.calls == 2
+
+
+def test_zero_interval_never_rebuilds(make_index):
+    loader = SlowLoader()
+    loader.release.set()
+    index = make_index(loader, rebuild_interval=0)
+    index.read()
+    index._built_at -= 3600
+
+    assert index.read() == ["doc1"]
+    assert loader.calls == 1
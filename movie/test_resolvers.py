@@ -0,0 +1,138 @@
+import importlib
+import threading
+
+import pytest
+
+AMELIE = {
+    "id": "amelie",
+    "title": "Le Fabuleux Destin d'Amélie Poulain",
+    "rating": 8.3,
+    "director": "Jean-Pierre Jeunet",
+}
+CREED = {"id": "creed", "title": "Creed", "rating": 6.9, "director": "Ryan Coogler"}
+
+
+@pytest.fixture(params=["JSON", "MONGODB"])
+def r(request, mongo, service):
+    """Résolveurs de Movie dans les deux persistances, avec le film AMELIE"""
+    r = service("movie", "resolvers", PERSISTENCE_TYPE=request.param)
+    if r.PERSISTENCE_TYPE == "MONGODB":
+        r.collection.insert_one(dict(AMELIE))
+        r.migrate_title_normalized()
+    else:
+        r.store.put(dict(AMELIE))
+    return r
+
+
+@pytest.fixture
+def mongo_r(mongo, service):
+    return service("movie", "resolvers", PERSISTENCE_TYPE="MONGODB")
+
+
+@pytest.mark.parametrize(
+    "title",
+    [
+        "Le Fabuleux Destin d'Amélie Poulain",
+        "le fabuleux destin d'amélie poulain",
+        "LE FABULEUX DESTIN D'AMÉLIE POULAIN",
+        "Le Fabuleux Destin d'Amelie Poulain",
+        "  le fabuleux destin d'amelie poulain ",
+    ],
+)
+def test_title_lookup_ignores_case_accents_and_spaces(r, title):
+    assert r.movie_by_title_resolver(None, None, title)["id"] == "amelie"
+
+
+@pytest.mark.parametrize("title", ["Amélie", "Destin d'Amélie Poulain", ".*"])
+def test_title_lookup_needs_the_whole_title(r, title):
+    assert r.movie_by_title_resolver(None, None, title) is None
+
+
+def test_migration_fills_missing_and_stale_titles(mongo_r):
+    mongo_r.collection.update_one(
+        {"title": "Creed"}, {"$unset": {"title_normalized": 1}}
+    )
+    mongo_r.collection.insert_one(
+        # Valeur calculée avant que les accents soient retirés
+        dict(AMELIE, title_normalized=AMELIE["title"].casefold())
+    )
+
+    assert mongo_r.migrate_title_normalized() == 2
+
+    for movie in mongo_r.collection.find():
+        assert movie["title_normalized"] == mongo_r.normalize_title(movie["title"])
+    assert mongo_r.migrate_title_normalized() == 0
+
+
+def test_migration_reports_titles_shared_by_several_films(mongo_r, capsys):
+    mongo_r.collection.insert_one(
+        {"id": "remake", "title": " CREED", "rating": 5.0, "director": "X"}
+    )
+
+    mongo_r.migrate_title_normalized()
+
+    out = capsys.readouterr().out
+    assert (
+        "Doublon movies.title_normalized: title_normalized='creed' (2 documents)" in out
+    )
+    assert "1 titre(s) partagé(s)" in out
+
+
+@pytest.fixture
+def published(r, monkeypatch):
+    """Événements envoyés aux abonnés par les mutations (`_send` remplacé)"""
+    events = importlib.import_module("events")
+    monkeypatch.setattr(events, "MOVIE_EVENT_SUBSCRIBERS", ["http://a", "http://b"])
+    monkeypatch.setattr(r, "check_admin", lambda author: author == "admin")
+    sent = []
+    done = threading.Semaphore(0)
+
+    def send(url, payload):
+        sent.append((url, payload))
+        done.release()
+
+    monkeypatch.setattr(events, "_send", send)
+
+    def wait(count):
+        """Les `count` envois faits en arrière-plan, et aucun autre"""
+        for _ in range(count):
+            assert done.acquire(timeout=5)
+        assert not done.acquire(timeout=0.05)
+        result = sorted(sent)
+        sent.clear()
+        return result
+
+    return wait
+
+
+def test_mutations_publish_movie_events(r, published):
+    r.add_movie_resolver(None, None, dict(CREED, author="admin"))
+    assert published(2) == [
+        ("http://a", {"event": "movie_added", "id": "creed"}),
+        ("http://b", {"event": "movie_added", "id": "creed"}),
+    ]
+
+    r.update_movie_rating_resolver(None, None, "creed", 7.5, "admin")
+    assert published(2) == [
+        ("http://a", {"event": "movie_updated", "id": "creed"}),
+        ("http://b", {"event": "movie_updated", "id": "creed"}),
+    ]
+
+    r.delete_movie_resolver(None, None, "creed", "admin")
+    assert published(2) == [
+        ("http://a", {"event": "movie_deleted", "id": "creed"}),
+        ("http://b", {"event": "movie_deleted", "id": "creed"}),
+    ]
+
+
+def test_refused_mutations_publish_nothing(r, published):
+    with pytest.raises(Exception, match="administrateur"):
+        r.delete_movie_resolver(None, None, "amelie", "someone")
+    with pytest.raises(Exception, match="non trouvé"):
+        r.update_movie_rating_resolver(None, None, "absent", 7.5, "admin")
+    with pytest.raises(Exception, match="non trouvé"):
+        r.delete_movie_resolver(None, None, "absent", "admin")
+
+    r.update_movie_rating_resolver(None, None, "amelie", 9.0, "admin")
+    # Seul l'envoi de la mutation réussie arrive
+    assert [payload["event"] for _, payload in published(2)] == ["movie_updated"] * 2
@@ -0,0 +1,99 @@
+import pytest
+
+MOVIES = [
+    {"id": "exact", "title": "Night", "rating": 5.0, "director": "Ann Lee"},
+    {
+        "id": "prefix_9",
+        "title": "Nightcrawler",
+        "rating": 9.0,
+        "director": "Dan Gilroy",
+    },
+    {"id": "prefix_6", "title": "Night Shift", "rating": 6.0, "director": "Ron Howard"},
+    {
+        "id": "words",
+        "title": "The Night Before",
+        "rating": 8.0,
+        "director": "J. Levine",
+    },
+    {"id": "director", "title": "Creed", "rating": 10.0, "director": "Kim Nightingale"},
+    {"id": "none", "title": "Spotlight", "rating": 9.5, "director": "Tom McCarthy"},
+    {
+        "id": "amelie",
+        "title": "Amélie",
+        "rating": 8.3,
+        "director": "Jean-Pierre Jeunet",
+    },
+]
+
+
+@pytest.fixture
+def search(service):
+    return service("movie", "search")
+
+
+@pytest.fixture
+def index(search):
+    return search.SearchIndex(lambda: [dict(movie) for movie in MOVIES])
+
+
+def ids(movies):
+    return [movie["id"] for movie in movies]
+
+
+def test_results_are_ranked_by_match_quality_then_rating(index):
+    # Titre identique > titre commençant par le texte > mots dans le titre
+    # > réalisateur; à qualité égale, meilleure note d'abord
+    assert ids(index.search("night")) == [
+        "exact",
+        "prefix_9",
+        "prefix_6",
+        "words",
+        "director",
+    ]
+
+
+def test_every_word_must_match(index):
+    assert ids(index.search("the bef")) == ["words"]
+    assert ids(index.search("night ron")) == ["prefix_6"]
+    assert index.search("night unknown") == []
+
+
+def test_case_and_accents_are_ignored(index):
+    assert ids(index.search("AMELIE")) == ["amelie"]
+    assert ids(index.search("amél")) == ["amelie"]
+
+
+def test_limit(index, search):
+    assert len(index.search("night", limit=2)) == 2
+    assert index.search("night", limit=0) == []
+    assert index.search("   ") == []
+    assert len(index.search("night", limit=10**6)) <= search.SEARCH_MAX_LIMIT
+
+
+def test_add_and_remove_update_the_index(index):
+    index.search("night")
+
+    index.add({"id": "new", "title": "Night", "rating": 9.9, "director": "X"})
+    assert ids(index.search("night"))[:2] == ["new", "exact"]
+
+    index.add({"id": "new", "title": "Day", "rating": 9.9, "director": "X"})
+    index.remove("exact")
+    assert "new" not in ids(index.search("night"))
+    assert ids(index.search("night"))[0] == "prefix_9"
+
+
+def test_prefix_lookup_stops_at_the_end_of_the_prefix(search):
+    field = search._FieldIndex()
+    for movie_id, word in enumerate(
+        ["nigh", "night", "nightcrawler", "nights", "nigt"]
+    ):
+        field.add(movie_id, [word])
+
+    assert field.match_prefix("night") == {1, 2, 3}
+    assert field.match_prefix("nigh") == {0, 1, 2, 3}
+    assert field.match_prefix("nightz") == set()
+    assert field.match_prefix("a") == set()
+
+    field.remove(2, ["nightcrawler"])
+    assert field.vocabulary == ["nigh", "night", "nights", "nigt"]
+    assert field.match_prefix("night") == {1, 3}
@@ -0,0 +1,284 @@
+"""Intercepteurs du serveur gRPC Schedule: métriques, traces et logs des appels.
+
+Chaque RPC est mesurée (durée, code de statut, appels en cours) pour la route
+/metrics (voir SCHEDULE_METRICS_PORT dans schedule.py). Elle ouvre aussi un
+span serveur, rattaché au `traceparent` reçu dans les métadonnées et courant
+pendant l'exécution du servicer (commandes MongoDB tracées comme ses enfants).
+
+Les logs des appels sont des lignes JSON, émises au niveau INFO pour une
+fraction SCHEDULE_LOG_SAMPLE_RATE des appels réussis; les erreurs sont
+toujours loguées (WARNING). Au niveau par défaut (SCHEDULE_LOG_LEVEL=WARNING)
+un appel réussi ne coûte qu'un test de niveau: la requête n'est formatée que
+si la ligne est réellement écrite.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+
+import grpc
+from google.protobuf import text_format
+
+import metrics
+import tracing
+
+LOG_LEVEL = os.getenv("SCHEDULE_LOG_LEVEL", "WARNING").upper()
+LOG_SAMPLE_RATE = float(os.getenv("SCHEDULE_LOG_SAMPLE_RATE", "1.0"))
+# Taille maximale de la requête recopiée dans une ligne de log
+LOG_REQUEST_MAX_CHARS = 200
+
+handling_seconds = metrics.histogram(
+    "grpc_server_handling_seconds",
+    "Durée des RPC du service Schedule",
+    ["method"],
+)
+handled_total = metrics.counter(
+    "grpc_server_handled_total",
+    "RPC terminées, par code de statut",
+    ["method", "code"],
+)
+in_flight = metrics.gauge(
+    "grpc_server_in_flight",
+    "RPC en cours d'exécution",
+    ["method"],
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par log, avec les champs passés dans `extra={"fields": ...}`"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+logger = logging.getLogger("schedule.rpc")
+logger.setLevel(LOG_LEVEL)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def _short_method(full_method):
+    # "/schedule.Schedule/GetByDate" -> "GetByDate"
+    return full_method.rsplit("/", 1)[-1]
+
+
+# Fin d'un flux de réponses
+_END = object()
+
+
+def _start_span(full_method, context):
+    metadata = dict(context.invocation_metadata() or ())
+    return tracing.start_span(
+        f"grpc {full_method}", "server", metadata.get(tracing.HEADER)
+    )
+
+
+def _record(method, start, code, request, span):
+    duration = time.perf_counter() - start
+    handling_seconds.observe(duration, method=method)
+    handled_total.inc(method=method, code=code.name)
+    in_flight.dec(method=method)
+    span.set_attribute("grpc.code", code.name)
+    span.end(None if code is grpc.StatusCode.OK else code.name)
+
+    if code is grpc.StatusCode.OK:
+        if not logger.isEnabledFor(logging.INFO) or (
+            LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE
+        ):
+            return
+        level = logging.INFO
+    else:
+        if not logger.isEnabledFor(logging.WARNING):
+            return
+        level = logging.WARNING
+
+    logger.log(
+        level,
+        "rpc",
+        extra={
+            "fields": {
+                "method": method,
+                "code": code.name,
+                "trace_id": span.trace_id,
+                "duration_ms": round(duration * 1000, 3),
+                "request": text_format.MessageToString(request, as_one_line=True)[
+                    :LOG_REQUEST_MAX_CHARS
+                ],
+            }
+        },
+    )
+
+
+def _status(context, failed=False):
+    code = context.code()
+    if code is None:
+        return grpc.StatusCode.UNKNOWN if failed else grpc.StatusCode.OK
+    return code
+
+
+def _wrap(handler, unary_unary, unary_stream):
+    if handler is None:
+        return None
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(
+            unary_unary(handler.unary_unary),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(
+            unary_stream(handler.unary_stream),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+    return handler
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """Serveur synchrone (grpc.server)"""
+
+    def intercept_service(self, continuation, handler_call_details):
+        method = _short_method(handler_call_details.method)
+
+        def unary_unary(behavior):
+            def wrapper(request, context):
+                in_flight.inc(method=method)
+                span = _start_span(handler_call_details.method, context)
+                token = tracing.activate(span)
+                start = time.perf_counter()
+                code = None
+                try:
+                    response = behavior(request, context)
+                    code = _status(context)
+                    return response
+                except Exception:
+                    code = _status(context, failed=True)
+                    raise
+                finally:
+                    tracing.deactivate(token)
+                    _record(
+                        method,
+                        start,
+                        code or grpc.StatusCode.CANCELLED,
+                        request,
+                        span,
+                    )
+
+            return wrapper
+
+        def unary_stream(behavior):
+            def wrapper(request, context):
+                in_flight.inc(method=method)
+                span = _start_span(handler_call_details.method, context)
+                start = time.perf_counter()
+                code = None
+                try:
+                    responses = iter(behavior(request, context))
+                    while True:
+                        # Span courant seulement pendant la production d'un
+                        # message, pas entre deux lectures du client
+                        token = tracing.activate(span)
+                        try:
+                            response = next(responses, _END)
+                        finally:
+                            tracing.deactivate(token)
+                        if response is _END:
+                            break
+                        yield response
+                    code = _status(context)
+                except Exception:
+                    code = _status(context, failed=True)
+                    raise
+                finally:
+                    # Sans code: appel abandonné (client parti, tâche annulée)
+                    _record(
+                        method,
+                        start,
+                        code or grpc.StatusCode.CANCELLED,
+                        request,
+                        span,
+                    )
+
+            return wrapper
+
+        return _wrap(continuation(handler_call_details), unary_unary, unary_stream)
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """Serveur asynchrone (grpc.aio, SCHEDULE_SERVER_MODE=aio)"""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        method = _short_method(handler_call_details.method)
+
+        def unary_unary(behavior):
+            async def wrapper(request, context):
+                in_flight.inc(method=method)
+                span = _start_span(handler_call_details.method, context)
+                token = tracing.activate(span)
+                start = time.perf_counter()
+                code = None
+                try:
+                    response = await behavior(request, context)
+                    code = _status(context)
+                    return response
+                except Exception:
+                    code = _status(context, failed=True)
+                    raise
+                finally:
+                    tracing.deactivate(token)
+                    _record(
+                        method,
+                        start,
+                        code or grpc.StatusCode.CANCELLED,
+                        request,
+                        span,
+                    )
+
+            return wrapper
+
+        def unary_stream(behavior):
+            async def wrapper(request, context):
+                in_flight.inc(method=method)
+                span = _start_span(handler_call_details.method, context)
+                start = time.perf_counter()
+                code = None
+                try:
+                    responses = behavior(request, context).__aiter__()
+                    while True:
+                        token = tracing.activate(span)
+                        try:
+                            response = await anext(responses, _END)
+                        finally:
+                            tracing.deactivate(token)
+                        if response is _END:
+                            break
+                        yield response
+                    code = _status(context)
+                except Exception:
+                    code = _status(context, failed=True)
+                    raise
+                finally:
+                    _record(
+                        method,
+                        start,
+                        code or grpc.StatusCode.CANCELLED,
+                        request,
+                        span,
+                    )
+
+            return wrapper
+
+        handler = await continuation(handler_call_details)
+        return _wrap(handler, unary_unary, unary_stream)
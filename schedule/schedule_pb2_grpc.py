@@ -5,7 +5,7 @@ import warnings
 
 import schedule_pb2 as schedule__pb2
 
-GRPC_GENERATED_VERSION = '1.75.0'
+GRPC_GENERATED_VERSION = '1.75.1'
 GRPC_VERSION = grpc.__version__
 _version_not_supported = False
 
@@ -54,6 +54,16 @@ class ScheduleStub(object):
                 request_serializer=schedule__pb2.Date.SerializeToString,
                 response_deserializer=schedule__pb2.DayScheduleList.FromString,
                 _registered_method=True)
+        self.GetByDates = channel.unary_unary(
+                '/schedule.Schedule/GetByDates',
+                request_serializer=schedule__pb2.DateList.SerializeToString,
+                response_deserializer=schedule__pb2.DayScheduleList.FromString,
+                _registered_method=True)
+        self.StreamAll = channel.unary_stream(
+                '/schedule.Schedule/StreamAll',
+                request_serializer=schedule__pb2.DateRange.SerializeToString,
+                response_deserializer=schedule__pb2.DayScheduleList.FromString,
+                _registered_method=True)
 
 
 class ScheduleServicer(object):
@@ -83,6 +93,18 @@ class ScheduleServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetByDates(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamAll(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ScheduleServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -106,6 +128,16 @@ def add_ScheduleServicer_to_server(servicer, server):
                     request_deserializer=schedule__pb2.Date.FromString,
                     response_serializer=schedule__pb2.DayScheduleList.SerializeToString,
             ),
+            'GetByDates': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetByDates,
+                    request_deserializer=schedule__pb2.DateList.FromString,
+                    response_serializer=schedule__pb2.DayScheduleList.SerializeToString,
+            ),
+            'StreamAll': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamAll,
+                    request_deserializer=schedule__pb2.DateRange.FromString,
+                    response_serializer=schedule__pb2.DayScheduleList.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'schedule.Schedule', rpc_method_handlers)
@@ -224,3 +256,57 @@ class Schedule(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetByDates(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/schedule.Schedule/GetByDates',
+            schedule__pb2.DateList.SerializeToString,
+            schedule__pb2.DayScheduleList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamAll(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/schedule.Schedule/StreamAll',
+            schedule__pb2.DateRange.SerializeToString,
+            schedule__pb2.DayScheduleList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -24,6 +24,19 @@ def get_by_date_test():
     print(bydate_resp)
 
 
+def get_by_dates_test():
+    print("\n--- Testing GetByDates ---")
+    bydates_resp = stub.GetByDates(schedule_pb2.DateList(dates=[TEST_DATE, "20151201"]))
+    print(bydates_resp)
+
+
+def stream_all_test():
+    print("\n--- Testing StreamAll ---")
+    request = schedule_pb2.DateRange(start="20151201", end="20151204", batch_size=2)
+    for batch in stub.StreamAll(request):
+        print(f"Batch: {[entry.date for entry in batch.list]}")
+
+
 def add_to_schedule_test():
     print("\n--- Testing AddToSchedule ---")
     stub.AddToSchedule(schedule_pb2.Movie(date=TEST_DATE, id=TEST_MOVIE_ID))
@@ -39,5 +52,7 @@ def remove_from_schedule_test():
 if __name__ == "__main__":
     get_all_test()
     get_by_date_test()
+    get_by_dates_test()
+    stream_all_test()
     add_to_schedule_test()
     remove_from_schedule_test()
@@ -0,0 +1,139 @@
+import importlib
+import logging
+import time
+
+import grpc
+import pytest
+
+import metrics
+
+
+@pytest.fixture(params=["sync", "aio"])
+def server(request, schedule_server):
+    """(servicer, stub): serveur Schedule en JSON, logs des appels au niveau INFO"""
+    schedule, servicer, target = schedule_server(
+        request.param, PERSISTENCE_TYPE="JSON", SCHEDULE_LOG_LEVEL="INFO"
+    )
+    channel = grpc.insecure_channel(target)
+    yield servicer, schedule.schedule_pb2_grpc.ScheduleStub(channel)
+    channel.close()
+
+
+@pytest.fixture
+def schedule(server):
+    return importlib.import_module("schedule")
+
+
+@pytest.fixture
+def interceptors(server):
+    return importlib.import_module("interceptors")
+
+
+@pytest.fixture
+def logs(interceptors):
+    """Enregistrements du logger des appels"""
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    level = interceptors.logger.level
+    interceptors.logger.addHandler(handler)
+    yield records
+    interceptors.logger.removeHandler(handler)
+    interceptors.logger.setLevel(level)
+
+
+def sample(name, **labels):
+    """Valeur d'une série du registre, lue dans le texte de /metrics"""
+    prefix = name + "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "} "
+    for line in metrics.render().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix) :])
+    return 0
+
+
+def handled(method, code):
+    return sample("grpc_server_handled_total", method=method, code=code)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "délai dépassé"
+        time.sleep(0.01)
+
+
+def test_status_codes_are_counted(server, schedule):
+    servicer, stub = server
+    pb2 = schedule.schedule_pb2
+    ok = handled("GetByDate", "OK")
+    not_found = handled("GetByDate", "NOT_FOUND")
+
+    assert stub.GetByDate(pb2.Date(date="20151130")).list
+    with pytest.raises(grpc.RpcError) as error:
+        stub.GetByDate(pb2.Date(date="19990101"))
+
+    assert error.value.code() is grpc.StatusCode.NOT_FOUND
+    assert handled("GetByDate", "OK") == ok + 1
+    assert handled("GetByDate", "NOT_FOUND") == not_found + 1
+    assert sample("grpc_server_in_flight", method="GetByDate") == 0
+
+
+def test_successful_calls_are_sampled_errors_always_logged(
+    server, schedule, interceptors, logs, monkeypatch
+):
+    servicer, stub = server
+    pb2 = schedule.schedule_pb2
+
+    monkeypatch.setattr(interceptors, "LOG_SAMPLE_RATE", 0.0)
+    stub.GetByDate(pb2.Date(date="20151130"))
+    with pytest.raises(grpc.RpcError):
+        stub.GetByDate(pb2.Date(date="19990101"))
+    assert [(r.levelno, r.fields["code"]) for r in logs] == [
+        (logging.WARNING, "NOT_FOUND")
+    ]
+    assert logs[0].fields["request"] == 'date: "19990101"'
+
+    logs.clear()
+    monkeypatch.setattr(interceptors, "LOG_SAMPLE_RATE", 1.0)
+    stub.GetByDate(pb2.Date(date="20151130"))
+    assert [(r.levelno, r.fields["method"]) for r in logs] == [
+        (logging.INFO, "GetByDate")
+    ]
+
+
+def test_requests_are_not_formatted_below_the_log_level(
+    server, schedule, interceptors, logs, monkeypatch
+):
+    servicer, stub = server
+    interceptors.logger.setLevel(logging.WARNING)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("requête formatée pour un log non écrit")
+
+    monkeypatch.setattr(interceptors.text_format, "MessageToString", fail)
+
+    stub.GetByDate(schedule.schedule_pb2.Date(date="20151130"))
+    assert logs == []
+
+
+def test_abandoned_stream_is_counted_as_cancelled(server, schedule, monkeypatch):
+    servicer, stub = server
+
+    def endless_range(start, end):
+        # Entrées au fil de l'eau: le serveur voit le départ du client au
+        # premier envoi qui suit (sync) ou en annulant la tâche (aio)
+        for i in range(500):
+            yield {"date": f"2015{i:04d}", "movies": []}
+            time.sleep(0.01)
+
+    monkeypatch.setattr(servicer.store, "range", endless_range)
+    ok = handled("StreamAll", "OK")
+    cancelled = handled("StreamAll", "CANCELLED")
+
+    call = stub.StreamAll(schedule.schedule_pb2.DateRange(batch_size=1))
+    assert [day.date for day in next(call).list] == ["20150000"]
+    call.cancel()
+
+    wait_for(lambda: handled("StreamAll", "CANCELLED") == cancelled + 1)
+    assert handled("StreamAll", "OK") == ok
+    assert sample("grpc_server_in_flight", method="StreamAll") == 0
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import pytest
+
+# Date absente des données initiales
+DATE = "29991231"
+THREADS = 16
+MOVIES = 100
+
+
+@pytest.fixture(params=["JSON", "MONGODB"])
+def schedule(request, mongo, schedule_server):
+    """(schedule_pb2, servicer, stub): Schedule dans ce processus, JSON ou mongomock"""
+    module, servicer, target = schedule_server(
+        "sync", PERSISTENCE_TYPE=request.param, SCHEDULE_MAX_WORKERS=str(THREADS)
+    )
+    channel = grpc.insecure_channel(target)
+    yield module.schedule_pb2, servicer, module.schedule_pb2_grpc.ScheduleStub(channel)
+    channel.close()
+
+
+def stored(servicer, date=DATE):
+    """Document enregistré pour une date (None si la date n'existe pas)"""
+    if servicer.persistence_type == "MONGODB":
+        return servicer.collection.find_one({"date": date}, {"_id": 0})
+    return servicer.store.get(date)
+
+
+def run_concurrently(calls):
+    """Exécute les appels (fonction, argument) depuis THREADS clients"""
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        for future in [pool.submit(func, arg) for func, arg in calls]:
+            future.result()
+
+
+@pytest.fixture
+def add(schedule):
+    pb2, servicer, stub = schedule
+    return lambda movie_id: stub.AddToSchedule(pb2.Movie(date=DATE, id=movie_id))
+
+
+@pytest.fixture
+def remove(schedule):
+    pb2, servicer, stub = schedule
+
+    def remove(movie_id):
+        try:
+            stub.RemoveFromSchedule(pb2.Movie(date=DATE, id=movie_id))
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.NOT_FOUND:
+                raise
+
+    return remove
+
+
+def test_concurrent_adds_are_all_kept_once(schedule, add):
+    pb2, servicer, stub = schedule
+    movies = [f"a-{i}" for i in range(MOVIES)]
+
+    run_concurrently([(add, m) for m in movies])
+    # Les mêmes ajouts rejoués ne créent pas de doublons
+    run_concurrently([(add, m) for m in movies])
+
+    assert sorted(stored(servicer)["movies"]) == sorted(movies)
+    (day,) = stub.GetByDate(pb2.Date(date=DATE)).list
+    assert sorted(day.movies) == sorted(movies)
+
+
+def test_mixed_adds_and_removes_lose_no_update(schedule, add, remove):
+    pb2, servicer, stub = schedule
+    first = [f"a-{i}" for i in range(MOVIES)]
+    second = [f"b-{i}" for i in range(MOVIES)]
+    run_concurrently([(add, m) for m in first])
+
+    calls = []
+    for removed, added in zip(first, second):
+        calls.extend([(remove, removed), (add, added)])
+    run_concurrently(calls)
+
+    assert sorted(stored(servicer)["movies"]) == sorted(second)
+
+
+def test_emptied_day_is_deleted(schedule, add, remove):
+    pb2, servicer, stub = schedule
+    movies = [f"a-{i}" for i in range(MOVIES)]
+    run_concurrently([(add, m) for m in movies])
+
+    run_concurrently([(remove, m) for m in movies])
+
+    assert stored(servicer) is None
+    with pytest.raises(grpc.RpcError) as error:
+        stub.GetByDate(pb2.Date(date=DATE))
+    assert error.value.code() is grpc.StatusCode.NOT_FOUND
+
+
+def test_remove_reports_unknown_dates_and_movies(schedule, add):
+    pb2, servicer, stub = schedule
+    add("a-0")
+
+    for movie_id, date, details in [
+        ("a-1", DATE, "Movie is not scheduled that day"),
+        ("a-0", "29990101", "Date not found in schedule"),
+    ]:
+        with pytest.raises(grpc.RpcError) as error:
+            stub.RemoveFromSchedule(pb2.Movie(date=date, id=movie_id))
+        assert error.value.code() is grpc.StatusCode.NOT_FOUND
+        assert error.value.details() == details
+
+    assert stored(servicer)["movies"] == ["a-0"]
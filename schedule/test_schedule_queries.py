@@ -0,0 +1,91 @@
+import importlib
+import json
+
+import grpc
+import pytest
+
+
+@pytest.fixture(params=["JSON", "MONGODB"])
+def schedule(request, mongo, schedule_server):
+    """(schedule_pb2, stub): Schedule dans ce processus, JSON ou mongomock"""
+    module, servicer, target = schedule_server("sync", PERSISTENCE_TYPE=request.param)
+    channel = grpc.insecure_channel(target)
+    yield module.schedule_pb2, module.schedule_pb2_grpc.ScheduleStub(channel)
+    channel.close()
+
+
+@pytest.fixture
+def days():
+    """Planning initial: {date: films}"""
+    with open("data/times.json") as f:
+        return {entry["date"]: entry["movies"] for entry in json.load(f)["schedule"]}
+
+
+def get_by_dates(schedule, dates):
+    pb2, stub = schedule
+    response = stub.GetByDates.with_call(pb2.DateList(dates=dates))
+    return [(day.date, list(day.movies)) for day in response[0].list], response[1]
+
+
+def test_get_by_dates_follows_the_requested_order(schedule, days):
+    dates = ["20151203", "20151130", "20151205"]
+
+    result, call = get_by_dates(schedule, dates)
+
+    assert result == [(date, days[date]) for date in dates]
+    assert call.details() == "3 of 3 dates found"
+
+
+def test_get_by_dates_skips_unknown_and_duplicate_dates(schedule, days):
+    result, call = get_by_dates(
+        schedule, ["19990101", "20151201", "20151130", "20151201", "19990101"]
+    )
+
+    assert result == [("20151201", days["20151201"]), ("20151130", days["20151130"])]
+    assert call.code() is grpc.StatusCode.OK
+    assert call.details() == "2 of 3 dates found"
+
+
+def test_get_by_dates_without_any_known_date(schedule):
+    assert get_by_dates(schedule, [])[0] == []
+    assert get_by_dates(schedule, ["19990101"])[0] == []
+
+
+def stream(schedule, start="", end="", batch_size=0):
+    """Lots reçus de StreamAll: [[dates du lot], ...]"""
+    pb2, stub = schedule
+    request = pb2.DateRange(start=start, end=end, batch_size=batch_size)
+    return [[day.date for day in batch.list] for batch in stub.StreamAll(request)]
+
+
+def test_stream_all_sends_every_date_in_batches(schedule, days):
+    dates = sorted(days)
+
+    assert stream(schedule, batch_size=4) == [dates[:4], dates[4:]]
+    assert stream(schedule, batch_size=1) == [[date] for date in dates]
+    assert stream(schedule, batch_size=100) == [dates]
+
+
+def test_stream_all_uses_the_default_batch_size(schedule, days, monkeypatch):
+    monkeypatch.setattr(importlib.import_module("schedule"), "STREAM_BATCH_SIZE", 5)
+    dates = sorted(days)
+
+    assert stream(schedule) == [dates[:5], dates[5:]]
+
+
+def test_stream_all_bounds_are_inclusive(schedule):
+    assert stream(schedule, "20151201", "20151203", batch_size=2) == [
+        ["20151201", "20151202"],
+        ["20151203"],
+    ]
+    # Bornes absentes du planning, ou une seule borne
+    assert stream(schedule, "20151200", "20151201") == [["20151201"]]
+    assert stream(schedule, start="20151204") == [["20151204", "20151205"]]
+    assert stream(schedule, end="20151130") == [["20151130"]]
+
+
+@pytest.mark.parametrize(
+    "start, end", [("20160101", ""), ("", "20150101"), ("20151203", "20151201")]
+)
+def test_stream_all_empty_range_sends_no_batch(schedule, start, end):
+    assert stream(schedule, start, end) == []
@@ -0,0 +1,109 @@
+import pytest
+
+
+@pytest.fixture(params=["JSON", "MONGODB"])
+def user(request, mongo, service):
+    user = service("user", "user", PERSISTENCE_TYPE=request.param)
+    user.role_cache.clear()
+    return user
+
+
+@pytest.fixture
+def client(user):
+    return user.app.test_client()
+
+
+def as_user(userid):
+    return {"x-user-id": userid}
+
+
+NEW_USER = {"id": "new_admin", "name": "New Admin", "last_active": 0, "role": "admin"}
+
+
+def test_promoted_user_gets_admin_rights_at_once(client, user):
+    assert (
+        client.delete(
+            "/users/garret_heaton", headers=as_user("peter_curley")
+        ).status_code
+        == 403
+    )
+    assert user.role_cache.get("peter_curley") == "user"
+
+    response = client.put(
+        "/users/peter_curley", json={"role": "admin"}, headers=as_user("chris_rivers")
+    )
+    assert response.status_code == 200
+
+    assert (
+        client.delete(
+            "/users/garret_heaton", headers=as_user("peter_curley")
+        ).status_code
+        == 200
+    )
+
+
+def test_demoted_user_loses_admin_rights_at_once(client):
+    assert (
+        client.put(
+            "/users/garret_heaton", json={"name": "G"}, headers=as_user("michael_scott")
+        ).status_code
+        == 200
+    )
+
+    client.put(
+        "/users/michael_scott", json={"role": "user"}, headers=as_user("chris_rivers")
+    )
+
+    assert (
+        client.put(
+            "/users/garret_heaton", json={"name": "G"}, headers=as_user("michael_scott")
+        ).status_code
+        == 403
+    )
+
+
+def test_deleted_admin_loses_admin_rights_at_once(client):
+    assert (
+        client.put(
+            "/users/garret_heaton", json={"name": "G"}, headers=as_user("michael_scott")
+        ).status_code
+        == 200
+    )
+
+    assert (
+        client.delete(
+            "/users/michael_scott", headers=as_user("chris_rivers")
+        ).status_code
+        == 200
+    )
+
+    assert (
+        client.put(
+            "/users/garret_heaton", json={"name": "G"}, headers=as_user("michael_scott")
+        ).status_code
+        == 403
+    )
+
+
+def test_added_user_is_no_longer_cached_as_unknown(client, user):
+    assert (
+        client.delete("/users/garret_heaton", headers=as_user("new_admin")).status_code
+        == 403
+    )
+    assert user.role_cache.get("new_admin") is None
+
+    assert (
+        client.post(
+            "/users", json=NEW_USER, headers=as_user("chris_rivers")
+        ).status_code
+        == 201
+    )
+
+    assert (
+        client.delete("/users/garret_heaton", headers=as_user("new_admin")).status_code
+        == 200
+    )
+
+
+def test_requests_without_user_are_unauthorized(client):
+    assert client.delete("/users/garret_heaton").status_code == 401
@@ -4,10 +4,20 @@ import os
 from flask import Flask, jsonify, make_response, request
 from pymongo import MongoClient
 
-from flask_utils import admin_required
+import tracing
+
+from flask_utils import admin_required, role_cache
+from json_store import JsonStore
+from mongo_indexes import ensure_indexes
+from mongo_tracing import MongoCommandTracing
+from pagination import mongo_page, store_page
 
 app = Flask(__name__)
 
+# Span serveur par requête, rattaché au traceparent de l'appelant
+tracing.set_service("user")
+tracing.instrument_flask(app)
+
 PORT = 3203
 
 PERSISTENCE_TYPE = os.getenv("PERSISTENCE_TYPE", "MONGODB")
@@ -25,10 +35,15 @@ MONGO_URL = os.getenv(
 client = None
 db = None
 collection = None
+store = None
 
 if PERSISTENCE_TYPE == "MONGODB":
     # Connexion avec retry automatique (pymongo gère les reconnexions)
-    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+    client = MongoClient(
+        MONGO_URL,
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[MongoCommandTracing()],
+    )
     db = client["users"]
     collection = db["users"]
 
@@ -44,21 +59,19 @@ if PERSISTENCE_TYPE == "MONGODB":
         print(
             f"Base de données MongoDB déjà initialisée: {collection.count_documents({})} utilisateurs"
         )
+
+    # Index utilisé par find_user et toutes les routes /users/<id>
+    ensure_indexes(collection, [("id", {"unique": True})])
 else:
     print(f"Utilisation de la persistance JSON (Fichier: {JSON_FILE_PATH})")
+    store = JsonStore(JSON_FILE_PATH, "users", "id")
 
 
-def get_json_data():
-    try:
-        with open(JSON_FILE_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"users": []}
-
-
-def save_json_data(data):
-    with open(JSON_FILE_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+def find_user(userid):
+    """Recherche un utilisateur par ID avec la connexion du service"""
+    if PERSISTENCE_TYPE == "MONGODB":
+        return collection.find_one({"id": str(userid)}, {"_id": 0})
+    return store.get(userid)
 
 
 @app.route("/", methods=["GET"])
@@ -68,16 +81,26 @@ def home():
 
 @app.route("/users", methods=["GET"])
 def get_users():
-    if PERSISTENCE_TYPE == "MONGODB":
-        users_list = list(collection.find({}))
-        # Convertir ObjectId en string pour JSON
-        for user in users_list:
-            if "_id" in user:
-                user["_id"] = str(user["_id"])
-        return make_response(jsonify(users_list), 200)
-    else:
-        data = get_json_data()
-        return make_response(jsonify(data.get("users", [])), 200)
+    # Pagination optionnelle: ?first=<n>&after=<id du dernier utilisateur reçu>
+    first = request.args.get("first")
+    after = request.args.get("after")
+    try:
+        first = int(first) if first is not None else None
+        if PERSISTENCE_TYPE == "MONGODB":
+            users_list, next_cursor = mongo_page(collection, "id", first, after)
+            # Convertir ObjectId en string pour JSON
+            for user in users_list:
+                if "_id" in user:
+                    user["_id"] = str(user["_id"])
+        else:
+            users_list, next_cursor = store_page(store, first, after)
+    except ValueError:
+        return make_response(jsonify({"error": "Invalid pagination parameters"}), 400)
+
+    response = make_response(jsonify(users_list), 200)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @app.route("/users/<userid>", methods=["GET"])
@@ -91,11 +114,10 @@ def get_user_by_id(userid):
             user["_id"] = str(user["_id"])
         return make_response(jsonify(user), 200)
     else:
-        data = get_json_data()
-        for user in data.get("users", []):
-            if user["id"] == str(userid):
-                return make_response(jsonify(user), 200)
-        return make_response(jsonify({"error": "User ID not found"}), 404)
+        user = store.get(userid)
+        if user is None:
+            return make_response(jsonify({"error": "User ID not found"}), 404)
+        return make_response(jsonify(user), 200)
 
 
 @app.route("/users/admin", methods=["GET"])
@@ -111,15 +133,14 @@ def get_admin_users():
                 admin["_id"] = str(admin["_id"])
         return make_response(jsonify(admins), 200)
     else:
-        data = get_json_data()
-        admins = [u for u in data.get("users", []) if u.get("role") == "admin"]
+        admins = [u for u in store.all() if u.get("role") == "admin"]
         if len(admins) == 0:
             return make_response(jsonify({"error": "No admin users found"}), 204)
         return make_response(jsonify(admins), 200)
 
 
 @app.route("/users", methods=["POST"])
-@admin_required()
+@admin_required(find_user)
 def add_user():
     req = request.get_json()
 
@@ -129,24 +150,22 @@ def add_user():
             return make_response(jsonify({"error": "User ID already exists"}), 400)
 
         collection.insert_one(req)
+        # L'ID était peut-être en cache comme utilisateur inconnu
+        role_cache.invalidate(str(req.get("id")))
         if "_id" in req:
             req["_id"] = str(req["_id"])
         return make_response(jsonify(req), 201)
     else:
-        data = get_json_data()
-        users = data.get("users", [])
-        for user in users:
-            if user["id"] == str(req.get("id")):
+        with store.lock:
+            if str(req.get("id")) in store:
                 return make_response(jsonify({"error": "User ID already exists"}), 400)
-
-        users.append(req)
-        data["users"] = users
-        save_json_data(data)
+            store.put(req)
+        role_cache.invalidate(str(req.get("id")))
         return make_response(jsonify(req), 201)
 
 
 @app.route("/users/<userid>", methods=["PUT"])
-@admin_required()
+@admin_required(find_user)
 def update_user(userid):
     req = request.get_json()
 
@@ -158,38 +177,30 @@ def update_user(userid):
         # Exclure l'ID de la mise à jour pour éviter les conflits
         update_data = {k: v for k, v in req.items() if k != "id"}
         collection.update_one({"id": str(userid)}, {"$set": update_data})
+        role_cache.invalidate(str(userid))
 
         user = collection.find_one({"id": str(userid)})
         if "_id" in user:
             user["_id"] = str(user["_id"])
         return make_response(jsonify(user), 200)
     else:
-        data = get_json_data()
-        users = data.get("users", [])
-        found = False
-        updated_user = None
-
-        for i, user in enumerate(users):
-            if user["id"] == str(userid):
-                found = True
-                # Update fields
-                for k, v in req.items():
-                    if k != "id":
-                        user[k] = v
-                users[i] = user
-                updated_user = user
-                break
-
-        if not found:
-            return make_response(jsonify({"error": "User ID not found"}), 404)
-
-        data["users"] = users
-        save_json_data(data)
+        with store.lock:
+            user = store.get(userid)
+            if user is None:
+                return make_response(jsonify({"error": "User ID not found"}), 404)
+
+            # Update fields
+            updated_user = dict(user)
+            for k, v in req.items():
+                if k != "id":
+                    updated_user[k] = v
+            store.put(updated_user)
+        role_cache.invalidate(str(userid))
         return make_response(jsonify(updated_user), 200)
 
 
 @app.route("/users/<userid>", methods=["DELETE"])
-@admin_required()
+@admin_required(find_user)
 def delete_user(userid):
     if PERSISTENCE_TYPE == "MONGODB":
         user = collection.find_one({"id": str(userid)})
@@ -197,26 +208,26 @@ def delete_user(userid):
             return make_response(jsonify({"error": "User ID not found"}), 404)
 
         collection.delete_one({"id": str(userid)})
+        role_cache.invalidate(str(userid))
         return make_response(jsonify({"message": "User deleted successfully"}), 200)
     else:
-        data = get_json_data()
-        users = data.get("users", [])
-        found = False
-        new_users = []
-
-        for user in users:
-            if user["id"] == str(userid):
-                found = True
-            else:
-                new_users.append(user)
-
-        if not found:
+        if store.delete(userid) is None:
             return make_response(jsonify({"error": "User ID not found"}), 404)
-
-        data["users"] = new_users
-        save_json_data(data)
+        role_cache.invalidate(str(userid))
         return make_response(jsonify({"message": "User deleted successfully"}), 200)
 
 
+# Traces récentes du processus: les plus lentes, ou le détail de ?trace_id=
+@app.route("/traces", methods=["GET"])
+def traces_endpoint():
+    return jsonify(
+        tracing.trace_report(
+            tracing.COLLECTOR.spans(),
+            request.args.get("trace_id"),
+            request.args.get("limit", 20, type=int),
+        )
+    )
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=PORT)